@@ -3,10 +3,68 @@ from dotenv import load_dotenv
 
 load_dotenv()  # Loads environment variables from .env
 
-R2_BUCKET_NAME = "loopi-media"
+R2_BUCKET_NAME = os.getenv("R2_BUCKET_NAME", "loopi-media")
 R2_ACCOUNT_ID = os.getenv("R2_ACCOUNT_ID")
 R2_ACCESS_KEY = os.getenv("R2_ACCESS_KEY")
 R2_SECRET_KEY = os.getenv("R2_SECRET_KEY")
-R2_ENDPOINT_URL = f"https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com"
+# Override to point at a local S3-compatible stand-in (e.g. MinIO) during development
+R2_ENDPOINT_URL = os.getenv("R2_ENDPOINT_URL") or f"https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com"
+
+# R2 multipart uploads: part size (S3 minimum is 5 MB for all but the last part) and parts in flight
+R2_PART_SIZE = int(os.getenv("LOOPI_R2_PART_SIZE", str(8 * 1024 * 1024)))
+R2_PART_CONCURRENCY = int(os.getenv("LOOPI_R2_PART_CONCURRENCY", "4"))
+# Unfinished multipart uploads idle this long (seconds) are aborted on R2 and forgotten; sweep period
+R2_UPLOAD_TTL = int(os.getenv("LOOPI_R2_UPLOAD_TTL", str(24 * 3600)))
+R2_UPLOAD_SWEEP_INTERVAL = int(os.getenv("LOOPI_R2_UPLOAD_SWEEP_INTERVAL", "3600"))
+
+# Shared R2 client (created at startup): connection pool size, timeouts, health check period (0 = off)
+R2_MAX_POOL_CONNECTIONS = int(os.getenv("LOOPI_R2_MAX_POOL_CONNECTIONS", "50"))
+R2_CONNECT_TIMEOUT = float(os.getenv("LOOPI_R2_CONNECT_TIMEOUT", "5"))
+R2_READ_TIMEOUT = float(os.getenv("LOOPI_R2_READ_TIMEOUT", "60"))
+R2_HEALTH_INTERVAL = int(os.getenv("LOOPI_R2_HEALTH_INTERVAL", "60"))  # seconds
+
+# Presigned URL cache: entries, lifetime rounding (seconds), share of lifetime that must remain to reuse a URL
+PRESIGN_CACHE_SIZE = int(os.getenv("LOOPI_PRESIGN_CACHE_SIZE", "10000"))
+PRESIGN_EXPIRY_BUCKET = int(os.getenv("LOOPI_PRESIGN_EXPIRY_BUCKET", "300"))
+PRESIGN_SAFE_FRACTION = float(os.getenv("LOOPI_PRESIGN_SAFE_FRACTION", "0.5"))
+
+# Deployment mode: "development" or "production" (the Docker image sets production)
+ENVIRONMENT = os.getenv("LOOPI_ENV", "development")
+
+# Templates: compiled bytecode cached on disk; auto-reload (stat on every render) only outside production
+TEMPLATE_CACHE_DIR = os.getenv("LOOPI_TEMPLATE_CACHE_DIR", "app/.template_cache")
+TEMPLATE_AUTO_RELOAD = os.getenv("LOOPI_TEMPLATE_AUTO_RELOAD", "0" if ENVIRONMENT == "production" else "1") == "1"
+
+# Rendered dashboard pages (content / playlists / devices), cached per store versions + query; entries per page
+PAGE_CACHE_ENABLED = os.getenv("LOOPI_PAGE_CACHE", "1") == "1"
+PAGE_CACHE_SIZE = int(os.getenv("LOOPI_PAGE_CACHE_SIZE", "64"))
+
+# Offline display (service worker): Cache Storage budget per screen for playlist media, in MB
+DISPLAY_CACHE_MB = int(os.getenv("LOOPI_DISPLAY_CACHE_MB", "1024"))
+
+# Active displays allowed when the request carries no subscription (claim / mark / bulk activate)
+DEVICE_LIMIT = int(os.getenv("LOOPI_DEVICE_LIMIT", "1"))
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./loopi.db")
+
+# JSON store persistence: "snapshot" (rewrite whole file) or "wal" (append-only log + compaction)
+STORE_MODE = os.getenv("LOOPI_STORE_MODE", "snapshot")
+STORE_COMPACT_INTERVAL = int(os.getenv("LOOPI_STORE_COMPACT_INTERVAL", "60"))  # seconds
+HEARTBEAT_FLUSH_INTERVAL = int(os.getenv("LOOPI_HEARTBEAT_FLUSH_INTERVAL", "30"))  # seconds
+
+# Storage backend for devices / playlists / metadata: "json" (files above) or "sqlite" (DATABASE_URL)
+STORAGE_BACKEND = os.getenv("LOOPI_STORAGE_BACKEND", "json")
+DB_POOL_SIZE = int(os.getenv("LOOPI_DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("LOOPI_DB_MAX_OVERFLOW", "20"))
+# SQL stores: seconds a worker trusts its cached store version before re-reading the version row
+SQL_VERSION_TTL = float(os.getenv("LOOPI_SQL_VERSION_TTL", "1.0"))
+
+# Image renditions (720p/1080p/4K WebP + JPEG) rendered in a process pool; 0 = one worker per CPU
+RENDITION_WORKERS = int(os.getenv("LOOPI_RENDITION_WORKERS", "2"))
+
+# Uploads are streamed to disk; larger request bodies are rejected with 413
+MAX_UPLOAD_BYTES = int(os.getenv("LOOPI_MAX_UPLOAD_BYTES", str(512 * 1024 * 1024)))
+
+# Batch uploads (/upload/batch): total body limit and files per request
+MAX_BATCH_BYTES = int(os.getenv("LOOPI_MAX_BATCH_BYTES", str(4 * 1024 * 1024 * 1024)))
+MAX_BATCH_FILES = int(os.getenv("LOOPI_MAX_BATCH_FILES", "500"))
@@ -0,0 +1,47 @@
+# app/database.py
+
+"""
+Database engine for the SQL storage backend (STORAGE_BACKEND=sqlite).
+Uses DATABASE_URL from app/config.py; SQLite connections run in WAL mode.
+"""
+
+from sqlalchemy import event
+from sqlmodel import SQLModel, create_engine
+
+from app.config import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW
+
+_is_sqlite = DATABASE_URL.startswith("sqlite")
+
+engine = create_engine(
+    DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    connect_args={"check_same_thread": False, "timeout": 30} if _is_sqlite else {},
+)
+
+
+# === SQLite tuning: WAL journal, relaxed sync (safe under WAL), FK checks ===
+if _is_sqlite:
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute("PRAGMA busy_timeout=30000")
+        cursor.close()
+
+
+_schema_ready = set()  # Engines whose tables exist
+
+
+def init_db(bind=None) -> None:
+    """Create all tables on `bind` (default: the app engine); idempotent."""
+    bind = bind or engine
+    if id(bind) in _schema_ready:
+        return
+    # Import models so they register with SQLModel.metadata
+    from app.models import media_asset, storage_models  # noqa: F401
+    SQLModel.metadata.create_all(bind)
+    _schema_ready.add(id(bind))
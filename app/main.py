@@ -1,17 +1,22 @@
 # --- FastAPI App Bootstrapper for LooPi MVP ---
 
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.templating import Jinja2Templates
 from fastapi.responses import RedirectResponse
-from datetime import datetime
 from pathlib import Path
+import asyncio
 
-from app.utils.jinja_filters import datetimeformat
+from app.templating import templates, warm_templates
+from app.utils.static_files import FINGERPRINTED, ImmutableStaticFiles
 from app.routes import auth, content, home, upload, playlists, display, ui, media
 from app.routes.devices import router as devices_router
 from app.services.playlist_service import load_playlists
+from app.services.json_store import compact_all
+from app.services.heartbeat_service import flush_heartbeats
+from app.services import rendition_service
+from app.services.r2_client import r2
+from app.services.r2_upload import sweep_stale_uploads
+from app.config import STORE_COMPACT_INTERVAL, HEARTBEAT_FLUSH_INTERVAL, R2_ACCESS_KEY, R2_UPLOAD_SWEEP_INTERVAL
 
 # --- Create FastAPI instance ---
 app = FastAPI(title="LooPi MVP")
@@ -32,27 +37,14 @@ STATIC_DIR = BASE_DIR / "app" / "static"
 UPLOADS_DIR = STATIC_DIR / "uploads"
 
 # --- Mount static asset folders ---
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
-app.mount("/uploads", StaticFiles(directory=UPLOADS_DIR), name="uploads")
-
-# --- Jinja2 Templates with Custom Filters ---
-templates = Jinja2Templates(directory="app/templates")
-
-def datetimeformat(value, format="%m/%d/%Y"):
-    if not value:
-        return ""
-    try:
-        if isinstance(value, datetime):
-            return value.strftime(format)
-        if isinstance(value, str):
-            return datetime.fromisoformat(value).strftime(format)
-        return str(value)  # Fallback
-    except Exception as e:
-        return f"Invalid date"
-
-
-# Register filter to Jinja2
-templates.env.filters["datetimeformat"] = datetimeformat
+# Fingerprinted build outputs (icons/sprite.<hash>.svg) are immutable too
+app.mount("/static", ImmutableStaticFiles(
+    directory=STATIC_DIR, pattern=FINGERPRINTED, versioned=True, unversioned=("uploads",)
+), name="static")
+# Content-addressed uploads are served with immutable cache headers
+app.mount("/uploads", ImmutableStaticFiles(directory=UPLOADS_DIR), name="uploads")
+
+# --- Shared Jinja2 Templates (one environment, filters, bytecode cache) ---
 app.templates = templates  # Make available globally
 
 # --- Register Routers ---
@@ -74,4 +66,86 @@ async def root():
 # --- Startup Playlist Loader ---
 @app.on_event("startup")
 def load_playlists_into_state():
-    app.state.playlists = load_playlists()
\ No newline at end of file
+    app.state.playlists = load_playlists()
+
+# --- Template Warm-up (bytecode → memory, before the first request) ---
+@app.on_event("startup")
+def load_templates():
+    warm_templates()
+
+# --- Rendition Process Pool ---
+@app.on_event("startup")
+def start_rendition_pool():
+    rendition_service.start_pool()
+
+@app.on_event("shutdown")
+def stop_rendition_pool():
+    rendition_service.shutdown_pool()
+
+# --- Shared R2 Client (pooled connections, health-checked) ---
+@app.on_event("startup")
+async def start_r2_client():
+    await r2.start()
+    if R2_ACCESS_KEY:
+        r2.start_health_checks()
+
+@app.on_event("shutdown")
+async def stop_r2_client():
+    await r2.close()
+
+# --- Stale Multipart Upload Sweep ---
+async def sweep_r2_uploads_periodically():
+    while True:
+        await asyncio.sleep(R2_UPLOAD_SWEEP_INTERVAL)
+        try:
+            async with r2.client() as client:
+                await sweep_stale_uploads(client)
+        except Exception as e:
+            print(f"[WARN] Stale upload sweep failed: {e}")
+
+@app.on_event("startup")
+async def start_r2_upload_sweep():
+    if R2_ACCESS_KEY and R2_UPLOAD_SWEEP_INTERVAL:
+        app.state.r2_sweep_task = asyncio.create_task(sweep_r2_uploads_periodically())
+
+@app.on_event("shutdown")
+async def stop_r2_upload_sweep():
+    task = getattr(app.state, "r2_sweep_task", None)
+    if task is not None:
+        task.cancel()
+
+# --- Batched Heartbeat Flush ---
+async def flush_heartbeats_periodically():
+    while True:
+        await asyncio.sleep(HEARTBEAT_FLUSH_INTERVAL)
+        try:
+            await asyncio.to_thread(flush_heartbeats)
+        except Exception as e:
+            print(f"[WARN] Heartbeat flush failed: {e}")
+
+@app.on_event("startup")
+async def start_heartbeat_flush():
+    app.state.heartbeat_task = asyncio.create_task(flush_heartbeats_periodically())
+
+@app.on_event("shutdown")
+async def stop_heartbeat_flush():
+    app.state.heartbeat_task.cancel()
+    flush_heartbeats()
+
+# --- Background Store Compaction (WAL mode) ---
+async def compact_stores_periodically():
+    while True:
+        await asyncio.sleep(STORE_COMPACT_INTERVAL)
+        try:
+            await asyncio.to_thread(compact_all)
+        except Exception as e:
+            print(f"[WARN] Store compaction failed: {e}")
+
+@app.on_event("startup")
+async def start_store_compaction():
+    app.state.compaction_task = asyncio.create_task(compact_stores_periodically())
+
+@app.on_event("shutdown")
+async def stop_store_compaction():
+    app.state.compaction_task.cancel()
+    compact_all()
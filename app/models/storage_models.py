@@ -0,0 +1,50 @@
+# app/models/storage_models.py
+
+"""
+Tables backing the SQL storage backend (see app/services/sql_store.py).
+Each store keeps the full JSON entry in `data` for a lossless round trip and
+projects the fields we query on into indexed columns.
+"""
+
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+
+# === Store version counters (cross-worker cache invalidation) ===
+class StoreVersion(SQLModel, table=True):
+    name: str = Field(primary_key=True)
+    version: int = 0
+
+
+# === Devices ===
+class DeviceRow(SQLModel, table=True):
+    device_id: str = Field(primary_key=True)
+    auth_token: Optional[str] = Field(default=None, index=True)
+    active_playlist: Optional[str] = Field(default=None, index=True)
+    data: str  # JSON-encoded device record
+
+
+# === Playlists (ordered images) ===
+class PlaylistRow(SQLModel, table=True):
+    name: str = Field(primary_key=True)
+    color: str = "#e0e0e0"
+    devices: str = "[]"  # JSON-encoded list of device names
+
+
+class PlaylistImageRow(SQLModel, table=True):
+    playlist: str = Field(primary_key=True, foreign_key="playlistrow.name", ondelete="CASCADE")
+    position: int = Field(primary_key=True)
+    filename: str = Field(index=True)
+
+
+# === File metadata (dates + playlist membership) ===
+class FileMetadataRow(SQLModel, table=True):
+    filename: str = Field(primary_key=True)
+    start_date: Optional[str] = None
+    end_date: Optional[str] = Field(default=None, index=True)
+    data: str  # JSON-encoded metadata entry
+
+
+class FileMetadataPlaylistRow(SQLModel, table=True):
+    filename: str = Field(primary_key=True, foreign_key="filemetadatarow.filename", ondelete="CASCADE")
+    playlist: str = Field(primary_key=True, index=True)
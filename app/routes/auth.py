@@ -2,12 +2,11 @@
 
 from fastapi import APIRouter, Request, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 
+from app.templating import templates
 from app.utils.context_helpers import inject_user_context
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/profile", response_class=HTMLResponse)
 async def profile_view(request: Request):
@@ -1,31 +1,37 @@
 # --------------------------------------------------------------------------- #
 #  content.py – Content dashboard routes for LooPi MVP                        #
-#  • GET  /content/        -> Render the dashboard of uploaded media files   #
-#  • POST /content/delete  -> Delete an image + its metadata                 #
-#  • POST /content/update  -> Update start/end dates & playlists for a file  #
+#  • GET  /content/           -> Render one page of the media library         #
+#  • GET  /content/api/media  -> Same listing as JSON (cursor-paginated)      #
+#  • GET  /content/thumb/{f}  -> Cached thumbnail for an upload               #
+#  • POST /content/delete     -> Delete an image + its metadata               #
+#  • POST /content/update     -> Update dates & playlists for a file         #
 # --------------------------------------------------------------------------- #
 
 from fastapi import APIRouter, Request, Form, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse
 from starlette.status import HTTP_302_FOUND
 from datetime import datetime, date
-from pathlib import Path
-from fastapi.templating import Jinja2Templates
-from app.utils.jinja_filters import datetimeformat
+from urllib.parse import urlencode
 
 # --- Internal Services ---
-from app.services.metadata_service import load_metadata, save_metadata
-from app.services.playlist_service import load_playlists
+from app.services.metadata_service import (
+    metadata_store, delete_file_metadata, update_file_metadata,
+)
+from app.services.playlist_service import load_playlists, playlist_store, update_playlists
+from app.services import object_store
+from app.services.object_store import media_path, media_url, release
+from app.services.library_service import DEFAULT_PAGE_SIZE, list_media
+from app.services.page_cache import page_cache
+from app.services.thumbnail_service import ensure_thumbnail, thumb_version
+from app.utils.static_files import IMMUTABLE_CACHE_CONTROL
 
 # --- Context Utilities ---
+from app.templating import templates
 from app.utils.context_helpers import inject_user_context
 
 # --- FastAPI Config ---
 router = APIRouter()
-UPLOAD_DIR = Path("app/static/uploads")
 
-templates = Jinja2Templates(directory="app/templates")
-templates.env.filters["datetimeformat"] = datetimeformat
 
 
 # --------------------------------------------------------------------------- #
@@ -34,40 +40,92 @@ templates.env.filters["datetimeformat"] = datetimeformat
 @router.get("/", response_class=HTMLResponse)
 async def content_dashboard(request: Request, msg: str = "", err: str = ""):
     """
-    Render the content dashboard with uploaded files and associated metadata.
-    Adds 'is_expired' flag to each file and sorts active files above expired.
+    Render one page of the content dashboard (see library_service for the
+    filter / sort / cursor query parameters). Thumbnails load lazily.
+    Served from the page cache until metadata / playlists change (or the
+    day rolls over, which moves files between active and expired).
     """
-    metadata = load_metadata()
-    playlists = load_playlists()
-    today = date.today()
-
-    files = []
-    for fname, data in metadata.items():
-        # Determine if the file has expired based on its end date
-        try:
-            end = datetime.strptime(data.get("end", ""), "%Y-%m-%d").date()
-            is_expired = end < today
-        except Exception:
-            is_expired = False  # Default to active if date parsing fails
-
-        files.append({
-            "filename": fname,
-            "start": data.get("start", ""),
-            "end": data.get("end", ""),
-            "playlists": data.get("playlists", []),
-            "is_expired": is_expired
-        })
-
-    # Sort files: Active (False) before Expired (True)
-    files.sort(key=lambda f: f["is_expired"])
-
-    return templates.TemplateResponse("content.html", inject_user_context(
-        request,
-        files=files,
-        message=msg,
-        error=err,
-        playlists=playlists
-    ))
+    filters = _library_filters(request)
+
+    def render():
+        page = list_media(**filters)
+
+        # Query strings for the "next page" / "first page" links
+        params = {k: v for k, v in request.query_params.items() if k not in ("cursor", "msg", "err") and v}
+        next_url = f"/content?{urlencode({**params, 'cursor': page['next_cursor']})}" if page["next_cursor"] else None
+        first_url = f"/content?{urlencode(params)}" if request.query_params.get("cursor") else None
+
+        return templates.TemplateResponse("content.html", inject_user_context(
+            request,
+            files=page["items"],
+            total=page["total"],
+            next_url=next_url,
+            first_url=first_url,
+            filters=request.query_params,
+            message=msg,
+            error=err,
+            playlists=playlist_store.view()
+        ))
+
+    return page_cache.respond(
+        request, "content", (metadata_store, playlist_store), render, extra=(date.today().isoformat(),)
+    )
+
+
+# --------------------------------------------------------------------------- #
+#  GET /content/api/media – Paginated library listing (JSON)                  #
+# --------------------------------------------------------------------------- #
+@router.get("/api/media")
+async def media_listing(request: Request):
+    """
+    Query: status (active|expired|scheduled), playlist, from, to (YYYY-MM-DD),
+    sort (status|filename|start|end), order (asc|desc), cursor, limit.
+    Returns {"items", "next_cursor", "total"}.
+    """
+    return list_media(**_library_filters(request))
+
+
+def _library_filters(request: Request) -> dict:
+    q = request.query_params
+    try:
+        date_from = date.fromisoformat(q["from"]) if q.get("from") else None
+        date_to = date.fromisoformat(q["to"]) if q.get("to") else None
+        limit = int(q.get("limit") or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid from / to date (YYYY-MM-DD) or limit.")
+    return {
+        "status": q.get("status") or None,
+        "playlist": q.get("playlist") or None,
+        "date_from": date_from,
+        "date_to": date_to,
+        "sort": q.get("sort") or "status",
+        "order": q.get("order") or "asc",
+        "cursor": q.get("cursor") or None,
+        "limit": limit,
+    }
+
+
+# --------------------------------------------------------------------------- #
+#  GET /content/thumb/{filename} – Cached thumbnail                           #
+# --------------------------------------------------------------------------- #
+@router.get("/thumb/{filename:path}")
+async def thumbnail(filename: str, v: str = ""):
+    """
+    Small WebP thumbnail, rendered once and cached on disk. Cached as
+    immutable when the ?v= version matches the current file. Only files with
+    a metadata entry, stored under UPLOAD_DIR, are served.
+    """
+    meta = metadata_store.get(filename)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Unknown file.")
+    if not media_path(filename, meta).resolve().is_relative_to(object_store.UPLOAD_DIR.resolve()):
+        raise HTTPException(status_code=404, detail="Unknown file.")
+    path = await ensure_thumbnail(filename, meta)
+    if path is None:
+        # Missing file or not an image Pillow can read: fall back to the original
+        return RedirectResponse(url=media_url(filename, meta), status_code=HTTP_302_FOUND)
+    cache = IMMUTABLE_CACHE_CONTROL if v and v == thumb_version(filename, meta) else "no-cache"
+    return FileResponse(path, media_type="image/webp", headers={"Cache-Control": cache})
 
 
 # --------------------------------------------------------------------------- #
@@ -76,16 +134,11 @@ async def content_dashboard(request: Request, msg: str = "", err: str = ""):
 @router.post("/delete")
 async def delete_file(filename: str = Form(...)):
     """
-    Deletes the physical image file and its metadata entry.
+    Deletes the metadata entry, plus the stored file and its renditions
+    unless another entry was deduplicated onto the same object.
     """
-    file_path = UPLOAD_DIR / filename
-
-    if file_path.exists():
-        file_path.unlink()
-
-    metadata = load_metadata()
-    metadata.pop(filename, None)
-    save_metadata(metadata)
+    meta = delete_file_metadata(filename)
+    release(filename, meta, metadata_store.view())
 
     return RedirectResponse(url="/content?msg=File+deleted", status_code=HTTP_302_FOUND)
 
@@ -121,48 +174,22 @@ async def update_file(request: Request):
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format: use YYYY-MM-DD.")
 
-    # --- Update metadata ---
-    metadata = load_metadata()
-    if filename in metadata:
-        metadata[filename]["start"]     = start_date
-        metadata[filename]["end"]       = end_date
-        metadata[filename]["playlists"] = new_playlists
-        save_metadata(metadata)
+    # --- Update metadata (schedule fields only; the index is patched, not rebuilt) ---
+    update_file_metadata(filename, start_date, end_date, new_playlists)
 
     # --- Sync playlist membership in playlists.json ---
-    from app.services.playlist_service import load_playlists, save_playlists
-    playlists = load_playlists()
-
-    # Remove image from all playlists it's currently in
-    for name, pl in playlists.items():
-        if filename in pl["images"]:
-            pl["images"].remove(filename)
-
-    # Add image to newly selected playlists
-    for pl_name in new_playlists:
-        if pl_name in playlists:
-            if filename not in playlists[pl_name]["images"]:
-                playlists[pl_name]["images"].append(filename)
-
-    save_playlists(playlists)
-
-    return RedirectResponse(url="/content?msg=File+updated+successfully", status_code=HTTP_302_FOUND)
-
-    # --- Validate date formats ---
-    try:
-        start = datetime.strptime(start_date, "%Y-%m-%d").date()
-        end = datetime.strptime(end_date, "%Y-%m-%d").date()
-        if end < start:
-            raise HTTPException(status_code=400, detail="End date cannot precede start date.")
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid date format: use YYYY-MM-DD.")
-
-    # --- Save updated metadata ---
-    metadata = load_metadata()
-    if filename in metadata:
-        metadata[filename]["start"] = start_date
-        metadata[filename]["end"] = end_date
-        metadata[filename]["playlists"] = playlists
-        save_metadata(metadata)
+    def sync_membership(playlists):
+        # Remove image from all playlists it's currently in
+        for name, pl in playlists.items():
+            if filename in pl["images"]:
+                pl["images"].remove(filename)
+
+        # Add image to newly selected playlists
+        for pl_name in new_playlists:
+            if pl_name in playlists:
+                if filename not in playlists[pl_name]["images"]:
+                    playlists[pl_name]["images"].append(filename)
+
+    update_playlists(sync_membership)
 
     return RedirectResponse(url="/content?msg=File+updated+successfully", status_code=HTTP_302_FOUND)
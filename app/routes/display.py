@@ -1,45 +1,67 @@
 # app/routes/display.py
 
 from fastapi import APIRouter, Request, Form, Query, Cookie
-from fastapi.responses import RedirectResponse, HTMLResponse
+from fastapi.responses import RedirectResponse, HTMLResponse, JSONResponse, Response, StreamingResponse, FileResponse
 from uuid import uuid4
 from datetime import datetime, timedelta
+from pathlib import Path
+import asyncio
+import json
+
+from app.config import DISPLAY_CACHE_MB
 
 from app.utils.context_helpers import inject_user_context
 from app.services.device_service import (
-    load_devices as get_devices,
-    save_devices as save_device,
+    update_devices,
+    devices_view,
+    device_limit as active_device_limit,
+    device_store,
 )
 from app.models.device_model import Device
+from app.services.device_auth import authenticate_device
+from app.services.manifest_service import manifest_etag, etag_matches, get_manifest
+from app.services.page_cache import page_cache
+from app.services.playlist_service import playlist_store
+from app.services.push_service import broker, remember_assignment, PUSH_KEEPALIVE_SECONDS
 
 router = APIRouter()
 
+DISPLAY_SERVICE_WORKER = Path("app/static/js/display-sw.js")
+
 # === DEVICE MANAGEMENT PAGE ===
+# Served from the page cache until devices / playlists change; days_left is
+# whole days, so the hour is part of the key
 @router.get("/devices")
 async def devices_page(request: Request):
-    # Inject user context
-    context = inject_user_context(request)
-    raw_devices = get_devices()
-
-    devices_with_days = {}
-    for device_id, info in raw_devices.items():
-        device = info.copy()
-        # Calculate days_left from last_seen or set to None
-        if "last_seen" in device:
-            try:
-                last_seen = datetime.fromisoformat(device["last_seen"])
-                days_left = (last_seen + timedelta(days=30) - datetime.utcnow()).days
-                device["days_left"] = max(days_left, 0)
-            except Exception:
+    def render():
+        # Inject user context
+        context = inject_user_context(request)
+        raw_devices = devices_view()
+
+        devices_with_days = {}
+        for device_id, info in raw_devices.items():
+            device = info.copy()
+            # Calculate days_left from last_seen or set to None
+            if "last_seen" in device:
+                try:
+                    last_seen = datetime.fromisoformat(device["last_seen"])
+                    days_left = (last_seen + timedelta(days=30) - datetime.utcnow()).days
+                    device["days_left"] = max(days_left, 0)
+                except Exception:
+                    device["days_left"] = None
+            else:
                 device["days_left"] = None
-        else:
-            device["days_left"] = None
-        devices_with_days[device_id] = device
+            devices_with_days[device_id] = device
+
+        # Add to template context
+        context["devices"] = devices_with_days
+        context["playlists"] = playlist_store.view()
+        return request.app.templates.TemplateResponse("devices.html", context)
 
-    # Add to template context
-    context["devices"] = devices_with_days
-    context["playlists"] = request.app.state.playlists
-    return request.app.templates.TemplateResponse("devices.html", context)
+    return page_cache.respond(
+        request, "devices", (device_store, playlist_store), render,
+        extra=(datetime.utcnow().strftime("%Y-%m-%dT%H"),),
+    )
 
 # === REGISTER OR UPDATE DEVICE ===
 @router.post("/devices/update")
@@ -49,88 +71,98 @@ async def update_device(
     name: str = Form(""),
     active_playlist: str = Form("")
 ):
-    devices = get_devices()
     now = datetime.utcnow().isoformat()
 
-    if device_id in devices:
-        # Update existing device
-        devices[device_id]["name"] = name
-        devices[device_id]["active_playlist"] = active_playlist
-        devices[device_id]["last_seen"] = now
-    else:
-        # Register new device
-        devices[device_id] = {
-            "name": name,
-            "active_playlist": active_playlist,
-            "auth_token": str(uuid4()),
-            "active": False,
-            "last_seen": now
-        }
-
-    save_device(devices)
+    def register(devices):
+        if device_id in devices:
+            # Update existing device
+            devices[device_id]["name"] = name
+            devices[device_id]["active_playlist"] = active_playlist
+            devices[device_id]["last_seen"] = now
+        else:
+            # Register new device
+            devices[device_id] = {
+                "name": name,
+                "active_playlist": active_playlist,
+                "auth_token": str(uuid4()),
+                "active": False,
+                "last_seen": now
+            }
+
+    update_devices(register)
     return RedirectResponse(url="/devices", status_code=303)
 
 # === ROTATE AUTH TOKEN ===
 @router.post("/devices/{device_id}/rotate_token")
 async def rotate_token(device_id: str):
-    devices = get_devices()
-    if device_id in devices:
+    def rotate(devices):
+        if device_id not in devices:
+            return None
         devices[device_id]["auth_token"] = str(uuid4())
-        save_device(devices)
-        return {"success": True, "new_token": devices[device_id]["auth_token"]}
+        return devices[device_id]["auth_token"]
+
+    new_token = update_devices(rotate)
+    if new_token is not None:
+        return {"success": True, "new_token": new_token}
     return {"error": "Device not found"}
 
 # === MARK THIS DEVICE AS ACTIVE ===
 @router.post("/devices/mark")
 async def mark_this_device(request: Request, device_id: str = Form(...)):
-    devices = get_devices()
-    if device_id in devices:
-        active_devices = [d for d in devices.values() if d.get("active")]
-        device_limit = request.user.subscription.device_limit if hasattr(request.user, "subscription") else 1
+    device_limit = active_device_limit(request)
 
+    def mark(devices):
+        if device_id not in devices:
+            return True
+        active_devices = [d for d in devices.values() if d.get("active")]
         if len(active_devices) < device_limit or devices[device_id].get("active"):
-            # Mark target device as active and others as inactive
+            # Mark target device as active (others stay as they are, within the limit)
             devices[device_id]["active"] = True
-            for key, dev in devices.items():
-                if key != device_id:
-                    dev["active"] = False
-            save_device(devices)
-        else:
-            # Render error if limit exceeded
-            context = inject_user_context(request)
-            context["error"] = f"You've reached your limit of {device_limit} active devices. Please deactivate another device or upgrade your subscription."
-            context["devices"] = devices
-            context["playlists"] = request.app.state.playlists
-            return request.app.templates.TemplateResponse("claim_denied.html", context)
+            return True
+        return False
+
+    if not update_devices(mark):
+        # Render error if limit exceeded
+        context = inject_user_context(request)
+        context["error"] = f"You've reached your limit of {device_limit} active devices. Please deactivate another device or upgrade your subscription."
+        context["devices"] = devices_view()
+        context["playlists"] = request.app.state.playlists
+        return request.app.templates.TemplateResponse("claim_denied.html", context)
 
     return RedirectResponse(url="/devices", status_code=303)
 
 # === CLAIM DEVICE (VIA QR OR LINK) ===
 @router.get("/claim", response_class=HTMLResponse)
 async def claim_device(request: Request, device_id: str = Query(...), auth_token: str = Query(...)):
-    devices = get_devices()
-    device = devices.get(device_id)
-
-    # Validate token
-    if not device or device.get("auth_token") != auth_token:
+    # Validate token (index lookup; the fleet is loaded only for a valid claim)
+    if authenticate_device(device_id, auth_token) is None:
         return HTMLResponse("<h3>Unauthorized device or invalid token.</h3>", status_code=403)
+    device_limit = active_device_limit(request)
 
-    # Enforce license limit
-    active_devices = [d for d in devices.values() if d.get("active")]
-    device_limit = request.user.subscription.device_limit if hasattr(request.user, "subscription") else 1
-    if len(active_devices) >= device_limit and not device.get("active"):
-        return HTMLResponse(f"<h3>Device limit exceeded ({device_limit}). Please deactivate another device.</h3>", status_code=403)
+    def claim(devices):
+        device = devices.get(device_id)
+        if device is None:  # Removed since the lookup
+            return "missing", None
+
+        # Enforce license limit
+        active_devices = [d for d in devices.values() if d.get("active")]
+        if len(active_devices) >= device_limit and not device.get("active"):
+            return "limit", None
 
-    # Activate claimed device only
-    for key in devices:
-        devices[key]["active"] = (key == device_id)
+        # Activate the claimed device (others stay active, within the limit)
+        device["active"] = True
+        return "ok", device["auth_token"]
 
-    save_device(devices)
+    result, auth_token = update_devices(claim)
+    if result == "missing":
+        return HTMLResponse("<h3>Unauthorized device or invalid token.</h3>", status_code=403)
+    if result == "limit":
+        return HTMLResponse(f"<h3>Device limit exceeded ({device_limit}). Please deactivate another device.</h3>", status_code=403)
 
     # Set cookies for device tracking
     response = RedirectResponse(url=f"/display?device_id={device_id}", status_code=303)
     response.set_cookie("loopi_device_id", device_id, max_age=60*60*24*365, path="/")
-    response.set_cookie("loopi_device_token", device["auth_token"], max_age=60*60*24*365, path="/")
+    response.set_cookie("loopi_device_token", auth_token, max_age=60*60*24*365, path="/")
     return response
 
 # === CLAIM FALLBACK PAGE ===
@@ -140,6 +172,16 @@ async def claim_needed(request: Request):
     context["message"] = "This device isn't registered or authorized. Please scan a claim QR code or visit the Devices page."
     return request.app.templates.TemplateResponse("claim_needed.html", context)
 
+# === DISPLAY AUTH (shared by page + manifest) ===
+def _authorized_device(device_id: str, token: str):
+    """
+    Return the device view if `token` matches and the device is active, else None.
+    """
+    device = authenticate_device(device_id, token)
+    if device is None or not device.get("active"):
+        return None
+    return device
+
 # === DISPLAY ENDPOINT (COOKIE-SECURED) ===
 @router.get("/display", response_class=HTMLResponse)
 async def display_screen(
@@ -150,17 +192,84 @@ async def display_screen(
 ):
     # Use query param or fallback to cookie
     device_id = device_id or id_cookie
-    if not device_id or not token_cookie:
-        return RedirectResponse(url="/claim-needed", status_code=303)
-
-    devices = get_devices()
-    device = devices.get(device_id)
+    device = _authorized_device(device_id, token_cookie)
 
     # Reject if token mismatch or inactive
-    if not device or device.get("auth_token") != token_cookie or not device.get("active"):
+    if device is None:
         return RedirectResponse(url="/claim-needed", status_code=303)
 
-    # Valid device → render display
+    # Valid device → render display with the current manifest baked in
     context = inject_user_context(request)
     context["device"] = device
-    return request.app.templates.TemplateResponse("display.html", context)
\ No newline at end of file
+    context["device_id"] = device_id
+    context["manifest"] = get_manifest(device_id, device)
+    context["display_cache_mb"] = DISPLAY_CACHE_MB
+    return request.app.templates.TemplateResponse("display.html", context)
+
+# === DISPLAY SERVICE WORKER (OFFLINE PLAYBACK) ===
+# Served from the site root rather than /static so it may control /display;
+# no-cache so a new deploy's worker is picked up on the next navigation
+@router.get("/display-sw.js")
+async def display_service_worker():
+    return FileResponse(
+        DISPLAY_SERVICE_WORKER,
+        media_type="text/javascript",
+        headers={"Service-Worker-Allowed": "/", "Cache-Control": "no-cache"},
+    )
+
+# === DISPLAY MANIFEST (POLLED BY display.html) ===
+@router.get("/display/manifest")
+async def display_manifest(
+    request: Request,
+    device_id: str = Query(None),
+    token_cookie: str = Cookie(None, alias="loopi_device_token"),
+    id_cookie: str = Cookie(None, alias="loopi_device_id")
+):
+    device_id = device_id or id_cookie
+    device = _authorized_device(device_id, token_cookie)
+    if device is None:
+        return JSONResponse({"error": "Unauthorized device or invalid token"}, status_code=403)
+
+    # Unchanged since the display's last poll → 304 without building anything
+    etag = manifest_etag(device_id, device)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    return JSONResponse(get_manifest(device_id, device, etag), headers=headers)
+
+# === DISPLAY PUSH CHANNEL (SERVER-SENT EVENTS) ===
+@router.get("/display/events")
+async def display_events(
+    request: Request,
+    device_id: str = Query(None),
+    token_cookie: str = Cookie(None, alias="loopi_device_token"),
+    id_cookie: str = Cookie(None, alias="loopi_device_id")
+):
+    device_id = device_id or id_cookie
+    if _authorized_device(device_id, token_cookie) is None:
+        return JSONResponse({"error": "Unauthorized device or invalid token"}, status_code=403)
+
+    subscriber = broker.subscribe(device_id)
+    remember_assignment(device_id)
+
+    async def event_stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=PUSH_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if subscriber.evicted:
+                    break  # Too far behind; the browser reconnects and refetches
+                yield f"event: playlist\ndata: {json.dumps(event)}\n\n"
+        finally:
+            broker.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
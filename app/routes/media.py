@@ -1,26 +1,92 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.services import media_service, metadata_service
+from fastapi import APIRouter, Request, HTTPException
+from app.services import media_service
+from app.services.presign_cache import presign_cache
+from app.services.r2_client import r2
+from app.services.r2_upload import abort_upload, get_upload, open_multipart_upload
+from app.services.upload_engine import receive_upload
 from uuid import uuid4
+import mimetypes
 
 router = APIRouter()
 
 @router.post("/media/upload")
-async def upload_media(file: UploadFile = File(...)):
-    # Generate unique key for Cloudflare R2
-    key = f"{uuid4()}_{file.filename}"
+async def upload_media(request: Request):
+    """
+    Stream a multipart `file` field to R2 as a parallel multipart upload.
 
+    Resumable: send an `Upload-Key` header (any stable id for this file).
+    If the connection drops, GET /media/upload/{key} returns the byte offset
+    reached; re-POST the rest of the file with `Upload-Offset: <offset>`.
+    Without the header a failed upload is aborted on R2 (it can't be resumed).
+    Error responses carry `upload_key` next to the error message.
+    """
+    resumable = "upload-key" in request.headers
+    upload_key = request.headers.get("upload-key") or str(uuid4())
     try:
-        # Upload to R2
-        await media_service.upload_media_to_r2(file.file, key)
-
-        # Save metadata to DB
-        await metadata_service.save_media_metadata(
-            filename=file.filename,
-            r2_key=key,
-            content_type=file.content_type,
-            size=file.spool_max_size  # Replace with actual size if available
-        )
-
-        return {"message": "Upload successful", "key": key}
+        offset = int(request.headers.get("upload-offset", "0"))
+    except ValueError:
+        raise _upload_error(400, "Upload-Offset must be an integer.", upload_key)
+
+    async with media_service.r2_client() as client:
+        try:
+            async def open_sink(field, filename):
+                # Generate unique key for Cloudflare R2 (a resumed upload keeps its original key)
+                return await open_multipart_upload(client, upload_key, f"{uuid4()}_{filename}", offset)
+
+            _, uploads = await receive_upload(request, open_sink=open_sink, sniff=False)
+            if not uploads:
+                raise HTTPException(status_code=400, detail="No file uploaded.")
+            writer = uploads[0]
+
+            # Save metadata to DB
+            filename = writer.key.split("_", 1)[-1]
+            await media_service.save_media_metadata(
+                filename=filename,
+                r2_key=writer.key,
+                content_type=mimetypes.guess_type(filename)[0],
+                size=writer.size
+            )
+
+            return {"message": "Upload successful", "key": writer.key, "upload_key": upload_key}
+        except Exception as e:
+            if not resumable:
+                await _abort_quietly(client, upload_key)
+            if isinstance(e, HTTPException):
+                raise _upload_error(e.status_code, e.detail, upload_key, e.headers)
+            raise _upload_error(500, str(e), upload_key)
+
+def _upload_error(status_code: int, message, upload_key: str, headers=None) -> HTTPException:
+    """HTTPException whose body names the upload key, so the client can resume or cancel."""
+    return HTTPException(status_code=status_code, detail={"error": message, "upload_key": upload_key}, headers=headers)
+
+async def _abort_quietly(client, upload_key: str) -> None:
+    try:
+        await abort_upload(client, upload_key)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        print(f"[WARN] Could not abort upload {upload_key}: {e}")
+
+@router.get("/media/upload/{upload_key}")
+async def upload_status(upload_key: str):
+    """Where an interrupted upload can resume from."""
+    status = get_upload(upload_key)
+    if status is None:
+        raise HTTPException(status_code=404, detail="No unfinished upload with that key.")
+    return status
+
+@router.delete("/media/upload/{upload_key}")
+async def cancel_upload(upload_key: str):
+    """Abandon an unfinished upload (aborts it on R2)."""
+    async with media_service.r2_client() as client:
+        if not await abort_upload(client, upload_key):
+            raise HTTPException(status_code=404, detail="No unfinished upload with that key.")
+    return {"message": "Upload cancelled", "upload_key": upload_key}
+
+@router.get("/media/playlist/{playlist}/urls")
+async def playlist_urls(playlist: str, expires_in: int = 3600):
+    """Presigned URLs for all R2 assets in a playlist, in one batch."""
+    return await media_service.presign_playlist(playlist, expires_in)
+
+@router.get("/media/r2/stats")
+async def r2_stats():
+    """Shared R2 client health, connection-pool saturation and presign cache counters."""
+    return {**r2.stats(), "presign_cache": presign_cache.stats()}
@@ -7,7 +7,6 @@ Purpose: Playlist management interface (view, add, delete, update color, reorder
 
 from fastapi import APIRouter, Request, Form
 from fastapi.responses import RedirectResponse, HTMLResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
 from starlette.status import HTTP_302_FOUND
 from typing import List
 
@@ -15,42 +14,46 @@ from app.services.playlist_service import (
     add_playlist,
     update_playlist_color,
     delete_playlist,
-    backfill_playlists_from_metadata,
+    backfill_playlists_if_stale,
     get_playlist_images,
     set_playlist_images,
     remove_image_from_playlist,
-    sync_playlists_to_state,
     get_assigned_devices_by_playlist,
-    load_playlists
+    load_playlists,
+    playlist_store,
 )
-from app.services.metadata_service import load_metadata
-from app.services.device_service import load_devices
+from app.services.metadata_service import metadata_store
+from app.services.device_service import device_assignments, devices_view
+from app.services.page_cache import page_cache
+from app.templating import templates
 from app.utils.context_helpers import inject_user_context
 
-templates = Jinja2Templates(directory="app/templates")
 router = APIRouter()
 
 # === GET: Playlist Management Screen ===
+# Served from the page cache until metadata / playlists / device assignments change
+# (heartbeat flushes only touch last_seen, which this page doesn't show)
 @router.get("/", response_class=HTMLResponse)
 async def view_playlists(request: Request):
-    metadata = load_metadata()
-    backfill_playlists_from_metadata(metadata)
-    sync_playlists_to_state()  # Ensure app.state.playlists is current
+    backfill_playlists_if_stale()
 
-    # Load devices and compute assigned devices
-    devices = load_devices()
-    assigned_devices = get_assigned_devices_by_playlist(devices)
+    def render():
+        # Load devices and compute assigned devices
+        devices = devices_view()
+        assigned_devices = get_assigned_devices_by_playlist(devices)
 
-    playlists = load_playlists()
-    for pl_name in playlists:
-        playlists[pl_name]["devices"] = assigned_devices.get(pl_name, [])
+        playlists = load_playlists()
+        for pl_name in playlists:
+            playlists[pl_name]["devices"] = assigned_devices.get(pl_name, [])
 
-    return templates.TemplateResponse("playlists.html", inject_user_context(
-        request,
-        playlists=playlists,
-        message=request.query_params.get("msg"),
-        error=request.query_params.get("err")
-    ))
+        return templates.TemplateResponse("playlists.html", inject_user_context(
+            request,
+            playlists=playlists,
+            message=request.query_params.get("msg"),
+            error=request.query_params.get("err")
+        ))
+
+    return page_cache.respond(request, "playlists", (metadata_store, playlist_store, device_assignments), render)
 
 # === POST: Add a New Playlist ===
 @router.post("/add")
@@ -1,9 +1,9 @@
 # app/routes/ui.py
 from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 
-templates = Jinja2Templates(directory="app/templates")
+from app.templating import templates
+
 router = APIRouter()
 
 @router.get("/", response_class=HTMLResponse)
@@ -6,23 +6,40 @@ Updates:
   • When a file is uploaded, we ALSO append the filename to the
     playlists.json entry for each selected playlist, making the
     new accordion + drag-and-drop UI work.
+  • The body is streamed to disk by upload_engine (no spooling, no
+    blocking copy on the event loop); store writes run in a thread.
+  • Files are stored content-addressed (see object_store): the filename
+    maps to a digest in metadata, so re-uploading a name never overwrites
+    bytes a cached URL points at, and identical files are stored once.
+  • POST /upload/batch takes many files at once: bodies are committed
+    concurrently and metadata.json / playlists.json are written once per
+    batch instead of once per file.
+  • Store writes are atomic updates (update_metadata / update_playlists),
+    so concurrent uploads running in threads never overwrite each other.
+  • MP4 / WebM videos are probed (duration, codec, size) before they are
+    stored; the result is kept in the entry's "video" field and videos get
+    no image renditions.
 """
 
-from fastapi import APIRouter, UploadFile, File, Form, Request, HTTPException
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import HTMLResponse, JSONResponse
 from datetime import datetime
 from pathlib import Path
-from typing import List
-import shutil
+from typing import Dict, List, Optional, Tuple
+import asyncio
 
 # Internal services
-from app.services.metadata_service import load_metadata, save_metadata
-from app.services.playlist_service import load_playlists, save_playlists
+from app.config import MAX_BATCH_BYTES, MAX_BATCH_FILES
+from app.services.metadata_service import update_metadata
+from app.services.object_store import media_url, release
+from app.services.playlist_service import load_playlists, update_playlists
+from app.services.rendition_service import schedule_renditions
+from app.services.upload_engine import receive_upload
+from app.services.video_service import VIDEO_MEDIA_TYPES, VideoProbeError, probe_video
+from app.templating import templates
 from app.utils.context_helpers import inject_user_context
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 # ---------- Constants ---------------------------------------------------
 UPLOAD_DIR = Path("app/static/uploads")
@@ -46,92 +63,319 @@ async def upload(request: Request):
     response_class=HTMLResponse,
     summary="Upload an image and assign playlists + dates",
 )
-async def upload_file(
-    request: Request,
-    file: UploadFile = File(...),
-    start_date: str = Form(...),
-    end_date: str = Form(...),
-    playlists: List[str] = Form(default=[]),
-    new_playlist: str = Form(default=None),
-    new_color: str = Form(default=None),
-):
-    # 1️⃣ Validate date range ------------------------------------------------
+async def upload_file(request: Request):
+    """
+    Multipart fields: file, start_date, end_date, playlists (repeatable),
+    new_playlist, new_color. The body is streamed to disk by upload_engine;
+    the store updates run in a worker thread.
+    """
+    # 1️⃣ Stream the body to a temp file (hashed, size-limited, sniffed) -----
+    form, uploads = await receive_upload(request)
     try:
-        start = datetime.strptime(start_date, "%Y-%m-%d").date()
-        end = datetime.strptime(end_date, "%Y-%m-%d").date()
-        if end < start:
-            raise HTTPException(
-                status_code=400, detail="End date must not precede start date."
-            )
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid date format (YYYY-MM-DD).")
-
-    # 2️⃣ Load playlists.json -------------------------------------------------
-    all_playlists = load_playlists()
-
-    # 3️⃣ Optionally create a new playlist from the form ----------------------
-    if new_playlist:
-        pname = new_playlist.strip()
-        if pname and pname not in all_playlists:
-            # Create entry in modern structure: {color, images, devices}
-            all_playlists[pname] = {
-                "color": new_color or "#cccccc",
-                "images": [],
-                "devices": [],
-            }
-            playlists.append(pname)  # auto-select the new playlist
-
-    # 4️⃣ Persist uploaded file to /uploads ----------------------------------
-    filepath = UPLOAD_DIR / file.filename
-    with open(filepath, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    # 5️⃣ Update metadata.json (date + playlist tags only) -------------------
-    metadata = load_metadata()
-    metadata[file.filename] = {
-        "start": start_date,
-        "end": end_date,
-        "playlists": playlists,
-    }
-    save_metadata(metadata)
-
-    # 6️⃣ Back-fill playlists.json with the image ----------------------------
-    for pl in playlists:
-        entry = all_playlists.get(pl)
+        if not uploads:
+            raise HTTPException(status_code=400, detail="No file uploaded.")
+        upload = uploads[0]
+        start_date = _form_value(form, "start_date")
+        end_date = _form_value(form, "end_date")
 
-        # ▶ Legacy entry is just a color string
-        if isinstance(entry, str):
-            all_playlists[pl] = entry = {
-                "color": entry,
-                "images": [],
-                "devices": [],
-            }
+        # 2️⃣ Validate date range --------------------------------------------
+        _check_dates(start_date, end_date)
 
-        # Ensure keys exist
-        entry.setdefault("images", [])
-        entry.setdefault("devices", [])
+        # 3️⃣ Move the bytes into their content-addressed place ----------------
+        stored = await asyncio.to_thread(_store, upload)
+    finally:
+        for leftover in uploads:
+            leftover.discard()
 
-        # Append filename if not already present
-        if file.filename not in entry["images"]:
-            entry["images"].append(file.filename)
+    playlists = form.get("playlists", [])
+    entry, all_playlists = await asyncio.to_thread(
+        _record_upload,
+        upload.filename,
+        stored,
+        start_date,
+        end_date,
+        playlists,
+        _form_value(form, "new_playlist"),
+        _form_value(form, "new_color"),
+    )
 
-    # Persist playlists.json after mutation
-    save_playlists(all_playlists)
+    # Render 720p/1080p/4K variants in the background (recorded in metadata when done)
+    if "renditions" not in entry and "video" not in entry:
+        schedule_renditions(upload.filename)
 
-    # 7️⃣ Build pill data for the success page -------------------------------
+    # 8️⃣ Build pill data for the success page -------------------------------
     playlist_pills = [
         {"name": name, "color": all_playlists.get(name, {}).get("color", "#cccccc")}
         for name in playlists
     ]
 
-    # 8️⃣ Render upload_success.html -----------------------------------------
+    # 9️⃣ Render upload_success.html -----------------------------------------
     return templates.TemplateResponse(
         "upload_success.html",
         inject_user_context(
             request,
-            filename=file.filename,
+            filename=upload.filename,
+            file_url=media_url(upload.filename, entry),
+            video=entry.get("video"),
             start_date=start_date,
             end_date=end_date,
             playlist_pills=playlist_pills,
         ),
     )
+
+
+# ---------- POST: Handle a batch of uploads ----------------------------
+@router.post(
+    "/upload/batch",
+    summary="Upload many images with shared or per-file dates + playlists",
+)
+async def upload_batch(request: Request):
+    """
+    Multipart fields: file / files (repeatable), start_date, end_date,
+    playlists (repeatable), new_playlist, new_color. start_date, end_date and
+    playlists can be overridden per file as `<field>.<n>`, where n is the
+    file's 0-based position in the body (e.g. `end_date.3`).
+
+    Each file succeeds or fails on its own; the response reports every file
+    in body order. Browser form posts get a summary page instead of JSON.
+    """
+    # 1️⃣ Stream every file to a temp file; bad files are rejected one by one
+    form, uploads = await receive_upload(
+        request,
+        file_fields=("file", "files"),
+        max_body_bytes=MAX_BATCH_BYTES,
+        max_files=MAX_BATCH_FILES,
+        per_file_errors=True,
+    )
+    results = [
+        {"filename": upload.filename, "status": "error", "detail": upload.error}
+        for upload in uploads
+    ]
+    items = []    # (position, filename, stored, start, end, playlists)
+    try:
+        if not uploads:
+            raise HTTPException(status_code=400, detail="No files uploaded.")
+
+        # 2️⃣ Resolve and validate each file's dates / playlists --------------
+        accepted = []
+        for n, upload in enumerate(uploads):
+            if upload.error:
+                continue
+            start_date = _form_value(form, f"start_date.{n}") or _form_value(form, "start_date")
+            end_date = _form_value(form, f"end_date.{n}") or _form_value(form, "end_date")
+            try:
+                _check_dates(start_date, end_date)
+            except HTTPException as e:
+                results[n]["detail"] = e.detail
+                continue
+            playlists = [p for p in form.get(f"playlists.{n}", form.get("playlists", [])) if p]
+            accepted.append((n, upload, start_date, end_date, playlists))
+
+        # 3️⃣ Move all bodies into the object store concurrently --------------
+        stored = await asyncio.gather(
+            *(asyncio.to_thread(_store, upload) for _, upload, *_ in accepted),
+            return_exceptions=True,
+        )
+    finally:
+        for leftover in uploads:
+            leftover.discard()
+
+    for (n, upload, start_date, end_date, playlists), record in zip(accepted, stored):
+        if isinstance(record, HTTPException):
+            results[n]["detail"] = record.detail
+            continue
+        if isinstance(record, BaseException):
+            print(f"[WARN] Could not store {upload.filename}: {record}")
+            results[n]["detail"] = "Could not store the file."
+            continue
+        items.append((n, upload.filename, record, start_date, end_date, playlists))
+
+    # 4️⃣ One metadata.json + one playlists.json write for the whole batch ---
+    all_playlists = {}
+    if items:
+        entries, all_playlists = await asyncio.to_thread(
+            _record_batch,
+            [item[1:] for item in items],
+            _form_value(form, "new_playlist"),
+            _form_value(form, "new_color"),
+        )
+        rendering = set()
+        for (n, filename, record, start_date, end_date, playlists), entry in zip(items, entries):
+            results[n] = {
+                "filename": filename,
+                "status": "ok",
+                "url": media_url(filename, entry),
+                "digest": record["digest"],
+                "size": record["size"],
+                "deduplicated": record["deduplicated"],
+                "start": start_date,
+                "end": end_date,
+                "playlists": playlists,
+                "video": entry.get("video"),
+            }
+            # One render per distinct image (renditions are shared by digest)
+            if "renditions" not in entry and "video" not in entry and record["digest"] not in rendering:
+                rendering.add(record["digest"])
+                schedule_renditions(filename)
+
+    uploaded = sum(1 for r in results if r["status"] == "ok")
+    report = {"uploaded": uploaded, "failed": len(results) - uploaded, "results": results}
+    if "text/html" not in request.headers.get("accept", ""):
+        return JSONResponse(report)
+
+    # Form post from upload.html: summary page with playlist pills per file
+    for result in results:
+        result["playlist_pills"] = [
+            {"name": name, "color": all_playlists.get(name, {}).get("color", "#cccccc")}
+            for name in result.get("playlists", [])
+        ]
+    return templates.TemplateResponse(
+        "upload_batch_success.html",
+        inject_user_context(request, **report),
+    )
+
+
+def _form_value(form: Dict[str, List[str]], name: str) -> Optional[str]:
+    values = form.get(name)
+    return values[0] if values else None
+
+
+def _store(upload) -> Dict:
+    """
+    Commit an upload's bytes (blocking; runs in a thread). Videos are probed
+    first, so a container the display cannot play is refused with 415
+    before it is stored.
+    """
+    video = None
+    if upload.media_type in VIDEO_MEDIA_TYPES:
+        try:
+            video = probe_video(upload.tmp_path, upload.media_type)
+        except VideoProbeError as e:
+            raise HTTPException(status_code=415, detail=f"{upload.filename}: {e}")
+    stored = upload.commit()
+    if video is not None:
+        stored["video"] = video
+    return stored
+
+
+def _check_dates(start_date: Optional[str], end_date: Optional[str]) -> None:
+    if not start_date or not end_date:
+        raise HTTPException(status_code=400, detail="Start and end dates are required.")
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format (YYYY-MM-DD).")
+    if end < start:
+        raise HTTPException(
+            status_code=400, detail="End date must not precede start date."
+        )
+
+
+def _record_upload(
+    filename: str,
+    stored: Dict,
+    start_date: str,
+    end_date: str,
+    playlists: List[str],
+    new_playlist: Optional[str],
+    new_color: Optional[str],
+) -> Tuple[Dict, Dict]:
+    """
+    Blocking part of an upload (store reads/writes); runs off the event loop.
+    `playlists` is extended in place with a newly created playlist.
+    Returns (metadata entry, all playlists).
+    """
+    entries, all_playlists = _record_batch(
+        [(filename, stored, start_date, end_date, playlists)], new_playlist, new_color
+    )
+    return entries[0], all_playlists
+
+
+def _record_batch(
+    items: List[Tuple[str, Dict, str, str, List[str]]],
+    new_playlist: Optional[str],
+    new_color: Optional[str],
+) -> Tuple[List[Dict], Dict]:
+    """
+    Record (filename, stored object, start, end, playlists) items with one
+    atomic update of each store. A new playlist is added to every item's
+    `playlists` (in place). Returns (metadata entries, all playlists).
+    """
+    pname = (new_playlist or "").strip()
+
+    # 4️⃣ playlists.json: optionally create the new playlist, add the images ----
+    def add_images(all_playlists: Dict) -> Dict:
+        if pname:
+            if pname not in all_playlists:
+                # Create entry in modern structure: {color, images, devices}
+                all_playlists[pname] = {
+                    "color": new_color or "#cccccc",
+                    "images": [],
+                    "devices": [],
+                }
+            # Auto-select it even if a concurrent upload created it first
+            for item in items:
+                if pname not in item[4]:
+                    item[4].append(pname)
+        for filename, _, _, _, playlists in items:
+            _add_to_playlists(all_playlists, filename, playlists)
+        return all_playlists
+
+    all_playlists = update_playlists(add_images)
+
+    # 5️⃣ metadata.json (dates, playlist tags, digest → object) ---------------
+    entries, replaced = [], []
+
+    def record_entries(metadata: Dict) -> Dict:
+        entries.clear()
+        replaced.clear()
+        for filename, stored, start_date, end_date, playlists in items:
+            previous = metadata.get(filename)
+            entry = {
+                "start": start_date,
+                "end": end_date,
+                "playlists": playlists,
+                "digest": stored["digest"],
+                "object": stored["object"],
+            }
+            if stored.get("video") is not None:
+                entry["video"] = stored["video"]
+            if previous and previous.get("digest") == stored["digest"] and previous.get("renditions"):
+                entry["renditions"] = previous["renditions"]
+            metadata[filename] = entry
+            entries.append(entry)
+            if previous and previous.get("object") != stored["object"]:
+                replaced.append((filename, previous))
+        return metadata
+
+    metadata = update_metadata(record_entries)
+
+    # Re-upload under an existing name: drop the old bytes unless still shared
+    for filename, previous in replaced:
+        release(filename, previous, metadata)
+
+    return entries, all_playlists
+
+
+def _add_to_playlists(all_playlists: Dict, filename: str, playlists: List[str]) -> None:
+    for pl in playlists:
+        entry_pl = all_playlists.get(pl)
+
+        # ▶ Legacy entry is just a color string
+        if isinstance(entry_pl, str):
+            all_playlists[pl] = entry_pl = {
+                "color": entry_pl,
+                "images": [],
+                "devices": [],
+            }
+        if entry_pl is None:
+            continue
+
+        # Ensure keys exist
+        entry_pl.setdefault("images", [])
+        entry_pl.setdefault("devices", [])
+
+        # Append filename if not already present
+        if filename not in entry_pl["images"]:
+            entry_pl["images"].append(filename)
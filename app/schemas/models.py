@@ -1,7 +1,7 @@
 # app/schemas/models.py
 
-from typing import List
-from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
+from pydantic import BaseModel, Field, model_validator
 
 
 # === FileMetadata Schema ===
@@ -18,3 +18,37 @@ class FileMetadata(BaseModel):
 class PlaylistEntry(BaseModel):
     name: str                                # Playlist name (e.g., "Lobby")
     color: str = Field("#e0e0e0", example="#e0e0e0")  # Hex color for pill UI
+
+
+# === Bulk device operations (POST /devices/bulk) ===
+# Which devices to touch: explicit IDs, or every device matching all given keys.
+# An empty selector would match the whole fleet, so that needs an explicit all: true.
+class DeviceSelector(BaseModel):
+    all: bool = False                            # required to target every device
+    playlist: Optional[str] = None               # active_playlist ("" = unassigned)
+    active: Optional[bool] = None
+    name_contains: Optional[str] = None
+    license_expires_before: Optional[str] = Field(None, example="2025-07-01")
+
+    @model_validator(mode="after")
+    def _not_empty(self):
+        filters = (self.playlist, self.active, self.name_contains, self.license_expires_before)
+        if not self.all and all(value is None for value in filters):
+            raise ValueError('Empty selector: give at least one filter, or "all": true for every device.')
+        return self
+
+
+# What to do to them (all optional; applied in this order)
+class DeviceOperations(BaseModel):
+    rename: Dict[str, str] = {}                  # device_id → new name
+    assign_playlist: Optional[str] = None        # "" unassigns
+    active: Optional[bool] = None
+    rotate_token: bool = False
+    renew_license: Optional[Literal["monthly", "yearly"]] = None
+
+
+class DeviceBulkRequest(BaseModel):
+    device_ids: List[str] = []
+    selector: Optional[DeviceSelector] = None
+    operations: DeviceOperations
+    dry_run: bool = False
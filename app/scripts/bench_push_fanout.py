@@ -0,0 +1,69 @@
+# app/scripts/bench_push_fanout.py
+
+"""
+Benchmark: fan-out latency of the display push broker.
+
+Simulates N display connections (one consumer task per subscriber, as the
+SSE handler does) on a single event loop, publishes change events and
+reports publish→receive latency across all subscribers.
+
+Usage:
+    python -m app.scripts.bench_push_fanout [--subscribers 5000] [--rounds 20]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.services.push_service import PushBroker
+
+
+async def run(subscribers: int, rounds: int) -> None:
+    broker = PushBroker()
+    latencies = []
+    received = 0
+    published_at = 0.0
+    all_received = asyncio.Event()
+
+    async def consumer(device_id: str):
+        nonlocal received
+        subscriber = broker.subscribe(device_id)
+        while True:
+            await subscriber.queue.get()
+            latencies.append(time.perf_counter() - published_at)
+            received += 1
+            if received == subscribers:
+                all_received.set()
+
+    device_ids = [f"device_{i:05d}" for i in range(subscribers)]
+    tasks = [asyncio.create_task(consumer(d)) for d in device_ids]
+    await asyncio.sleep(0)  # Let every consumer subscribe
+
+    round_times = []
+    for _ in range(rounds):
+        received = 0
+        all_received.clear()
+        published_at = time.perf_counter()
+        broker.publish(device_ids)
+        await all_received.wait()
+        round_times.append(time.perf_counter() - published_at)
+
+    for task in tasks:
+        task.cancel()
+
+    latencies.sort()
+    ms = lambda s: s * 1000
+    print(f"{subscribers:,} subscribers × {rounds} events, 1 event loop")
+    print(f"  last subscriber reached   median {ms(statistics.median(round_times)):.1f} ms, max {ms(max(round_times)):.1f} ms")
+    print(f"  per-subscriber latency    p50 {ms(latencies[len(latencies) // 2]):.1f} ms, "
+          f"p99 {ms(latencies[int(len(latencies) * 0.99)]):.1f} ms")
+    print(f"  evictions                 {broker.evictions}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark display push fan-out")
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.subscribers, args.rounds))
@@ -0,0 +1,103 @@
+# app/scripts/bench_schedule_index.py
+
+"""
+Benchmark: schedule index vs. the old linear metadata scan.
+
+Usage:
+    python -m app.scripts.bench_schedule_index [--entries 100000] [--queries 200]
+"""
+
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from app.services.schedule_index import ScheduleIndex
+
+
+def make_metadata(n: int, playlists: int = 50) -> dict:
+    """Synthetic metadata: ~3 years of 1–60 day windows spread over `playlists` playlists."""
+    rng = random.Random(42)
+    base = date(2024, 1, 1)
+    metadata = {}
+    for i in range(n):
+        start = base + timedelta(days=rng.randrange(3 * 365))
+        end = start + timedelta(days=rng.randrange(1, 60))
+        metadata[f"asset_{i:06d}.png"] = {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "playlists": [f"Playlist {rng.randrange(playlists)}" for _ in range(rng.randrange(1, 4))],
+        }
+    return metadata
+
+
+# === Old implementation (metadata_service.get_active_images before the index) ===
+def linear_active(metadata: dict, today: date, playlist: str = None) -> list:
+    active = []
+    for filename, info in metadata.items():
+        try:
+            start = datetime.strptime(info["start"], "%Y-%m-%d").date()
+            end = datetime.strptime(info["end"], "%Y-%m-%d").date()
+            if start <= today <= end and (playlist is None or playlist in info["playlists"]):
+                active.append(filename)
+        except Exception:
+            pass
+    return active
+
+
+def linear_expiring(metadata: dict, days: int, today: date) -> list:
+    horizon = today + timedelta(days=days)
+    return [
+        f for f, info in metadata.items()
+        if today <= datetime.strptime(info["end"], "%Y-%m-%d").date() <= horizon
+    ]
+
+
+def timed(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def main(entries: int, queries: int) -> None:
+    metadata = make_metadata(entries)
+    today = date(2025, 6, 15)
+    linear_repeat = max(1, queries // 50)
+
+    t0 = time.perf_counter()
+    index = ScheduleIndex()
+    index.rebuild(metadata, version=1)
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    assert sorted(index.active_on(today)) == sorted(linear_active(metadata, today))
+    assert sorted(index.active_in_playlist("Playlist 7", today)) == sorted(linear_active(metadata, today, "Playlist 7"))
+    assert sorted(index.expiring_within(7, today)) == sorted(linear_expiring(metadata, 7, today))
+
+    rows = [
+        ("active on D", lambda: linear_active(metadata, today), lambda: index.active_on(today)),
+        ("active in playlist on D", lambda: linear_active(metadata, today, "Playlist 7"),
+         lambda: index.active_in_playlist("Playlist 7", today)),
+        ("expiring within 7 days", lambda: linear_expiring(metadata, 7, today),
+         lambda: index.expiring_within(7, today)),
+    ]
+
+    print(f"{entries:,} entries — index build {build_ms:.0f} ms")
+    print(f"{'query':<26}{'linear ms':>12}{'index ms':>12}{'speedup':>10}")
+    for name, linear_fn, index_fn in rows:
+        linear_ms = timed(linear_fn, linear_repeat)
+        index_ms = timed(index_fn, queries)
+        print(f"{name:<26}{linear_ms:>12.2f}{index_ms:>12.3f}{linear_ms / index_ms:>9.0f}x")
+
+    t0 = time.perf_counter()
+    for i in range(queries):
+        index.put(f"asset_{i:06d}.png", {"start": "2025-06-01", "end": "2025-06-30", "playlists": ["Playlist 1"]})
+    print(f"{'incremental update':<26}{'':>12}{(time.perf_counter() - t0) / queries * 1000:>12.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the metadata schedule index")
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    main(args.entries, args.queries)
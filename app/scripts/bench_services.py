@@ -0,0 +1,331 @@
+# app/scripts/bench_services.py
+
+"""
+Benchmark: the hot service functions at fleet sizes (1k / 10k / 100k devices,
+assets and playlist entries), recorded as JSON baselines and compared against
+them so a regression fails the run.
+
+Cases (each on its own temp JsonStore, swapped in for the module's store):
+  • load_devices (cold)          first load after devices.json changed: parse + freeze + copy
+  • load_devices (warm)          cached: the mutable deep copy only
+  • save_devices                 one device's last_seen changed, then saved
+  • load_playlists (cold)        parse + the _upgrade_playlists normaliser
+  • load_playlists (legacy)      cold load where every playlist is a legacy "color" string
+  • get_active_images (rebuild)  schedule index rebuilt after a metadata change
+  • get_active_images (warm)     index current: the query only
+  • update_playlist_device_assignments
+  • backfill_playlists_from_metadata   every referenced playlist already exists
+
+Size N means N devices, N metadata entries and N playlist entries spread over
+max(10, N / 100) playlists. Timings are per call; each case runs until it
+has --min-runs calls and --min-time seconds, after one untimed warm-up call,
+with the garbage collector paused during each call (as timeit does).
+
+Baselines are machine-specific: record them on the machine that compares.
+`compare` exits 1 when a case's best time is more than --threshold slower
+than the baseline (and slower by more than --floor-ms, so sub-millisecond
+noise does not fail it).
+
+Usage:
+    python -m app.scripts.bench_services run [--sizes 1000 10000 100000] [--only load_devices] [--save]
+    python -m app.scripts.bench_services compare [--baseline app/scripts/baselines/services.json]
+        [--results current.json] [--threshold 0.25] [--floor-ms 0.5]
+"""
+
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from app.config import STORE_MODE
+from app.scripts.bench_schedule_index import make_metadata
+from app.services import device_service, metadata_service, playlist_service
+from app.services.json_store import JsonStore
+from app.services.schedule_index import ScheduleIndex
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "services.json"
+TODAY = date(2025, 6, 15)
+
+
+# === Synthetic data ===
+
+def playlist_count(size: int) -> int:
+    return max(10, size // 100)
+
+
+def make_devices(size: int) -> Dict:
+    playlists = playlist_count(size)
+    return {
+        f"device-{i:06d}": {
+            "name": f"Screen {i}",
+            "active_playlist": f"Playlist {i % playlists}",
+            "auth_token": f"{i:08x}-0000-4000-8000-{i:012x}",
+            "active": i % 10 != 0,
+            "last_seen": "2025-06-14T08:30:00",
+            "screen": {"width": 1920, "height": 1080, "webp": True},
+        }
+        for i in range(size)
+    }
+
+
+def make_playlists(metadata: Dict, size: int) -> Dict:
+    """One entry per asset, in the first playlist its metadata names."""
+    playlists = {
+        f"Playlist {i}": {"color": "#3b82f6", "images": [], "devices": []}
+        for i in range(playlist_count(size))
+    }
+    for filename, meta in metadata.items():
+        playlists[meta["playlists"][0]]["images"].append(filename)
+    return playlists
+
+
+def make_legacy_playlists(size: int) -> Dict:
+    return {f"Playlist {i}": "#3b82f6" for i in range(size)}
+
+
+# === Store swapping ===
+
+@contextmanager
+def swapped_store(module, attribute: str, path: Path, data: Dict, upgrade=None) -> Iterator[JsonStore]:
+    """Point `module.<attribute>` at a fresh JsonStore over `data` for the duration."""
+    path.write_text(json.dumps(data))
+    store = JsonStore(path, upgrade=upgrade, mode=STORE_MODE)
+    original = getattr(module, attribute)
+    setattr(module, attribute, store)
+    try:
+        yield store
+    finally:
+        setattr(module, attribute, original)
+
+
+@contextmanager
+def metadata_fixture(workdir: Path, metadata: Dict) -> Iterator[JsonStore]:
+    """Metadata store plus a fresh schedule index (its version is per store)."""
+    original_index = metadata_service._schedule
+    metadata_service._schedule = ScheduleIndex()
+    try:
+        with swapped_store(metadata_service, "metadata_store", workdir / "metadata.json", metadata) as store:
+            yield store
+    finally:
+        metadata_service._schedule = original_index
+
+
+@contextmanager
+def playlist_fixture(workdir: Path, playlists: Dict) -> Iterator[JsonStore]:
+    with swapped_store(playlist_service, "playlist_store", workdir / "playlists.json", playlists,
+                       upgrade=playlist_service._upgrade_playlists) as store:
+        yield store
+
+
+# === Cases ===
+# Each case takes (size, workdir) and yields the callable to time, with its
+# stores in place until the generator is closed.
+
+def case_load_devices_cold(size: int, workdir: Path):
+    with swapped_store(device_service, "device_store", workdir / "devices.json", make_devices(size)) as store:
+        def run():
+            store.bump()
+            device_service.load_devices()
+        yield run
+
+
+def case_load_devices_warm(size: int, workdir: Path):
+    with swapped_store(device_service, "device_store", workdir / "devices.json", make_devices(size)):
+        yield device_service.load_devices
+
+
+def case_save_devices(size: int, workdir: Path):
+    with swapped_store(device_service, "device_store", workdir / "devices.json", make_devices(size)):
+        devices = device_service.load_devices()
+        target = devices["device-000000"]
+
+        def run():
+            target["last_seen"] = datetime.utcnow().isoformat()
+            device_service.save_devices(devices)
+        yield run
+
+
+def case_load_playlists_cold(size: int, workdir: Path):
+    playlists = make_playlists(make_metadata(size, playlist_count(size)), size)
+    with playlist_fixture(workdir, playlists) as store:
+        def run():
+            store.bump()
+            playlist_service.load_playlists()
+        yield run
+
+
+def case_load_playlists_legacy(size: int, workdir: Path):
+    with playlist_fixture(workdir, make_legacy_playlists(size)) as store:
+        def run():
+            store.bump()
+            playlist_service.load_playlists()
+        yield run
+
+
+def case_active_images_rebuild(size: int, workdir: Path):
+    with metadata_fixture(workdir, make_metadata(size, playlist_count(size))):
+        def run():
+            metadata_service._schedule.version = None
+            metadata_service.get_active_images(TODAY)
+        yield run
+
+
+def case_active_images_warm(size: int, workdir: Path):
+    with metadata_fixture(workdir, make_metadata(size, playlist_count(size))):
+        yield lambda: metadata_service.get_active_images(TODAY)
+
+
+def case_update_assignments(size: int, workdir: Path):
+    playlists = make_playlists(make_metadata(size, playlist_count(size)), size)
+    devices = make_devices(size)
+    with playlist_fixture(workdir, playlists):
+        yield lambda: playlist_service.update_playlist_device_assignments(devices)
+
+
+def case_backfill(size: int, workdir: Path):
+    metadata = make_metadata(size, playlist_count(size))
+    with playlist_fixture(workdir, make_playlists(metadata, size)):
+        yield lambda: playlist_service.backfill_playlists_from_metadata(metadata)
+
+
+CASES: Dict[str, Callable] = {
+    "load_devices (cold)": case_load_devices_cold,
+    "load_devices (warm)": case_load_devices_warm,
+    "save_devices": case_save_devices,
+    "load_playlists (cold)": case_load_playlists_cold,
+    "load_playlists (legacy)": case_load_playlists_legacy,
+    "get_active_images (rebuild)": case_active_images_rebuild,
+    "get_active_images (warm)": case_active_images_warm,
+    "update_playlist_device_assignments": case_update_assignments,
+    "backfill_playlists_from_metadata": case_backfill,
+}
+
+
+# === Runner ===
+
+def measure(case: Callable, size: int, min_runs: int, min_time: float) -> Dict:
+    with tempfile.TemporaryDirectory(prefix="loopi-bench-") as tmp:
+        cases = case(size, Path(tmp))
+        try:
+            run = next(cases)
+            run()  # Warm-up: first-call imports, allocator, page cache
+            samples: List[float] = []
+            started = time.perf_counter()
+            while len(samples) < min_runs or time.perf_counter() - started < min_time:
+                gc.collect()
+                gc.disable()  # As timeit does: a collection landing mid-call is noise
+                try:
+                    t0 = time.perf_counter()
+                    run()
+                    samples.append((time.perf_counter() - t0) * 1000)
+                finally:
+                    gc.enable()
+        finally:
+            cases.close()
+    return {
+        "best_ms": round(min(samples), 4),
+        "median_ms": round(statistics.median(samples), 4),
+        "runs": len(samples),
+    }
+
+
+def run_suite(sizes, only: Optional[List[str]] = None, min_runs: int = 5, min_time: float = 1.0,
+              verbose: bool = True) -> Dict:
+    names = [name for name in CASES if not only or any(name.startswith(prefix) for prefix in only)]
+    results: Dict[str, Dict[str, Dict]] = {}
+    if verbose:
+        print(f"{'case':<36}{'size':>9}{'best ms':>12}{'median ms':>12}{'runs':>7}")
+    for name in names:
+        for size in sizes:
+            result = measure(CASES[name], size, min_runs, min_time)
+            results.setdefault(name, {})[str(size)] = result
+            if verbose:
+                print(f"{name:<36}{size:>9,}{result['best_ms']:>12.3f}{result['median_ms']:>12.3f}{result['runs']:>7}")
+    return {
+        "meta": {
+            "recorded": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "store_mode": STORE_MODE,
+            "sizes": list(sizes),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float, floor_ms: float) -> List[str]:
+    """Print the comparison; return the regressed "case @ size" labels."""
+    regressions = []
+    print(f"{'case':<36}{'size':>9}{'baseline ms':>13}{'current ms':>12}{'change':>9}")
+    for name, by_size in baseline["results"].items():
+        for size, before in by_size.items():
+            after = current["results"].get(name, {}).get(size)
+            if after is None:
+                print(f"[WARN] {name} @ {size}: not in the current results")
+                continue
+            old, new = before["best_ms"], after["best_ms"]
+            change = (new - old) / old if old else 0.0
+            regressed = change > threshold and new - old > floor_ms
+            mark = "✘" if regressed else "✔"
+            print(f"{name:<36}{int(size):>9,}{old:>13.3f}{new:>12.3f}{change:>+9.0%} {mark}")
+            if regressed:
+                regressions.append(f"{name} @ {size}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the hot service functions against JSON baselines")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the suite and print / save the results")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    run_parser.add_argument("--only", nargs="+", help="Case name prefixes to run (e.g. load_devices save_devices)")
+    run_parser.add_argument("--output", type=Path, help="Write the results to this JSON file")
+    run_parser.add_argument("--save", action="store_true", help="Write the results as the new baseline")
+
+    compare_parser = commands.add_parser("compare", help="Fail when results regress against the baseline")
+    compare_parser.add_argument("--results", type=Path, help="Results JSON to check (default: run the suite now)")
+    compare_parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown (0.25 = 25%%)")
+    compare_parser.add_argument("--floor-ms", type=float, default=0.5, help="Ignore slowdowns smaller than this")
+
+    for sub in (run_parser, compare_parser):
+        sub.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+        sub.add_argument("--min-runs", type=int, default=5)
+        sub.add_argument("--min-time", type=float, default=1.0, help="Seconds per case and size")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = run_suite(args.sizes, args.only, args.min_runs, args.min_time)
+        for path in filter(None, (args.output, args.baseline if args.save else None)):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(results, indent=2) + "\n")
+            print(f"[✔] Results written to {path}")
+        return
+
+    if not args.baseline.exists():
+        sys.exit(f"[✘] No baseline at {args.baseline} (record one with: run --save)")
+    baseline = json.loads(args.baseline.read_text())
+    if args.results:
+        current = json.loads(args.results.read_text())
+    else:
+        only = list(baseline["results"])
+        current = run_suite(baseline["meta"]["sizes"], only, args.min_runs, args.min_time, verbose=False)
+
+    regressions = compare(baseline, current, args.threshold, args.floor_ms)
+    if regressions:
+        print(f"[✘] {len(regressions)} regression(s) beyond {args.threshold:.0%}: " + ", ".join(regressions))
+        sys.exit(1)
+    print(f"[✔] No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
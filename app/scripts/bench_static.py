@@ -0,0 +1,139 @@
+# app/scripts/bench_static.py
+
+"""
+Benchmark: bytes on the wire and requests per second for the assets a
+dashboard / display page loads, served by the plain StaticFiles mount
+(before) and by ImmutableStaticFiles with precompressed variants (after).
+
+Each mount runs in its own uvicorn process. Per mount it reports
+  • first visit: one GET per asset (Accept-Encoding: gzip, br)
+  • reload: what a browser sends next time, i.e. a conditional GET per asset,
+    except assets the first response marked immutable, which are not
+    requested at all
+  • throughput: first-visit requests/s with --concurrency clients
+
+Run python -m app.scripts.compress_static first so the variants exist.
+
+Usage:
+    python -m app.scripts.bench_static [--requests 2000] [--concurrency 32]
+"""
+
+import argparse
+import asyncio
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.staticfiles import StaticFiles
+
+from app.utils.static_files import FINGERPRINTED, STATIC_ROOT, ImmutableStaticFiles, static_url
+from app.utils.icons import icon_href
+
+PAGE_ASSETS = ("css/main.css", "js/display.js", "img/loopiavatar.svg")
+ACCEPT_ENCODING = "gzip, br"
+
+baseline_app = Starlette(routes=[Mount("/static", StaticFiles(directory=STATIC_ROOT))])
+static_app = Starlette(routes=[Mount("/static", ImmutableStaticFiles(directory=STATIC_ROOT, pattern=FINGERPRINTED, versioned=True))])
+
+
+def _asset_urls(versioned: bool) -> List[str]:
+    sprite = icon_href("play").split("#")[0]
+    if versioned:
+        return [static_url(path) for path in PAGE_ASSETS] + [sprite]
+    return [f"/static/{path}" for path in PAGE_ASSETS] + [sprite]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _serve(app_name: str, port: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"app.scripts.bench_static:{app_name}",
+         "--port", str(port), "--log-level", "warning", "--no-access-log"],
+    )
+
+
+async def _wait_ready(client: httpx.AsyncClient, url: str) -> None:
+    for _ in range(100):
+        try:
+            await client.get(url)
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise SystemExit(f"[✘] Server at {url} did not start")
+
+
+async def _visit(client: httpx.AsyncClient, urls: List[str]) -> Dict:
+    first = {"requests": 0, "bytes": 0}
+    reload = {"requests": 0, "bytes": 0}
+    validators = {}
+    for url in urls:
+        response = await client.get(url, headers={"accept-encoding": ACCEPT_ENCODING})
+        first["requests"] += 1
+        first["bytes"] += response.num_bytes_downloaded
+        if "immutable" not in response.headers.get("cache-control", ""):
+            validators[url] = response.headers.get("etag")
+    for url, etag in validators.items():
+        headers = {"accept-encoding": ACCEPT_ENCODING}
+        if etag:
+            headers["if-none-match"] = etag
+        response = await client.get(url, headers=headers)
+        reload["requests"] += 1
+        reload["bytes"] += response.num_bytes_downloaded
+    return {"first": first, "reload": reload}
+
+
+async def _throughput(client: httpx.AsyncClient, urls: List[str], requests: int, concurrency: int) -> float:
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            url = urls[remaining % len(urls)]
+            await client.get(url, headers={"accept-encoding": ACCEPT_ENCODING})
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - started)
+
+
+async def run(requests: int, concurrency: int) -> None:
+    results = {}
+    for label, app_name, versioned in (("StaticFiles", "baseline_app", False), ("ImmutableStaticFiles", "static_app", True)):
+        port = _free_port()
+        server = _serve(app_name, port)
+        try:
+            limits = httpx.Limits(max_connections=concurrency)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30) as client:
+                urls = _asset_urls(versioned)
+                await _wait_ready(client, urls[0])
+                visit = await _visit(client, urls)
+                rps = await _throughput(client, urls, requests, concurrency)
+                results[label] = {**visit, "rps": rps}
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"{len(PAGE_ASSETS) + 1} page assets, {requests} requests × {concurrency} clients per mount")
+    print(f"{'':22}{'first visit':>22}{'reload':>22}{'req/s':>10}")
+    for label, result in results.items():
+        first, reload = result["first"], result["reload"]
+        print(f"{label:22}{first['bytes']:>12,} B / {first['requests']:>2} req"
+              f"{reload['bytes']:>12,} B / {reload['requests']:>2} req{result['rps']:>10,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark static asset serving")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.concurrency))
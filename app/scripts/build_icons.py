@@ -0,0 +1,118 @@
+# app/scripts/build_icons.py
+
+"""
+Build the icon sprite: scan templates / static JS for the lucide icons they
+use and write them as <symbol>s into one fingerprinted file,
+app/static/icons/sprite.<hash>.svg, plus app/static/icons/sprite.json
+({"sprite": <file name>, "icons": [...]}) for app/utils/icons.py.
+
+Icons are found as {{ icon("name", ...) }} / {{ icon_href("name") }} calls
+(names must be string literals) and as legacy /static/icons/lucide/<name>.svg
+paths. Standard library only, so it can run in a bare build stage.
+
+Usage:
+    python -m app.scripts.build_icons [--check]
+--check exits non-zero if sprite.json is missing or stale (e.g. in CI).
+The sprite and sprite.json are committed; rebuild and commit them whenever
+a template starts using a new icon.
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, Iterable, List, Set
+
+ICON_SOURCE_DIR = Path("app/static/icons/lucide")
+SPRITE_DIR = Path("app/static/icons")
+SPRITE_MANIFEST = SPRITE_DIR / "sprite.json"
+SCAN_DIRS = (Path("app/templates"), Path("app/static/js"))
+SCAN_SUFFIXES = (".html", ".js")
+
+ICON_REFERENCE = re.compile(
+    r"""\bicon(?:_href)?\(\s*["']([a-z0-9-]+)["']"""
+    r"""|/static/icons/lucide/([a-z0-9-]+)\.svg"""
+)
+SVG_NS = "http://www.w3.org/2000/svg"
+ET.register_namespace("", SVG_NS)
+
+
+def referenced_icons(dirs: Iterable[Path] = SCAN_DIRS) -> Set[str]:
+    names = set()
+    for root in dirs:
+        if not root.exists():
+            continue
+        for path in sorted(root.rglob("*")):
+            if path.suffix in SCAN_SUFFIXES and path.is_file():
+                for match in ICON_REFERENCE.finditer(path.read_text(encoding="utf-8")):
+                    names.add(match.group(1) or match.group(2))
+    return names
+
+
+def _symbol(name: str, source: Path) -> str:
+    """One lucide SVG as a <symbol>; paint attributes are left to the <svg> that uses it."""
+    root = ET.fromstring(source.read_text(encoding="utf-8"))
+    view_box = root.get("viewBox", "0 0 24 24")
+    for child in root.iter():
+        child.tail = None
+    children = "".join(
+        ET.tostring(child, encoding="unicode").replace(f' xmlns="{SVG_NS}"', "") for child in root
+    )
+    return f'<symbol id="{name}" viewBox="{view_box}">{children}</symbol>'
+
+
+def render_sprite(names: Iterable[str], source_dir: Path = ICON_SOURCE_DIR) -> str:
+    missing = [name for name in sorted(names) if not (source_dir / f"{name}.svg").exists()]
+    if missing:
+        raise SystemExit(f"[✘] Unknown icons referenced: {', '.join(missing)} (not in {source_dir})")
+    symbols = "".join(_symbol(name, source_dir / f"{name}.svg") for name in sorted(names))
+    return (
+        "<!-- lucide-static icons, ISC license -->\n"
+        f'<svg xmlns="{SVG_NS}" style="display:none">{symbols}</svg>\n'
+    )
+
+
+def build_sprite(source_dir: Path = ICON_SOURCE_DIR, out_dir: Path = SPRITE_DIR) -> Dict:
+    """Write sprite.<hash>.svg + sprite.json, removing older sprites; returns the manifest."""
+    names = referenced_icons()
+    sprite = render_sprite(names, source_dir).encode("utf-8")
+    filename = f"sprite.{hashlib.sha256(sprite).hexdigest()[:12]}.svg"
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if not (out_dir / filename).exists():
+        (out_dir / filename).write_bytes(sprite)
+    for old in out_dir.glob("sprite.*.svg"):
+        if old.name != filename:
+            old.unlink()
+    manifest = {"sprite": filename, "icons": sorted(names)}
+    (out_dir / SPRITE_MANIFEST.name).write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+    return manifest
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build the lucide icon sprite used by the templates")
+    parser.add_argument("--check", action="store_true", help="fail if sprite.json is out of date")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        names = referenced_icons()
+        sprite = render_sprite(names).encode("utf-8")
+        expected = f"sprite.{hashlib.sha256(sprite).hexdigest()[:12]}.svg"
+        current = json.loads(SPRITE_MANIFEST.read_text()) if SPRITE_MANIFEST.exists() else {}
+        if current.get("sprite") != expected:
+            print(f"[✘] Icon sprite is out of date (expected {expected}); run python -m app.scripts.build_icons")
+            return 1
+        print(f"[✓] {expected} is current ({len(names)} icons)")
+        return 0
+
+    manifest = build_sprite()
+    size = (SPRITE_DIR / manifest["sprite"]).stat().st_size
+    print(f"[✔] Wrote {SPRITE_DIR / manifest['sprite']}: {len(manifest['icons'])} icons, {size} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
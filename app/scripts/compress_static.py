@@ -0,0 +1,115 @@
+# app/scripts/compress_static.py
+
+"""
+Write precompressed variants of the static assets: <file>.gz always and
+<file>.br when the `brotli` package is installed, next to each text asset
+(css, js, svg, …) under app/static. ImmutableStaticFiles serves them to
+clients that accept the encoding (see app/utils/static_files.py).
+
+Uploads and the lucide sources are skipped, variants that would not save at
+least 5% are not written, up-to-date variants are left alone and variants
+whose source is gone (e.g. an old icon sprite) are removed. Run after
+build_icons (see Dockerfile).
+
+Usage:
+    python -m app.scripts.compress_static [--clean]
+--clean removes every variant instead.
+"""
+
+import argparse
+import gzip
+import sys
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List
+
+from app.utils.static_files import COMPRESSIBLE_SUFFIXES, STATIC_ROOT, VARIANT_SUFFIXES
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip alone still covers every browser
+    brotli = None
+
+SKIP_DIRS = ("uploads", "icons/lucide")
+MIN_SIZE = 1024          # Bytes; smaller files fit in a packet either way
+MIN_SAVING = 0.05
+
+
+def _compressors() -> Dict[str, Callable[[bytes], bytes]]:
+    compressors = {".gz": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressors[".br"] = lambda data: brotli.compress(data, quality=11)
+    return compressors
+
+
+def _skipped(path: Path, root: Path) -> bool:
+    relative = path.relative_to(root).as_posix()
+    return any(relative == skip or relative.startswith(skip + "/") for skip in SKIP_DIRS)
+
+
+def static_sources(root: Path = STATIC_ROOT) -> Iterator[Path]:
+    for path in sorted(root.rglob("*")):
+        if path.suffix in COMPRESSIBLE_SUFFIXES and path.is_file() and not _skipped(path, root):
+            yield path
+
+
+def _variants(root: Path) -> Iterator[Path]:
+    for path in sorted(root.rglob("*")):
+        if path.suffix in VARIANT_SUFFIXES and path.is_file() and not _skipped(path, root):
+            yield path
+
+
+def compress_static(root: Path = STATIC_ROOT) -> List[Dict]:
+    """Refresh every variant under `root`; one {"file", "encoding", "size", "compressed"} per variant kept."""
+    compressors = _compressors()
+    written = []
+    for variant in _variants(root):
+        if not variant.with_suffix("").exists():
+            variant.unlink()
+
+    for source in static_sources(root):
+        size = source.stat().st_size
+        data = None
+        for suffix, compress in compressors.items():
+            variant = source.with_name(source.name + suffix)
+            if size < MIN_SIZE:
+                variant.unlink(missing_ok=True)
+                continue
+            if variant.exists() and variant.stat().st_mtime_ns >= source.stat().st_mtime_ns:
+                written.append({"file": source, "encoding": suffix, "size": size, "compressed": variant.stat().st_size})
+                continue
+            data = source.read_bytes() if data is None else data
+            compressed = compress(data)
+            if len(compressed) > size * (1 - MIN_SAVING):
+                variant.unlink(missing_ok=True)
+                continue
+            tmp = variant.with_name(variant.name + ".tmp")
+            tmp.write_bytes(compressed)
+            tmp.replace(variant)
+            written.append({"file": source, "encoding": suffix, "size": size, "compressed": len(compressed)})
+    return written
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Precompress static assets (gzip, brotli if installed)")
+    parser.add_argument("--clean", action="store_true", help="remove every precompressed variant")
+    args = parser.parse_args(argv)
+
+    if args.clean:
+        removed = 0
+        for variant in _variants(STATIC_ROOT):
+            variant.unlink()
+            removed += 1
+        print(f"[✔] Removed {removed} precompressed variants")
+        return 0
+
+    if brotli is None:
+        print("[WARN] brotli not installed; writing gzip variants only")
+    for entry in compress_static():
+        saving = 1 - entry["compressed"] / entry["size"]
+        print(f"  {entry['file']}{entry['encoding']:<4} {entry['size']:>8} → {entry['compressed']:>7} bytes ({saving:.0%} smaller)")
+    print("[✔] Static assets precompressed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
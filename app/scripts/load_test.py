@@ -0,0 +1,365 @@
+# app/scripts/load_test.py
+
+"""
+Load test: a synthetic fleet of display screens plus dashboard traffic
+against a real uvicorn process, to size --workers before adding campuses.
+
+Setup (through the HTTP API, the way an admin and the screens do it):
+  • creates a "loadtest" playlist and uploads --assets images into it
+    (POST /playlists/add, POST /upload)
+  • registers --devices devices on it (POST /devices/update), issues each a
+    token (POST /devices/{id}/rotate_token) and claims it (GET /claim), so
+    every screen holds its own claim cookies
+Then, for --duration seconds, every screen holds a display session:
+  • GET /display, then the push channel (GET /display/events) stays open
+    and each "playlist" event triggers a manifest refetch, as in display.html
+  • heartbeats, manifest polls (If-None-Match) and media fetches (the next
+    manifest item, full GET: a screen without a warm cache) on their own
+    intervals, each starting at a random offset so the fleet is not in lockstep
+  • an admin client uploads an image (--upload-share of its actions) or
+    reorders the playlist every --admin-interval seconds
+
+Reports, per route: requests, errors (transport failures and HTTP ≥ 400),
+error rate, requests/s and p50 / p95 / p99 latency (time to response headers
+for the event stream, the full body otherwise). Setup and steady state are
+reported separately.
+
+By default the server is started here (uvicorn app.main:app --workers N) in
+a scratch copy of the app with empty stores and LOOPI_DEVICE_LIMIT raised to
+the fleet size, so real devices, playlists and uploads are never touched.
+--url targets a server that is already running instead; it must allow
+--devices active devices, and the load-* devices and uploads stay behind.
+
+Usage:
+    python -m app.scripts.load_test [--devices 200] [--duration 60] [--workers 1]
+        [--heartbeat-interval 600] [--manifest-interval 60] [--media-interval 8]
+        [--admin-interval 5] [--upload-share 0.25] [--assets 8] [--no-events]
+        [--url http://127.0.0.1:8000]
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+from PIL import Image
+
+APP_DIR = Path(__file__).resolve().parent.parent
+PLAYLIST = "loadtest"
+IMAGE_SIZE = (1920, 1080)
+SETUP_CONCURRENCY = 16           # Registrations / claims in flight during setup
+REQUEST_TIMEOUT = 30.0
+SCREEN = {"screen_width": "1920", "screen_height": "1080", "webp": "true"}
+
+# Not copied into the scratch app: runtime state and build caches
+SCRATCH_IGNORE = shutil.ignore_patterns("__pycache__", ".template_cache", "data", "uploads", "tests", "*.db")
+
+
+# === Measurements ===
+
+class RouteStats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.started = time.perf_counter()
+        self.stopped: Optional[float] = None
+
+    def record(self, route: str, seconds: float, ok: bool) -> None:
+        self.latencies.setdefault(route, []).append(seconds)
+        if not ok:
+            self.errors[route] = self.errors.get(route, 0) + 1
+
+    def stop(self) -> None:
+        self.stopped = time.perf_counter()
+
+    def report(self, title: str) -> None:
+        elapsed = (self.stopped or time.perf_counter()) - self.started
+        print(f"\n{title} ({elapsed:.1f}s)")
+        print(f"  {'route':<34} {'requests':>8} {'errors':>7} {'err %':>6} {'req/s':>8} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        total = errors = 0
+        for route in sorted(self.latencies):
+            samples = self.latencies[route]
+            failed = self.errors.get(route, 0)
+            total += len(samples)
+            errors += failed
+            p50, p95, p99 = _percentiles(samples)
+            print(f"  {route:<34} {len(samples):>8} {failed:>7} {100 * failed / len(samples):>6.1f} "
+                  f"{len(samples) / elapsed:>8.1f} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f}")
+        if total:
+            print(f"  {'all':<34} {total:>8} {errors:>7} {100 * errors / total:>6.1f} {total / elapsed:>8.1f}")
+
+
+def _percentiles(samples: List[float]):
+    if len(samples) == 1:
+        return (samples[0] * 1000,) * 3
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return cuts[49] * 1000, cuts[94] * 1000, cuts[98] * 1000
+
+
+async def timed(stats: RouteStats, route: str, client: httpx.AsyncClient, method: str, url: str, **kwargs):
+    """One request, recorded under `route`; returns the response or None on a transport error."""
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError:
+        stats.record(route, time.perf_counter() - start, ok=False)
+        return None
+    stats.record(route, time.perf_counter() - start, ok=response.status_code < 400)
+    return response
+
+
+# === Synthetic content ===
+
+def make_image(seed: int) -> bytes:
+    """A noisy (so realistically sized) JPEG, different for every seed."""
+    rng = random.Random(seed)
+    noise = Image.effect_noise(IMAGE_SIZE, 48).convert("RGB")
+    tint = Image.new("RGB", IMAGE_SIZE, tuple(rng.randrange(256) for _ in range(3)))
+    buffer = io.BytesIO()
+    Image.blend(noise, tint, 0.6).save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+async def upload(stats: RouteStats, client: httpx.AsyncClient, filename: str, seed: int) -> bool:
+    response = await timed(
+        stats, "POST /upload", client, "POST", "/upload",
+        data={"start_date": "2000-01-01", "end_date": "2999-12-31", "playlists": PLAYLIST},
+        files={"file": (filename, make_image(seed), "image/jpeg")},
+    )
+    return response is not None and response.status_code == 200
+
+
+# === Screens ===
+
+class Screen:
+    def __init__(self, device_id: str, base_url: str):
+        self.device_id = device_id
+        self.client = httpx.AsyncClient(base_url=base_url, timeout=REQUEST_TIMEOUT)
+        self.etag: Optional[str] = None
+        self.items: List[Dict] = []
+        self.position = 0
+        self.events = 0
+
+    async def claim(self, stats: RouteStats) -> bool:
+        await timed(stats, "POST /devices/update", self.client, "POST", "/devices/update",
+                    data={"device_id": self.device_id, "name": self.device_id, "active_playlist": PLAYLIST})
+        response = await timed(stats, "POST /devices/{id}/rotate_token", self.client, "POST",
+                               f"/devices/{self.device_id}/rotate_token")
+        token = response.json().get("new_token") if response is not None and response.status_code == 200 else None
+        if not token:
+            return False
+        response = await timed(stats, "GET /claim", self.client, "GET", "/claim",
+                               params={"device_id": self.device_id, "auth_token": token})
+        return response is not None and response.status_code == 303 and "loopi_device_token" in self.client.cookies
+
+    async def poll_manifest(self, stats: RouteStats) -> None:
+        headers = {"If-None-Match": self.etag} if self.etag else {}
+        response = await timed(stats, "GET /display/manifest", self.client, "GET", "/display/manifest", headers=headers)
+        if response is not None and response.status_code == 200:
+            self.etag = response.headers.get("etag")
+            self.items = response.json().get("items", [])
+
+    async def fetch_media(self, stats: RouteStats) -> None:
+        if not self.items:
+            return
+        item = self.items[self.position % len(self.items)]
+        self.position += 1
+        await timed(stats, "GET /uploads/*", self.client, "GET", item["url"])
+
+    async def heartbeat(self, stats: RouteStats) -> None:
+        await timed(stats, "POST /devices/heartbeat", self.client, "POST", "/devices/heartbeat", data=SCREEN)
+
+    async def hold_events(self, stats: RouteStats) -> None:
+        """Keep the push channel open; refetch the manifest on every playlist event."""
+        while True:
+            start = time.perf_counter()
+            try:
+                async with self.client.stream("GET", "/display/events", timeout=httpx.Timeout(REQUEST_TIMEOUT, read=None)) as response:
+                    stats.record("GET /display/events", time.perf_counter() - start, ok=response.status_code < 400)
+                    if response.status_code >= 400:
+                        return
+                    async for line in response.aiter_lines():
+                        if line.startswith("event: playlist"):
+                            self.events += 1
+                            asyncio.create_task(self.poll_manifest(stats))
+            except httpx.HTTPError:
+                stats.record("GET /display/events", time.perf_counter() - start, ok=False)
+            await asyncio.sleep(5)  # EventSource retry
+
+    async def run(self, stats: RouteStats, args) -> None:
+        await timed(stats, "GET /display", self.client, "GET", "/display")
+        await self.poll_manifest(stats)
+        loops = [
+            (self.heartbeat, args.heartbeat_interval),
+            (self.poll_manifest, args.manifest_interval),
+            (self.fetch_media, args.media_interval),
+        ]
+        tasks = [asyncio.create_task(every(action, interval, stats)) for action, interval in loops if interval > 0]
+        if args.events:
+            tasks.append(asyncio.create_task(self.hold_events(stats)))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def every(action, interval: float, stats: RouteStats) -> None:
+    """Call action(stats) every `interval` seconds, first after a random share of it."""
+    await asyncio.sleep(random.uniform(0, interval))
+    while True:
+        started = time.perf_counter()
+        await action(stats)
+        await asyncio.sleep(max(0.0, interval - (time.perf_counter() - started)))
+
+
+# === Admin ===
+
+async def admin(stats: RouteStats, client: httpx.AsyncClient, filenames: List[str], args, run_id: str) -> None:
+    rng = random.Random(run_id)
+    while True:
+        await asyncio.sleep(args.admin_interval)
+        if rng.random() < args.upload_share:
+            filename = f"load-{run_id}-{len(filenames):05d}.jpg"
+            if await upload(stats, client, filename, seed=len(filenames)):
+                filenames.append(filename)
+        else:
+            order = filenames[:]
+            rng.shuffle(order)
+            await timed(stats, "POST /playlists/reorder", client, "POST", "/playlists/reorder",
+                        data={"name": PLAYLIST, "order": ",".join(order)})
+
+
+# === Server ===
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, devices: int, port: int, scratch: Path) -> subprocess.Popen:
+    """uvicorn app.main:app in a scratch copy of the app (empty stores and uploads)."""
+    shutil.copytree(APP_DIR, scratch / "app", ignore=SCRATCH_IGNORE)
+    (scratch / "app" / "data").mkdir()
+    (scratch / "app" / "static" / "uploads").mkdir()
+    env = dict(os.environ, LOOPI_DEVICE_LIMIT=str(devices), LOOPI_ENV="production", LOOPI_PAGE_CACHE="1")
+    env.pop("R2_ACCESS_KEY", None)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=scratch, env=env,
+    )
+
+
+async def wait_ready(base_url: str) -> None:
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        for _ in range(300):
+            try:
+                await client.get("/display-sw.js")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise SystemExit(f"[✘] Server at {base_url} did not start")
+
+
+# === Driver ===
+
+async def bounded(limit: int, coroutines):
+    semaphore = asyncio.Semaphore(limit)
+
+    async def one(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(one(c) for c in coroutines))
+
+
+async def load_test(base_url: str, args) -> None:
+    run_id = format(int(time.time()), "x")
+    setup = RouteStats()
+    admin_client = httpx.AsyncClient(base_url=base_url, timeout=REQUEST_TIMEOUT)
+
+    print(f"[…] Uploading {args.assets} images into playlist '{PLAYLIST}'")
+    await timed(setup, "POST /playlists/add", admin_client, "POST", "/playlists/add",
+                data={"name": PLAYLIST, "color": "#3b82f6"})
+    filenames = [f"load-{run_id}-{i:05d}.jpg" for i in range(args.assets)]
+    uploaded = await bounded(2, (upload(setup, admin_client, name, seed=i) for i, name in enumerate(filenames)))
+    filenames = [name for name, ok in zip(filenames, uploaded) if ok]
+    if not filenames:
+        raise SystemExit("[✘] No image could be uploaded")
+
+    print(f"[…] Registering and claiming {args.devices} devices")
+    screens = [Screen(f"load-{run_id}-{i:05d}", base_url) for i in range(args.devices)]
+    claimed = await bounded(SETUP_CONCURRENCY, (screen.claim(setup) for screen in screens))
+    setup.stop()
+    screens = [screen for screen, ok in zip(screens, claimed) if ok]
+    if len(screens) < args.devices:
+        print(f"[WARN] Only {len(screens)} of {args.devices} devices could be claimed (device limit?)")
+    if not screens:
+        raise SystemExit("[✘] No device could be claimed")
+
+    print(f"[…] Holding {len(screens)} display sessions for {args.duration}s")
+    steady = RouteStats()
+    tasks = [asyncio.create_task(screen.run(steady, args)) for screen in screens]
+    tasks.append(asyncio.create_task(admin(steady, admin_client, filenames, args, run_id)))
+    await asyncio.sleep(args.duration)
+    steady.stop()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await asyncio.gather(*(screen.client.aclose() for screen in screens), admin_client.aclose())
+
+    setup.report("Setup")
+    steady.report(f"Steady state: {len(screens)} screens")
+    if args.events:
+        print(f"  playlist events received: {sum(screen.events for screen in screens)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Drive a synthetic display fleet and admin traffic against uvicorn")
+    parser.add_argument("--devices", type=int, default=200, help="Screens to register, claim and keep on /display")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds of steady-state load")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (ignored with --url)")
+    parser.add_argument("--heartbeat-interval", type=float, default=600, help="Seconds between heartbeats per screen (0 = off)")
+    parser.add_argument("--manifest-interval", type=float, default=60, help="Seconds between manifest polls per screen (0 = off)")
+    parser.add_argument("--media-interval", type=float, default=8, help="Seconds between media fetches per screen (0 = off)")
+    parser.add_argument("--admin-interval", type=float, default=5, help="Seconds between admin actions")
+    parser.add_argument("--upload-share", type=float, default=0.25, help="Share of admin actions that are uploads (rest: reorders)")
+    parser.add_argument("--assets", type=int, default=8, help="Images uploaded into the playlist during setup")
+    parser.add_argument("--events", action=argparse.BooleanOptionalAction, default=True,
+                        help="Hold the /display/events push channel per screen (--no-events: poll only)")
+    parser.add_argument("--url", help="Target a running server instead of starting one")
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(load_test(args.url.rstrip("/"), args))
+        return
+
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory(prefix="loopi-load-") as scratch:
+        server = start_server(args.workers, args.devices, port, Path(scratch))
+        try:
+            asyncio.run(wait_ready(base_url))
+            print(f"[✔] uvicorn app.main:app --workers {args.workers} on {base_url} (scratch copy: {scratch})")
+            asyncio.run(load_test(base_url, args))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
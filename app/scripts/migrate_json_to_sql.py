@@ -0,0 +1,42 @@
+# app/scripts/migrate_json_to_sql.py
+
+"""
+One-shot migration of devices.json / playlists.json / metadata.json into the
+SQL backend at DATABASE_URL. Safe to re-run: entries are upserted.
+
+Usage:
+    python -m app.scripts.migrate_json_to_sql [--database-url sqlite:///./loopi.db]
+Then start the app with LOOPI_STORAGE_BACKEND=sqlite.
+"""
+
+import argparse
+import os
+
+
+def migrate() -> None:
+    # Imported late so --database-url is applied before the engine is created
+    from app.services.json_store import JsonStore
+    from app.services.sql_store import SQL_STORES
+    from app.services.device_service import DEVICE_FILE
+    from app.services.playlist_service import PLAYLIST_FILE, _upgrade_playlists
+    from app.services.metadata_service import METADATA_FILE
+
+    sources = {
+        "devices": JsonStore(DEVICE_FILE),
+        "playlists": JsonStore(PLAYLIST_FILE, upgrade=_upgrade_playlists),
+        "metadata": JsonStore(METADATA_FILE),
+    }
+    for name, source in sources.items():
+        data = source.load()
+        SQL_STORES[name]().save(data)
+        print(f"[✔] Migrated {len(data)} {name} entries from {source.path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate LooPi JSON stores into the SQL backend")
+    parser.add_argument("--database-url", help="Override DATABASE_URL for this run")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    migrate()
@@ -0,0 +1,73 @@
+# app/scripts/precompile_templates.py
+
+"""
+Compile every template into the Jinja2 bytecode cache (LOOPI_TEMPLATE_CACHE_DIR),
+so a fresh process loads bytecode instead of parsing + compiling. Run at image
+build time (see Dockerfile).
+
+Usage:
+    python -m app.scripts.precompile_templates [--bench]
+
+--bench also compares, in fresh environments, loading the whole template set
+with and without the cache, and the first render of the upload success page.
+"""
+
+import argparse
+import tempfile
+import time
+
+from app.templating import build_environment, env, precompile_templates, warm_templates
+from app.utils.context_helpers import inject_user_context
+
+FIRST_RENDER = "upload_success.html"
+FIRST_RENDER_CONTEXT = inject_user_context(
+    None,
+    filename="slide.png",
+    file_url="/uploads/slide.png",
+    start_date="2025-01-01",
+    end_date="2025-01-31",
+    playlist_pills=[{"name": "Lobby", "color": "#336699"}],
+)
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def _first_render(environment):
+    return environment.get_template(FIRST_RENDER).render(FIRST_RENDER_CONTEXT)
+
+
+def bench(rounds: int = 5) -> None:
+    cold_load, cached_load, cold_render, cached_render = [], [], [], []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        precompile_templates(build_environment(cache_dir, auto_reload=False))
+        for _ in range(rounds):
+            cold_load.append(_timed(warm_templates, build_environment(None, auto_reload=False))[1])
+            cached_load.append(_timed(warm_templates, build_environment(cache_dir, auto_reload=False))[1])
+            cold_render.append(_timed(_first_render, build_environment(None, auto_reload=False))[1])
+            cached_render.append(_timed(_first_render, build_environment(cache_dir, auto_reload=False))[1])
+
+    def best(values):
+        return f"{min(values):7.1f} ms"
+
+    print(f"{'':24}{'no cache':>12}{'bytecode':>12}")
+    print(f"{'load all templates':24}{best(cold_load):>12}{best(cached_load):>12}")
+    print(f"{'first render':24}{best(cold_render):>12}{best(cached_render):>12}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bench", action="store_true", help="compare cold vs cached template loading")
+    args = parser.parse_args()
+
+    count, ms = _timed(precompile_templates, env)
+    print(f"[✔] Compiled {count} templates into {env.bytecode_cache.directory} in {ms:.0f} ms")
+    if args.bench:
+        bench()
+
+
+if __name__ == "__main__":
+    main()
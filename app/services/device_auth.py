@@ -0,0 +1,133 @@
+# app/services/device_auth.py
+
+"""
+Service: Device Auth
+Purpose: Authenticates display devices (claim, display, manifest, events,
+         heartbeat) without touching the rest of the fleet.
+
+  • an index of SHA-256(token) → device id, built once from the device store
+    and patched from its change listener, so register / rotate / delete (every
+    path that saves devices.json) keeps it current
+  • lookups hash the presented token, check the index and compare with
+    hmac.compare_digest, so timing does not leak how much of a token matched
+  • recently rejected token hashes sit in a small TTL'd negative cache, so a
+    display stuck on a stale cookie costs one dict probe per retry
+"""
+
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Mapping, Optional
+
+from app.services.device_service import device_store
+
+NEGATIVE_CACHE_SIZE = 1024     # Rejected token hashes remembered
+NEGATIVE_CACHE_TTL = 60        # Seconds a rejection is remembered
+
+
+def token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class DeviceAuthIndex:
+    def __init__(self, store=device_store, clock=time.monotonic):
+        self.store = store
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._by_hash: Dict[str, str] = {}       # token hash → device id
+        self._hash_of: Dict[str, str] = {}       # device id → token hash
+        self._version: Optional[int] = None      # Store version the index reflects
+        self._rejected: "OrderedDict[str, float]" = OrderedDict()  # token hash → remembered until
+        self.rejections = 0
+        store.add_listener(self._on_change)
+
+    # --- Maintenance ---
+    def _rebuild(self, devices: Mapping, version: int) -> None:
+        self._by_hash.clear()
+        self._hash_of.clear()
+        for device_id, device in devices.items():
+            self._set(device_id, device.get("auth_token"))
+        self._rejected.clear()
+        self._version = version
+
+    def _set(self, device_id: str, token: Optional[str]) -> None:
+        old = self._hash_of.pop(device_id, None)
+        if old is not None and self._by_hash.get(old) == device_id:
+            del self._by_hash[old]
+        if token:
+            digest = token_hash(token)
+            self._by_hash[digest] = device_id
+            self._hash_of[device_id] = digest
+            self._rejected.pop(digest, None)
+
+    def _on_change(self, store, keys: Optional[List[str]]) -> None:
+        with self._lock:
+            if keys is None or self._version is None:
+                self._version = None  # Reloaded from disk: rebuild on next lookup
+                return
+            for device_id in keys:
+                device = store.get(device_id)
+                self._set(device_id, device.get("auth_token") if device else None)
+            self._version = store.version
+
+    def _current(self) -> None:
+        version = self.store.version
+        if self._version != version:
+            with self._lock:
+                if self._version != version:
+                    self._rebuild(self.store.view(), version)
+
+    # --- Lookups ---
+    def device_for(self, token: str) -> Optional[str]:
+        """Device id owning `token`, or None."""
+        self._current()
+        digest = token_hash(token)
+        with self._lock:
+            until = self._rejected.get(digest)
+            if until is not None:
+                if self.clock() < until:
+                    self.rejections += 1
+                    return None
+                del self._rejected[digest]
+            return self._by_hash.get(digest)
+
+    def authenticate(self, device_id: Optional[str], token: Optional[str]) -> Optional[Mapping]:
+        """Read-only view of the device if `token` is its current auth token, else None."""
+        if not device_id or not token:
+            return None
+        owner = self.device_for(token)
+        device = self.store.get(device_id) if owner is not None else None
+        if (
+            device is None
+            or not hmac.compare_digest(owner.encode("utf-8"), device_id.encode("utf-8"))
+            or not hmac.compare_digest(str(device.get("auth_token") or "").encode("utf-8"), token.encode("utf-8"))
+        ):
+            self._reject(token_hash(token))
+            return None
+        return device
+
+    def _reject(self, digest: str) -> None:
+        with self._lock:
+            if digest in self._by_hash:
+                return  # A valid token presented with the wrong device id
+            self._rejected[digest] = self.clock() + NEGATIVE_CACHE_TTL
+            self._rejected.move_to_end(digest)
+            while len(self._rejected) > NEGATIVE_CACHE_SIZE:
+                self._rejected.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "devices": len(self._hash_of),
+                "negative_cache": len(self._rejected),
+                "rejections": self.rejections,
+            }
+
+
+device_auth = DeviceAuthIndex()
+
+
+def authenticate_device(device_id: Optional[str], token: Optional[str]) -> Optional[Mapping]:
+    return device_auth.authenticate(device_id, token)
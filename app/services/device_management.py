@@ -2,7 +2,9 @@
 
 import uuid
 from datetime import datetime, timedelta
-from app.services.device_service import load_devices, save_devices
+from typing import List, Optional
+from app.services.device_service import load_devices, save_devices, update_devices
+from app.services.playlist_service import update_playlist_device_assignments
 
 
 def audit_and_backfill_devices(default_license: str = "monthly"):
@@ -49,13 +51,13 @@ def rotate_auth_token(device_id: str) -> str | None:
     Replaces the device's auth_token with a new one.
     Returns the new token if successful.
     """
-    devices = load_devices()
-    if device_id in devices:
-        new_token = str(uuid.uuid4())
-        devices[device_id]["auth_token"] = new_token
-        save_devices(devices)
+    def rotate(devices):
+        if device_id not in devices:
+            return None
+        devices[device_id]["auth_token"] = new_token = str(uuid.uuid4())
         return new_token
-    return None
+
+    return update_devices(rotate)
 
 
 def renew_license(device_id: str, license_type: str = "monthly") -> bool:
@@ -63,14 +65,135 @@ def renew_license(device_id: str, license_type: str = "monthly") -> bool:
     Renews the license for a device.
     Updates the renewed_at and expires_at timestamps.
     """
+    def renew(devices):
+        if device_id not in devices:
+            return False
+        _apply_license(devices[device_id], license_type, datetime.utcnow())
+        return True
+
+    return update_devices(renew)
+
+
+def _apply_license(device: dict, license_type: str, now: datetime) -> None:
     duration = timedelta(days=30) if license_type == "monthly" else timedelta(days=365)
+    device["license_type"] = license_type
+    device["license_renewed_at"] = now.isoformat() + "Z"
+    device["license_expires_at"] = (now + duration).isoformat() + "Z"
+
+
+# === Bulk Operations ===
+
+def select_devices(devices: dict, device_ids=None, selector: Optional[dict] = None) -> List[str]:
+    """
+    Device IDs to operate on: the explicit `device_ids` (unknown IDs kept, so
+    they can be reported), else every device matching all `selector` keys:
+      playlist                active_playlist equals ("" = unassigned)
+      active                  true / false
+      name_contains           case-insensitive substring of the name
+      license_expires_before  YYYY-MM-DD; devices without a license match
+    (An empty selector matches every device; DeviceSelector only allows
+    that with an explicit all: true.)
+    """
+    if device_ids:
+        return list(dict.fromkeys(device_ids))
+    selector = selector or {}
+    needle = (selector.get("name_contains") or "").lower()
+    matched = []
+    for device_id, device in devices.items():
+        if selector.get("playlist") is not None and device.get("active_playlist", "") != selector["playlist"]:
+            continue
+        if selector.get("active") is not None and bool(device.get("active")) != selector["active"]:
+            continue
+        if needle and needle not in str(device.get("name", "")).lower():
+            continue
+        expires_before = selector.get("license_expires_before")
+        if expires_before and str(device.get("license_expires_at") or "")[:10] >= expires_before:
+            continue
+        matched.append(device_id)
+    return matched
+
+
+def bulk_update_devices(
+    operations: dict,
+    device_ids: Optional[List[str]] = None,
+    selector: Optional[dict] = None,
+    playlists: Optional[dict] = None,
+    device_limit: Optional[int] = None,
+    dry_run: bool = False,
+) -> List[dict]:
+    """
+    Apply `operations` to the devices picked by select_devices(device_ids,
+    selector) in one atomic update of devices.json (and at most one
+    playlists.json rebuild). Selection and mutation run under the store lock,
+    so a heartbeat flush, claim or token rotation landing meanwhile is kept.
+    Operations:
+      assign_playlist  playlist name ("" unassigns); must exist in `playlists`
+      rename           {device_id: new name}
+      active           true / false; activations beyond `device_limit`
+                       active devices fail individually
+      rotate_token     true → new auth token (returned in the outcome)
+      renew_license    "monthly" / "yearly"
+    Returns one outcome per target, in order: {"device_id", "status":
+    "ok" | "not_found" | "error", "changes", ["auth_token"], ["detail"]}.
+    `dry_run` reports the outcomes without saving anything.
+    """
+    playlist = operations.get("assign_playlist")
+    if playlist and playlists is not None and playlist not in playlists:
+        raise ValueError(f"Unknown playlist: {playlist}")
+
+    if dry_run:
+        outcomes, _ = _apply_bulk(load_devices(), device_ids, selector, operations, device_limit)
+        for outcome in outcomes:
+            outcome.pop("auth_token", None)  # Never issued
+        return outcomes
+
+    def apply(devices):
+        outcomes, assignments_changed = _apply_bulk(devices, device_ids, selector, operations, device_limit)
+        return outcomes, (dict(devices) if assignments_changed else None)
+
+    outcomes, devices = update_devices(apply)
+    if devices is not None:
+        update_playlist_device_assignments(devices)
+    return outcomes
+
+
+def _apply_bulk(devices: dict, device_ids, selector, operations: dict, device_limit) -> tuple:
+    """Mutate `devices` in place; returns (outcomes, assignments_changed)."""
     now = datetime.utcnow()
+    playlist = operations.get("assign_playlist")
+    renames = operations.get("rename") or {}
+    active_count = sum(1 for d in devices.values() if d.get("active"))
 
-    devices = load_devices()
-    if device_id in devices:
-        devices[device_id]["license_type"] = license_type
-        devices[device_id]["license_renewed_at"] = now.isoformat() + "Z"
-        devices[device_id]["license_expires_at"] = (now + duration).isoformat() + "Z"
-        save_devices(devices)
-        return True
-    return False
+    outcomes = []
+    assignments_changed = False
+    for device_id in select_devices(devices, device_ids, selector):
+        device = devices.get(device_id)
+        if device is None:
+            outcomes.append({"device_id": device_id, "status": "not_found", "changes": []})
+            continue
+        outcome = {"device_id": device_id, "status": "ok", "changes": []}
+        outcomes.append(outcome)
+
+        if device_id in renames and renames[device_id] != device.get("name"):
+            device["name"] = renames[device_id]
+            outcome["changes"].append("rename")
+            assignments_changed = True
+        if playlist is not None and device.get("active_playlist") != playlist:
+            device["active_playlist"] = playlist
+            outcome["changes"].append("assign_playlist")
+            assignments_changed = True
+        if operations.get("active") is not None and bool(device.get("active")) != operations["active"]:
+            if operations["active"] and device_limit is not None and active_count >= device_limit:
+                outcome["status"] = "error"
+                outcome["detail"] = f"Device limit reached ({device_limit} active)."
+            else:
+                device["active"] = operations["active"]
+                active_count += 1 if operations["active"] else -1
+                outcome["changes"].append("activate" if operations["active"] else "deactivate")
+        if operations.get("rotate_token"):
+            device["auth_token"] = outcome["auth_token"] = str(uuid.uuid4())
+            outcome["changes"].append("rotate_token")
+        if operations.get("renew_license"):
+            _apply_license(device, operations["renew_license"], now)
+            outcome["changes"].append("renew_license")
+    return outcomes, assignments_changed
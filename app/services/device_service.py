@@ -1,41 +1,112 @@
 # app/services/device_service.py
 
-import json
+import threading
 import uuid
 from pathlib import Path
 from datetime import datetime
+from typing import Mapping
+
+from app.config import DEVICE_LIMIT
+from app.services.storage import open_store
 
 # === Constants ===
 DEVICE_FILE = Path("app/data/devices.json")  # Path to JSON file storing device data
 
+# In-memory device map; re-parsed only when the file changes on disk
+device_store = open_store("devices", DEVICE_FILE)
+
 
 # === Load & Save ===
 
 def load_devices():
     """
-    Load all devices from the JSON file.
+    Load all devices as a mutable copy (for load-modify-save callers).
     Returns a dictionary keyed by device_id.
     """
-    if DEVICE_FILE.exists():
-        with open(DEVICE_FILE, "r") as f:
-            return json.load(f)
-    return {}
+    return device_store.load()
+
+def devices_view() -> Mapping:
+    """
+    Read-only view of all devices, served from the in-memory cache.
+    Use this on hot read paths (display, claim, heartbeat).
+    """
+    return device_store.view()
+
+def devices_version() -> int:
+    """
+    Version counter of the device store; bumps on every change.
+    """
+    return device_store.version
 
 def save_devices(devices: dict):
     """
     Save the full devices dictionary back to the JSON file.
     """
-    with open(DEVICE_FILE, "w") as f:
-        json.dump(devices, f, indent=2)
+    device_store.save(devices)
+
+def update_devices(fn):
+    """
+    Atomic load-modify-save of the devices dictionary: `fn` gets a mutable
+    copy and its changes are saved before any other writer runs.
+    Returns what `fn` returns.
+    """
+    return device_store.update(fn)
+
+
+class AssignmentVersion:
+    """
+    Version counter over the device fields the playlists page shows (name,
+    active_playlist). Unlike device_store.version it stays put when only
+    last_seen changes, so heartbeat flushes don't invalidate cached pages.
+    Usable wherever a store is expected for its .version (see page_cache).
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._store_version = None
+        self._signature = None
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        store_version = self.store.version
+        if store_version != self._store_version:
+            with self._lock:
+                if store_version != self._store_version:
+                    signature = hash(tuple(
+                        (device_id, device.get("name"), device.get("active_playlist"))
+                        for device_id, device in self.store.view().items()
+                    ))
+                    if signature != self._signature:
+                        self._signature = signature
+                        self._version += 1
+                    self._store_version = store_version
+        return self._version
+
+
+device_assignments = AssignmentVersion(device_store)
+
+
+# === License ===
+
+def device_limit(request) -> int:
+    """
+    Number of devices that may be active at once: the signed-in user's
+    subscription limit, or DEVICE_LIMIT when the request has none.
+    (Read from the scope: request.user raises without an auth middleware.)
+    """
+    subscription = getattr(request.scope.get("user"), "subscription", None)
+    return subscription.device_limit if subscription else DEVICE_LIMIT
 
 
 # === Device CRUD ===
 
 def get_device(device_id: str):
     """
-    Return a single device by its ID, or None if not found.
+    Return a read-only view of a single device by its ID, or None if not found.
     """
-    return load_devices().get(device_id)
+    return device_store.get(device_id)
 
 def register_or_update_device(device_id: str, name: str = None, active_playlist: str = None):
     """
@@ -44,29 +115,29 @@ def register_or_update_device(device_id: str, name: str = None, active_playlist:
     - Always updates `last_seen` timestamp
     - Automatically assigns `auth_token` if missing
     """
-    devices = load_devices()
     now = datetime.utcnow().isoformat()
 
-    if device_id not in devices:
-        # --- Create new device record ---
-        devices[device_id] = {
-            "name": name or f"Unnamed Device ({device_id})",
-            "active_playlist": active_playlist or "",
-            "auth_token": str(uuid.uuid4()),  # ✅ Token issued on registration
-            "last_seen": now,
-            "active": False
-        }
-    else:
-        # --- Update existing device ---
-        if name:
-            devices[device_id]["name"] = name
-        if active_playlist is not None:
-            devices[device_id]["active_playlist"] = active_playlist
-        if "auth_token" not in devices[device_id]:  # ✅ Backfill token if missing
-            devices[device_id]["auth_token"] = str(uuid.uuid4())
-        devices[device_id]["last_seen"] = now
-
-    save_devices(devices)
+    def register(devices):
+        if device_id not in devices:
+            # --- Create new device record ---
+            devices[device_id] = {
+                "name": name or f"Unnamed Device ({device_id})",
+                "active_playlist": active_playlist or "",
+                "auth_token": str(uuid.uuid4()),  # ✅ Token issued on registration
+                "last_seen": now,
+                "active": False
+            }
+        else:
+            # --- Update existing device ---
+            if name:
+                devices[device_id]["name"] = name
+            if active_playlist is not None:
+                devices[device_id]["active_playlist"] = active_playlist
+            if "auth_token" not in devices[device_id]:  # ✅ Backfill token if missing
+                devices[device_id]["auth_token"] = str(uuid.uuid4())
+            devices[device_id]["last_seen"] = now
+
+    update_devices(register)
 
 
 # === Playlist Assignment ===
@@ -75,13 +146,14 @@ def set_active_playlist(device_id: str, playlist_name: str):
     """
     Assign or update the active playlist for a given device.
     """
-    devices = load_devices()
-    if device_id in devices:
+    def assign(devices):
+        if device_id not in devices:
+            return False
         devices[device_id]["active_playlist"] = playlist_name
         devices[device_id]["last_seen"] = datetime.utcnow().isoformat()
-        save_devices(devices)
         return True
-    return False
+
+    return update_devices(assign)
 
 
 # === Token Management ===
@@ -91,12 +163,13 @@ def rotate_auth_token(device_id: str):
     Replace the current auth_token with a new one for the device.
     Returns the new token, or None if the device is not found.
     """
-    devices = load_devices()
-    if device_id in devices:
+    def rotate(devices):
+        if device_id not in devices:
+            return None
         devices[device_id]["auth_token"] = str(uuid.uuid4())
-        save_devices(devices)
         return devices[device_id]["auth_token"]
-    return None
+
+    return update_devices(rotate)
 
 
 # === Playlist-to-Device Mapping ===
@@ -31,10 +31,10 @@ def save_metadata(metadata: Dict[str, FileMetadata]):
         json.dump(metadata, f, indent=2)
 
 
-# === Save uploaded image to disk ===
+# === Save uploaded image or video to disk ===
 def save_uploaded_file(file: UploadFile) -> Path:
-    if not file.filename.lower().endswith((".png", ".jpg", ".jpeg")):
-        raise HTTPException(status_code=400, detail="Only PNG, JPG, and JPEG files are allowed.")
+    if not file.filename.lower().endswith((".png", ".jpg", ".jpeg", ".mp4", ".webm")):
+        raise HTTPException(status_code=400, detail="Only PNG, JPG, JPEG, MP4 and WebM files are allowed.")
     
     destination = UPLOADS_DIR / file.filename
     with destination.open("wb") as buffer:
@@ -0,0 +1,131 @@
+# app/services/heartbeat_service.py
+
+"""
+Service: Heartbeat Service
+Purpose: Cheap ingestion path for device heartbeats.
+
+Heartbeats only update an in-memory table (last_seen per device). The table is
+flushed to the device store in one batched update every HEARTBEAT_FLUSH_INTERVAL
+seconds. The device store is written immediately (at most once per heartbeat)
+only when a heartbeat changes something that matters outside the table:
+  • the reported screen changed
+  • the device expired (active → False)
+  • the auth token was rotated
+Both paths patch only their own fields inside an atomic store update, so they
+never overwrite a concurrent /claim, /devices/update or bulk change.
+Playlist assignments are keyed on device name/playlist, which heartbeats never
+change, so playlists.json is never touched from here.
+"""
+
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from app.services.device_auth import authenticate_device
+from app.services.device_service import get_device, update_devices
+
+# === Constants ===
+TOKEN_ROTATION_THRESHOLD = timedelta(days=7)
+DEVICE_EXPIRATION_THRESHOLD = timedelta(days=30)
+
+# === In-memory heartbeat table ===
+_last_seen: Dict[str, datetime] = {}   # device_id → last heartbeat (UTC)
+_dirty = set()                          # device_ids not yet flushed
+_lock = threading.Lock()
+
+
+def _parse(value) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def last_seen(device_id: str) -> Optional[datetime]:
+    """
+    Most recent heartbeat for a device, falling back to the stored value.
+    """
+    with _lock:
+        seen = _last_seen.get(device_id)
+    if seen is None:
+        device = get_device(device_id)
+        seen = _parse(device.get("last_seen")) if device else None
+    return seen
+
+
+def record_heartbeat(device_id: str, auth_token: str, screen: Optional[Dict] = None) -> Optional[Dict]:
+    """
+    Record a heartbeat for an authenticated device.
+    `screen` ({"width", "height", "webp"}) is the display's reported screen;
+    it is written through only when it differs from the stored value, since
+    it decides which image renditions the manifest serves.
+    Returns None if the device/token is invalid, otherwise a status dict.
+    If the token was rotated the new token is included as `auth_token`.
+    """
+    device = authenticate_device(device_id, auth_token)
+    if device is None:
+        return None
+
+    now = datetime.utcnow()
+    previous = last_seen(device_id)
+    result = {"status": "ok"}
+    changes = {}
+
+    if screen and dict(device.get("screen") or {}) != screen:
+        changes["screen"] = screen
+
+    if previous is not None:
+        idle = now - previous
+        if idle > DEVICE_EXPIRATION_THRESHOLD and device.get("active"):
+            changes["active"] = False
+            result["status"] = "expired"
+        elif idle > TOKEN_ROTATION_THRESHOLD:
+            changes["auth_token"] = result["auth_token"] = str(uuid.uuid4())
+
+    if changes:
+        _write_through(device_id, now, **changes)
+
+    with _lock:
+        _last_seen[device_id] = now
+        _dirty.add(device_id)
+    return result
+
+
+def _write_through(device_id: str, now: datetime, **changes) -> None:
+    """Persist an assignment/auth-relevant change right away (one write)."""
+    def patch(devices):
+        if device_id in devices:
+            devices[device_id].update(changes)
+            devices[device_id]["last_seen"] = now.isoformat()
+
+    update_devices(patch)
+
+
+def flush_heartbeats() -> int:
+    """
+    Write all pending last_seen values to the device store in one update.
+    Only last_seen is patched, so concurrent device writes are kept; devices
+    deleted in the meantime are skipped. Returns the number of devices flushed.
+    If the write fails the devices stay pending for the next flush.
+    """
+    with _lock:
+        if not _dirty:
+            return 0
+        pending = {device_id: _last_seen[device_id] for device_id in _dirty}
+        _dirty.clear()
+
+    def patch(devices):
+        flushed = 0
+        for device_id, seen in pending.items():
+            if device_id in devices:
+                devices[device_id]["last_seen"] = seen.isoformat()
+                flushed += 1
+        return flushed
+
+    try:
+        return update_devices(patch)
+    except Exception:
+        with _lock:
+            _dirty.update(pending)  # Values are re-read from _last_seen, so newer beats win
+        raise
@@ -0,0 +1,441 @@
+# app/services/json_store.py
+
+"""
+Service: JSON Store
+Purpose: Keeps a parsed JSON document (devices, playlists, metadata) in memory
+         and only re-reads the file when it changes on disk.
+
+Every store tracks:
+  • the file signature (mtime + size) it was last loaded from
+  • a version counter that bumps on every save or detected reload
+
+Readers get a read-only view of the cached document. Writers either take a
+mutable copy with `load()` and hand it back with `save()`, or — whenever
+other writers may run concurrently — pass a function to `update()`, which
+runs the whole load-modify-save under one lock. A separate load() / save()
+pair is not atomic: save() writes the caller's copy, dropping entries another
+writer added in between.
+
+Across processes (uvicorn --workers) writes are serialised by an exclusive
+flock on `<file>.lock`; update() re-reads the file under it, so each worker
+modifies the latest document.
+
+Storage modes (STORE_MODE in app/config.py):
+  • "snapshot" – every save atomically rewrites the whole file (temp + fsync + rename)
+  • "wal"      – every save appends only the changed top-level entries to
+                 `<file>.wal`; concurrent saves share one fsync (group commit)
+                 and `compact()` folds the log back into the snapshot file
+                 (under the file lock, so no other worker's append is lost).
+                 On load the snapshot is read and the log replayed on top.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from app.config import STORE_MODE
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+
+# === Copy Helpers ===
+
+def _freeze(value: Any) -> Any:
+    """Recursively wrap dicts in MappingProxyType and lists in tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _clone(value: Any) -> Any:
+    """Deep-copy plain JSON data (much cheaper than copy.deepcopy)."""
+    if isinstance(value, dict):
+        return {k: _clone(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_clone(v) for v in value]
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Turn a read-only view (or any part of one) back into plain dicts/lists."""
+    if isinstance(value, Mapping):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(v) for v in value]
+    return value
+
+
+def _fsync_dir(path: Path) -> None:
+    """Persist a rename by syncing the parent directory (no-op where unsupported)."""
+    try:
+        fd = os.open(path.parent, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+# === Store Registry ===
+
+_STORES: List["JsonStore"] = []
+
+
+def all_stores() -> List["JsonStore"]:
+    """Every JsonStore created in this process."""
+    return list(_STORES)
+
+
+def compact_all(min_records: int = 1) -> None:
+    """Compact every WAL-backed store whose log holds at least `min_records` entries."""
+    for store in all_stores():
+        if store.mode == "wal" and store.wal_records >= min_records:
+            store.compact()
+
+
+# === Store ===
+
+class JsonStore:
+    """
+    In-process cache of a JSON file keyed by its mtime/size.
+    A single lock guards reloads and saves; use update() for read-modify-write.
+    """
+
+    def __init__(self, path: Path, upgrade: Optional[Callable[[Dict], Dict]] = None, mode: str = STORE_MODE):
+        self.path = Path(path)
+        self.mode = mode
+        self.wal_path = self.path.with_name(self.path.name + ".wal")
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self._upgrade = upgrade          # Optional normaliser run after each disk read
+        self._lock = threading.RLock()
+        self._lock_fd: Optional[int] = None  # Held flock on lock_path, if any
+        self._data: Dict = {}
+        self._frozen: Dict = {}
+        self._view: Mapping = MappingProxyType({})
+        self._signature: Optional[Tuple] = None
+        self._version = 0
+        self._loaded_version = -1
+
+        # --- WAL / group commit state ---
+        self._wal_fd: Optional[int] = None
+        self.wal_records = 0
+        self._written_seq = 0            # Last record written to the OS
+        self._durable_seq = 0            # Last record covered by an fsync
+        self._flushing = False
+        self._commit_cond = threading.Condition()
+
+        self._listeners: List[Callable] = []
+        _STORES.append(self)
+
+    # --- Disk signature ---
+    def _stat_one(self, path: Path) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _stat(self) -> Optional[Tuple]:
+        if self.mode == "wal":
+            return (self._stat_one(self.path), self._stat_one(self.wal_path))
+        return self._stat_one(self.path)
+
+    # --- Reading / recovery ---
+    def _read(self) -> Dict:
+        data = {}
+        if self.path.exists():
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        if self.mode == "wal":
+            data = self._replay(data)
+        return self._upgrade(data) if self._upgrade else data
+
+    def _replay(self, data: Dict) -> Dict:
+        """Apply the log on top of the snapshot, dropping a torn trailing record."""
+        self.wal_records = 0
+        if not self.wal_path.exists():
+            return data
+        good_bytes = 0
+        with open(self.wal_path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("torn record")
+                    record = json.loads(line)
+                except ValueError:
+                    print(f"[WARN] Truncating torn WAL record in {self.wal_path}")
+                    break
+                if record.get("op") == "del":
+                    data.pop(record["key"], None)
+                else:
+                    data[record["key"]] = record["value"]
+                good_bytes += len(line)
+                self.wal_records += 1
+        if good_bytes != self.wal_path.stat().st_size:
+            os.truncate(self.wal_path, good_bytes)
+        return data
+
+    def _diff(self, data: Dict) -> Tuple[List[str], List[str]]:
+        """Top-level keys that were added/changed and keys that were removed."""
+        changed = [k for k, v in data.items() if k not in self._data or self._data[k] != v]
+        deleted = [k for k in self._data if k not in data]
+        return changed, deleted
+
+    def _install(self, data: Dict) -> None:
+        self._data = data
+        self._frozen = {k: _freeze(v) for k, v in data.items()}
+        self._view = MappingProxyType(self._frozen)
+        self._loaded_version = self._version
+
+    def _install_delta(self, data: Dict, changed: List[str], deleted: List[str]) -> None:
+        """Swap in new entries for changed keys only; views handed out earlier stay intact."""
+        changed_keys = set(changed)
+        for key in changed:
+            self._data[key] = _clone(data[key])
+        for key in deleted:
+            self._data.pop(key, None)
+        self._data = {k: self._data[k] for k in data}
+        frozen = {
+            k: _freeze(self._data[k]) if k in changed_keys else self._frozen[k]
+            for k in data
+        }
+        self._frozen = frozen
+        self._view = MappingProxyType(frozen)
+        self._loaded_version = self._version
+
+    def _refresh(self) -> None:
+        """Reload from disk if the file changed or the version was bumped."""
+        signature = self._stat()
+        if signature == self._signature and self._loaded_version == self._version:
+            return
+        with self._lock:
+            signature = self._stat()
+            if signature == self._signature and self._loaded_version == self._version:
+                return
+            first_load = self._loaded_version < 0
+            if signature != self._signature:
+                self._version += 1
+            self._close_wal()
+            self._install(self._read())
+            self._signature = self._stat()  # Recovery may have truncated a torn log
+        if not first_load:
+            self._notify(None)
+
+    # --- Change listeners ---
+    def add_listener(self, listener: Callable[["JsonStore", Optional[List[str]]], None]) -> None:
+        """
+        Call `listener(store, keys)` after every change. `keys` lists the
+        top-level entries that were added, changed or removed, or is None when
+        the whole document was reloaded from disk. Runs outside the store lock.
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, keys: Optional[List[str]]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(self, keys)
+            except Exception as e:
+                print(f"[WARN] Store listener failed for {self.path}: {e}")
+
+    # --- Public API ---
+    @property
+    def version(self) -> int:
+        """Current version; bumps whenever the cached document changes."""
+        self._refresh()
+        return self._version
+
+    def bump(self) -> int:
+        """Force the next access to reload from disk."""
+        with self._lock:
+            self._version += 1
+            return self._version
+
+    def view(self) -> Mapping:
+        """Read-only view of the whole document (no copying)."""
+        self._refresh()
+        return self._view
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Read-only view of a single top-level entry."""
+        return self.view().get(key, default)
+
+    def load(self) -> Dict:
+        """Mutable deep copy of the document, for load-modify-save callers."""
+        self._refresh()
+        with self._lock:
+            return _clone(self._data)
+
+    def save(self, data: Dict) -> None:
+        """Persist the document and update the cache without re-reading it."""
+        self._finish(*self._write(data))
+
+    def update(self, fn: Callable[[Dict], Any]) -> Any:
+        """
+        Atomic read-modify-write: call `fn` with a mutable copy of the latest
+        document and save it, holding the store lock and the file lock from
+        the read to the write. Nothing is written if `fn` left the document
+        unchanged. Returns whatever `fn` returns.
+        """
+        with self._file_lock():
+            self._refresh()  # Other workers' writes land before fn sees the document
+            data = _clone(self._data)
+            result = fn(data)
+            changed, deleted = self._diff(data)
+            pending = self._write(data) if changed or deleted else (None, None)
+        self._finish(*pending)  # fsync wait and listeners after the locks drop
+        return result
+
+    def _write(self, data: Dict) -> Tuple[Optional[int], Optional[List[str]]]:
+        """Write under the locks; returns (WAL record to wait for, keys to notify)."""
+        with self._file_lock():
+            if self.mode == "wal":
+                return self._save_wal(data)
+            return None, self._save_snapshot(data)
+
+    def _finish(self, seq: Optional[int], keys: Optional[List[str]]) -> None:
+        if seq is not None:
+            self._group_commit(seq)
+        if keys is not None:
+            self._notify(keys)
+
+    # --- Cross-process lock ---
+    @contextmanager
+    def _file_lock(self):
+        """
+        Exclusive flock on `<file>.lock` plus the store lock. Re-entrant, so
+        update() can call save(). Falls back to the store lock alone where
+        flock is unavailable or the lock file cannot be created.
+        """
+        with self._lock:
+            if self._lock_fd is not None or fcntl is None:
+                yield
+                return
+            try:
+                fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            except OSError:
+                yield
+                return
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                self._lock_fd = fd
+                yield
+            finally:
+                self._lock_fd = None
+                os.close(fd)  # Releases the flock
+
+    # --- Snapshot mode ---
+    def _write_snapshot(self, data: Dict) -> None:
+        # Unique temp name: workers writing the same store never share one
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=self.path.name + ".", suffix=".tmp")
+        try:
+            os.fchmod(fd, 0o644)
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # Single-file bind mounts (docker-compose) can't be renamed over; rewrite in place
+            with open(self.path, "w") as f:
+                json.dump(data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            return
+        _fsync_dir(self.path)
+
+    def _save_snapshot(self, data: Dict) -> List[str]:
+        self._refresh()
+        with self._lock:
+            changed, deleted = self._diff(data)
+            self._write_snapshot(data)
+            self._version += 1
+            self._signature = self._stat()
+            self._install_delta(data, changed, deleted)
+        return changed + deleted
+
+    # --- WAL mode ---
+    def _open_wal(self) -> int:
+        if self._wal_fd is None:
+            self._wal_fd = os.open(self.wal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        return self._wal_fd
+
+    def _close_wal(self) -> None:
+        if self._wal_fd is not None:
+            self._group_commit(self._written_seq)  # Never close under an in-flight fsync
+            os.close(self._wal_fd)
+            self._wal_fd = None
+
+    def _save_wal(self, data: Dict) -> Tuple[Optional[int], Optional[List[str]]]:
+        self._refresh()
+        with self._lock:
+            changed, deleted = self._diff(data)
+            if not changed and not deleted:
+                return None, None
+            lines = [json.dumps({"op": "set", "key": k, "value": data[k]}) for k in changed]
+            lines += [json.dumps({"op": "del", "key": k}) for k in deleted]
+            os.write(self._open_wal(), ("\n".join(lines) + "\n").encode("utf-8"))
+            self.wal_records += len(lines)
+            self._version += 1
+            self._signature = self._stat()
+            self._install_delta(data, changed, deleted)
+            with self._commit_cond:
+                self._written_seq += 1
+                seq = self._written_seq
+        return seq, changed + deleted
+
+    def _group_commit(self, seq: int) -> None:
+        """
+        Block until record `seq` is fsynced. The first waiter becomes the
+        leader and syncs everything written so far; the rest piggyback on it.
+        """
+        with self._commit_cond:
+            while self._durable_seq < seq:
+                if self._flushing:
+                    self._commit_cond.wait()
+                    continue
+                self._flushing = True
+                target = self._written_seq
+                fd = self._wal_fd
+                self._commit_cond.release()
+                try:
+                    if fd is not None:
+                        os.fsync(fd)
+                finally:
+                    self._commit_cond.acquire()
+                    self._flushing = False
+                self._durable_seq = max(self._durable_seq, target)
+                self._commit_cond.notify_all()
+
+    def compact(self) -> None:
+        """
+        Fold the log into a fresh snapshot and truncate it. Runs under the
+        file lock, after replaying what other workers appended, so the
+        truncation cannot drop their records.
+        """
+        if self.mode != "wal":
+            return
+        with self._file_lock():
+            self._refresh()
+            self._write_snapshot(self._data)
+            self._close_wal()
+            if self.wal_path.exists():
+                os.truncate(self.wal_path, 0)
+            self.wal_records = 0
+            self._signature = self._stat()
@@ -0,0 +1,183 @@
+# app/services/library_service.py
+
+"""
+Service: Library Service
+Purpose: Cursor-paginated, filtered and sorted listing of the media library
+         (content dashboard + /content/api/media).
+
+  • filters are answered by the schedule index (status, date range) and a
+    playlist → files map, both rebuilt only when the metadata store changes
+  • each sort order is a sorted list of row keys cached per metadata version,
+    so a page is a bisect to the cursor plus `limit` steps
+  • cursors encode the last row key returned, so pages stay stable while
+    entries are added or removed between requests
+"""
+
+import base64
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+
+from app.services.metadata_service import metadata_store, schedule_index
+from app.services.object_store import media_url
+from app.services.thumbnail_service import thumb_url
+from app.services.video_service import is_video
+
+SORT_FIELDS = ("status", "filename", "start", "end")
+STATUSES = ("active", "expired", "scheduled")
+DEFAULT_PAGE_SIZE = 48
+MAX_PAGE_SIZE = 200
+
+_lock = threading.Lock()
+_version = None
+_sorted: Dict[Tuple, Tuple[List[Tuple], Dict[str, Tuple]]] = {}   # (sort, today) → (rows, filename → row)
+_by_playlist: Dict[str, Set[str]] = {}
+
+
+# === Cursors ===
+
+def encode_cursor(row: Tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(row, separators=(",", ":")).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple:
+    try:
+        return tuple(json.loads(base64.urlsafe_b64decode(cursor.encode("ascii"))))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
+# === Cached orderings ===
+
+def _row(sort: str, filename: str, info, expired: Set[str]) -> Tuple:
+    if sort == "filename":
+        return (filename,)
+    if sort == "status":
+        return (int(filename in expired), filename)
+    return (str(info.get(sort) or ""), filename)
+
+
+def _ordering(sort: str, today: date) -> Tuple[List[Tuple], Dict[str, Tuple]]:
+    global _version
+    index = schedule_index()
+    metadata = metadata_store.view()
+    key = (sort, today if sort == "status" else None)
+    with _lock:
+        if _version != index.version:
+            _sorted.clear()
+            _by_playlist.clear()
+            for filename, info in metadata.items():
+                for playlist in info.get("playlists", ()):
+                    _by_playlist.setdefault(playlist, set()).add(filename)
+            _version = index.version
+        cached = _sorted.get(key)
+        if cached is None:
+            expired = set(index.expired_before(today)) if sort == "status" else set()
+            row_of = {f: _row(sort, f, info, expired) for f, info in metadata.items()}
+            cached = _sorted[key] = (sorted(row_of.values()), row_of)
+        return cached
+
+
+def _filtered(status: Optional[str], playlist: Optional[str], date_from: Optional[date],
+              date_to: Optional[date], today: date) -> Optional[Set[str]]:
+    """Filenames matching every given filter, or None when unfiltered."""
+    index = schedule_index()
+    result: Optional[Set[str]] = None
+
+    def narrow(names):
+        nonlocal result
+        result = set(names) if result is None else result.intersection(names)
+
+    if status == "active":
+        narrow(index.active_on(today))
+    elif status == "expired":
+        narrow(index.expired_before(today))
+    elif status == "scheduled":
+        narrow(index.scheduled_after(today))
+    if playlist:
+        with _lock:
+            narrow(_by_playlist.get(playlist, ()))
+    if date_from or date_to:
+        narrow(index.overlapping(date_from or date.min, date_to or date.max))
+    return result
+
+
+# === Listing ===
+
+def list_media(
+    status: Optional[str] = None,
+    playlist: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    sort: str = "status",
+    order: str = "asc",
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    today: Optional[date] = None,
+) -> Dict:
+    """
+    One page of the library: {"items", "next_cursor", "total"}.
+    `status` is active / expired / scheduled (entries without valid dates
+    match no status); `date_from` / `date_to` keep files scheduled at any
+    point in that range.
+    """
+    if sort not in SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(SORT_FIELDS)}.")
+    if status and status not in STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of {', '.join(STATUSES)}.")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be asc or desc.")
+    today = today or date.today()
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    rows, row_of = _ordering(sort, today)
+    matches = _filtered(status, playlist, date_from, date_to, today)
+    total = len(rows) if matches is None else len(matches)
+    if matches is not None and len(matches) * 8 < len(rows):
+        # Small result set: sort just the matches instead of skipping through every row
+        rows = sorted(row_of[f] for f in matches if f in row_of)
+        matches = None
+
+    page: List[Tuple] = []
+    after = decode_cursor(cursor) if cursor else None
+    try:
+        if order == "asc":
+            i = bisect_right(rows, after) if after else 0
+            step = 1
+        else:
+            i = (bisect_left(rows, after) if after else len(rows)) - 1
+            step = -1
+    except TypeError:
+        raise HTTPException(status_code=400, detail="Cursor does not match the sort order.")
+    while 0 <= i < len(rows) and len(page) <= limit:
+        if matches is None or rows[i][-1] in matches:
+            page.append(rows[i])
+        i += step
+
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    page = page[:limit]
+
+    metadata = metadata_store.view()
+    index = schedule_index()
+    items = []
+    for row in page:
+        filename = row[-1]
+        info = metadata.get(filename)
+        if info is None:
+            continue
+        window = index.window(filename)
+        items.append({
+            "filename": filename,
+            "start": info.get("start", ""),
+            "end": info.get("end", ""),
+            "playlists": list(info.get("playlists", [])),
+            "is_expired": window is not None and window[1] < today.toordinal(),
+            "url": media_url(filename, info),
+            "thumb_url": thumb_url(filename, info),
+            "is_video": is_video(filename, info),
+        })
+    return {"items": items, "next_cursor": next_cursor, "total": total}
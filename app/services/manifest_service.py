@@ -0,0 +1,127 @@
+# app/services/manifest_service.py
+
+"""
+Service: Manifest Service
+Purpose: Builds the per-device display manifest (the active playlist, in order,
+         with a version hash per asset) and its ETag.
+
+The ETag is derived only from the device's playlist assignment, the in-memory
+version counters of the playlist and metadata stores, and today's date, so an
+unchanged poll can be answered with 304 before anything is loaded or built.
+Built manifests are memoised by ETag.
+"""
+
+import hashlib
+import os
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Mapping, Optional
+from urllib.parse import quote
+
+from app.services.metadata_service import metadata_store, schedule_index
+from app.services.object_store import media_path, media_url
+from app.services.playlist_service import playlist_store
+from app.services.rendition_service import pick_rendition
+from app.services.video_service import is_video
+
+MANIFEST_CACHE_SIZE = 8192  # ≥ fleet size, so every screen's current manifest stays cached
+
+_cache: "OrderedDict[str, Dict]" = OrderedDict()
+
+
+def manifest_etag(device_id: str, device: Mapping, today: Optional[date] = None) -> str:
+    """
+    Strong ETag for a device's manifest; changes whenever its playlist
+    assignment or screen, the playlist store or the metadata store changes.
+    (The device store's own version is not used: heartbeat flushes bump it.)
+    """
+    today = today or date.today()
+    screen = device.get("screen") or {}
+    key = (
+        f"{device_id}|{device.get('active_playlist')}|{screen.get('height')}|{screen.get('webp')}"
+        f"|{playlist_store.version}|{metadata_store.version}|{today.isoformat()}"
+    )
+    return '"' + hashlib.sha1(key.encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def asset_version(filename: str, meta: Optional[Mapping] = None) -> str:
+    """
+    Version hash of one asset: changes when the file or its schedule changes.
+    Content-addressed files are versioned by their digest (no stat needed).
+    """
+    if meta and meta.get("digest"):
+        file_sig = meta["digest"]
+    else:
+        try:
+            st = os.stat(media_path(filename, meta))
+            file_sig = f"{st.st_mtime_ns}:{st.st_size}"
+        except OSError:
+            file_sig = "missing"
+    schedule = f"{meta.get('start')}:{meta.get('end')}" if meta else ""
+    return hashlib.sha1(f"{filename}|{file_sig}|{schedule}".encode("utf-8")).hexdigest()[:12]
+
+
+def build_manifest(device_id: str, device: Mapping, today: Optional[date] = None) -> Dict:
+    """
+    The device's active playlist in order, limited to assets scheduled for today.
+    Assets without metadata have no schedule and are always included.
+    Each item points at the rendition closest to the device's screen, if any.
+    Items are typed "image" or "video"; videos carry their probed duration
+    (seconds, or None if unknown) and play for that long.
+    """
+    today = today or date.today()
+    screen = device.get("screen") or {}
+    playlist_name = device.get("active_playlist") or ""
+    playlist = playlist_store.get(playlist_name) or {}
+    metadata = metadata_store.view()
+    active = set(schedule_index().active_on(today))
+
+    items = []
+    for filename in playlist.get("images", ()):
+        meta = metadata.get(filename)
+        if meta is not None and filename not in active:
+            continue
+        rendition = pick_rendition(
+            (meta or {}).get("renditions", ()), screen.get("height"), screen.get("webp", True)
+        )
+        item = {
+            "filename": filename,
+            "url": "/uploads/" + quote(rendition["file"]) if rendition else media_url(filename, meta),
+            "version": asset_version(filename, meta),
+            "type": "image",
+        }
+        if is_video(filename, meta or {}):
+            item["type"] = "video"
+            item["duration"] = ((meta or {}).get("video") or {}).get("duration")
+        items.append(item)
+
+    return {
+        "device_id": device_id,
+        "playlist": playlist_name,
+        "items": items,
+    }
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header value covers `etag`."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def get_manifest(device_id: str, device: Mapping, etag: Optional[str] = None) -> Dict:
+    """
+    Memoised build_manifest(); pass the ETag if it was already computed.
+    """
+    etag = etag or manifest_etag(device_id, device)
+    manifest = _cache.get(etag)
+    if manifest is None:
+        manifest = build_manifest(device_id, device)
+        manifest["version"] = etag.strip('"')
+        _cache[etag] = manifest
+        if len(_cache) > MANIFEST_CACHE_SIZE:
+            _cache.popitem(last=False)
+    else:
+        _cache.move_to_end(etag)
+    return manifest
@@ -1,32 +1,101 @@
-import aioboto3
-from app.config import R2_BUCKET_NAME, R2_ACCESS_KEY, R2_SECRET_KEY, R2_ENDPOINT_URL
+import asyncio
+import time
+from sqlmodel import Session, select
+from app.config import R2_BUCKET_NAME
+from app.database import engine, init_db
+from app.models.media_asset import MediaAsset
+from app.services.presign_cache import presign_cache
+from app.services.r2_client import r2
+from app.services.r2_upload import abort_upload, open_multipart_upload
 
-session_boto = aioboto3.Session()
+def r2_client():
+    """Borrow the shared, pooled R2 client (see r2_client)."""
+    return r2.client()
 
 async def upload_media_to_r2(file_obj, key):
-    async with session_boto.client(
-        's3',
-        region_name='auto',
-        endpoint_url=R2_ENDPOINT_URL,
-        aws_access_key_id=R2_ACCESS_KEY,
-        aws_secret_access_key=R2_SECRET_KEY
-    ) as client:
-        await client.upload_fileobj(file_obj, R2_BUCKET_NAME, key)
+    """
+    Upload a file-like object as a parallel multipart upload (see r2_upload).
+    Reads happen in a worker thread, one part at a time.
+    Not resumable: on failure the multipart upload is aborted on R2 and its
+    state forgotten, so a retry with the same key starts over.
+    """
+    async with r2_client() as client:
+        # Leftover from an attempt that died before it could clean up
+        await abort_upload(client, key)
+        writer = await open_multipart_upload(client, key, key)
+        try:
+            while True:
+                chunk = await asyncio.to_thread(file_obj.read, writer.part_size)
+                if not chunk:
+                    break
+                await writer.write(chunk)
+            await writer.close()
+        except BaseException:
+            await writer.abort()
+            try:
+                await abort_upload(client, key)
+            except Exception as e:
+                print(f"[WARN] Could not abort upload {key}: {e}")
+            raise
 
 async def generate_presigned_url(key, expires_in=3600):
-    async with session_boto.client(
-        's3',
-        region_name='auto',
-        endpoint_url=R2_ENDPOINT_URL,
-        aws_access_key_id=R2_ACCESS_KEY,
-        aws_secret_access_key=R2_SECRET_KEY
-    ) as client:
-        return await client.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': R2_BUCKET_NAME, 'Key': key},
-            ExpiresIn=expires_in
-        )
+    """Presigned GET URL for one object, served from presign_cache when still fresh."""
+    urls = await generate_presigned_urls([key], expires_in)
+    return urls[key]
+
+async def generate_presigned_urls(keys, expires_in=3600):
+    """
+    Presigned GET URLs for many objects (e.g. a whole playlist) in one call:
+    cached URLs are reused, the rest are signed on a single client lease.
+    Returns {key: url}.
+    """
+    urls, missing = presign_cache.split(keys, expires_in)
+    if missing:
+        lifetime = presign_cache.lifetime(expires_in)
+        async with r2_client() as client:
+            for key in missing:
+                signed_at = time.time()
+                url = await client.generate_presigned_url(
+                    'get_object',
+                    Params={'Bucket': R2_BUCKET_NAME, 'Key': key},
+                    ExpiresIn=lifetime
+                )
+                presign_cache.put(key, expires_in, url, signed_at)
+                urls[key] = url
+    return urls
+
+async def presign_playlist(playlist, expires_in=3600):
+    """Presigned URLs for every R2 asset tagged with `playlist`, as {r2_key: url}."""
+    def _keys():
+        init_db()
+        with Session(engine) as session:
+            assets = session.exec(
+                select(MediaAsset).where(MediaAsset.playlists.is_not(None))
+            ).all()
+            return [a.r2_key for a in assets if playlist in a.playlists.split(",")]
+
+    return await generate_presigned_urls(await asyncio.to_thread(_keys), expires_in)
 
 async def save_media_metadata(filename, r2_key, content_type, size, user_id=1, start_date=None, end_date=None, playlists=None):
-    # DB integration not yet implemented — stub for future use
-    pass
+    """
+    Record an R2-hosted asset in the MediaAsset table (DATABASE_URL).
+    """
+    def _insert():
+        init_db()
+        with Session(engine) as session:
+            asset = MediaAsset(
+                user_id=user_id,
+                filename=filename,
+                r2_key=r2_key,
+                content_type=content_type or "application/octet-stream",
+                size=size or 0,
+                start_date=start_date,
+                end_date=end_date,
+                playlists=",".join(playlists) if playlists else None,
+            )
+            session.add(asset)
+            session.commit()
+            session.refresh(asset)
+            return asset
+
+    return await asyncio.to_thread(_insert)
@@ -7,7 +7,10 @@ Purpose: Manages reading/writing of image metadata such as filename,
 import os
 import json
 from datetime import datetime
-from typing import Dict, List
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.storage import open_store
+from app.services.schedule_index import ScheduleIndex
 
 # === Path to metadata JSON file ===
 METADATA_FILE = "metadata.json"
@@ -17,6 +20,12 @@ if not os.path.exists(METADATA_FILE):
     with open(METADATA_FILE, "w") as f:
         json.dump({}, f, indent=2)
 
+# === In-memory metadata cache (see json_store for WAL mode) ===
+metadata_store = open_store("metadata", METADATA_FILE)
+
+# === Parsed schedule windows, kept in step with metadata_store.version ===
+_schedule = ScheduleIndex()
+
 
 def load_metadata() -> Dict:
     """
@@ -24,8 +33,7 @@ def load_metadata() -> Dict:
     Returns:
         dict: A dictionary where each key is a filename and the value contains its metadata.
     """
-    with open(METADATA_FILE, "r") as f:
-        return json.load(f)
+    return metadata_store.load()
 
 
 def save_metadata(data: Dict) -> None:
@@ -34,38 +42,97 @@ def save_metadata(data: Dict) -> None:
     Args:
         data (dict): The metadata dictionary to persist.
     """
-    with open(METADATA_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+    metadata_store.save(data)
+
+
+def update_metadata(fn: Callable[[Dict], Any]) -> Any:
+    """
+    Atomic load-modify-save of the metadata (see JsonStore.update): `fn`
+    gets a mutable copy of the latest metadata and its changes are saved
+    before any other writer runs. Returns what `fn` returns.
+    """
+    return metadata_store.update(fn)
+
+
+def schedule_index() -> ScheduleIndex:
+    """
+    Returns the schedule index for the current metadata.
+    Built once, then patched per changed entry by _patch_schedule; rebuilt
+    only after the file was reloaded from disk (another worker wrote it).
+    """
+    version = metadata_store.version
+    if _schedule.version != version:
+        _schedule.rebuild(metadata_store.view(), version)
+    return _schedule
+
+
+def _patch_schedule(store, keys: Optional[List[str]]) -> None:
+    """
+    Store listener: apply each changed entry to the schedule index, so every
+    writer (routes, uploads, renditions) keeps it current without a rebuild.
+    """
+    with _schedule._lock:
+        if keys is None or _schedule.version < 0:
+            _schedule.version = -1  # Reloaded from disk: rebuild on next query
+            return
+        for filename in keys:
+            info = store.get(filename)
+            if info is None:
+                _schedule.discard(filename)
+            else:
+                _schedule.put(filename, info)
+        _schedule.version = store.version
+
 
+metadata_store.add_listener(_patch_schedule)
 
-def delete_file_metadata(filename: str) -> None:
+
+def delete_file_metadata(filename: str) -> Optional[Dict]:
     """
     Deletes metadata associated with a specific file.
     Args:
         filename (str): The name of the file to remove.
+    Returns:
+        dict | None: The removed entry, or None if there was none.
     """
-    metadata = load_metadata()
-    if filename in metadata:
-        del metadata[filename]
-        save_metadata(metadata)
+    return update_metadata(lambda metadata: metadata.pop(filename, None))
 
 
-def update_file_metadata(filename: str, start: str, end: str, playlists: List[str]) -> None:
+def update_file_metadata(filename: str, start: str, end: str, playlists: List[str]) -> bool:
     """
-    Adds or updates a file's metadata entry.
+    Updates a file's schedule fields, keeping the rest of its entry
+    (digest, object, renditions, video).
     Args:
         filename (str): Name of the uploaded file.
         start (str): Start date in YYYY-MM-DD format.
         end (str): End date in YYYY-MM-DD format.
         playlists (list[str]): Playlists associated with the file.
+    Returns:
+        bool: False if the file has no metadata entry.
     """
-    metadata = load_metadata()
-    metadata[filename] = {
-        "start": start,
-        "end": end,
-        "playlists": playlists
-    }
-    save_metadata(metadata)
+    def merge(metadata: Dict) -> bool:
+        if filename not in metadata:
+            return False
+        metadata[filename].update(start=start, end=end, playlists=playlists)
+        return True
+
+    return update_metadata(merge)
+
+
+def set_file_renditions(filename: str, renditions: List[Dict]) -> None:
+    """
+    Records generated renditions (see rendition_service) on a file's entry
+    and on every other entry stored as the same object.
+    """
+    def record(metadata: Dict) -> None:
+        if filename not in metadata:
+            return
+        digest = metadata[filename].get("digest")
+        for name, entry in metadata.items():
+            if name == filename or (digest and entry.get("digest") == digest):
+                entry["renditions"] = renditions
+
+    update_metadata(record)
 
 
 def get_active_images(today: datetime.date = None) -> List[str]:
@@ -76,17 +143,21 @@ def get_active_images(today: datetime.date = None) -> List[str]:
     Returns:
         list[str]: Active image filenames.
     """
-    metadata = load_metadata()
-    active = []
     today = today or datetime.today().date()
+    return schedule_index().active_on(today)
 
-    for filename, info in metadata.items():
-        try:
-            start = datetime.strptime(info["start"], "%Y-%m-%d").date()
-            end = datetime.strptime(info["end"], "%Y-%m-%d").date()
-            if start <= today <= end:
-                active.append(filename)
-        except Exception as e:
-            print(f"[WARN] Failed parsing date for {filename}: {e}")
 
-    return active
+def get_active_playlist_images(playlist: str, today: datetime.date = None) -> List[str]:
+    """
+    Returns image filenames tagged with `playlist` that are active today.
+    """
+    today = today or datetime.today().date()
+    return schedule_index().active_in_playlist(playlist, today)
+
+
+def get_expiring_images(days: int, today: datetime.date = None) -> List[str]:
+    """
+    Returns image filenames whose end date falls within the next `days` days.
+    """
+    today = today or datetime.today().date()
+    return schedule_index().expiring_within(days, today)
@@ -0,0 +1,121 @@
+# app/services/object_store.py
+
+"""
+Service: Object Store
+Purpose: Content-addressed storage for uploaded media.
+
+Uploads are stored by the SHA-256 of their bytes instead of their display name:
+
+    app/static/uploads/objects/<first 2 hex>/<digest><ext>
+
+The display name stays the metadata key and maps to the object through the
+entry's "digest" / "object" fields. Because an object's URL changes whenever
+its content does, /uploads can serve objects as immutable (see
+app/utils/static_files.py), and identical files uploaded under different names
+share a single object (and a single set of renditions).
+
+Entries written before content addressing have no "object" and still resolve
+to app/static/uploads/<filename>.
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Dict, Mapping, Optional
+from urllib.parse import quote
+
+UPLOAD_DIR = Path("app/static/uploads")
+OBJECT_DIR = UPLOAD_DIR / "objects"
+CHUNK_SIZE = 1024 * 1024
+
+
+def object_name(digest: str, filename: str) -> str:
+    """Object path relative to UPLOAD_DIR, keeping the upload's extension."""
+    ext = Path(filename).suffix.lower()
+    return f"{OBJECT_DIR.name}/{digest[:2]}/{digest}{ext}"
+
+
+def store_object(fileobj: BinaryIO, filename: str) -> Dict:
+    """
+    Hash and store an upload. Returns {"digest", "object", "size", "deduplicated"}.
+    The bytes are written to a temp file while hashing, then renamed into place;
+    if the object already exists the temp file is discarded instead.
+    """
+    OBJECT_DIR.mkdir(parents=True, exist_ok=True)
+    sha = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(dir=OBJECT_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = fileobj.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                sha.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        return commit_object(tmp, sha.hexdigest(), filename, size)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def commit_object(tmp: str, digest: str, filename: str, size: int) -> Dict:
+    """Move a fully written temp file to its digest path (or drop it if already stored)."""
+    name = object_name(digest, filename)
+    target = UPLOAD_DIR / name
+    deduplicated = target.exists()
+    if deduplicated:
+        os.unlink(tmp)
+    else:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp, target)
+    return {"digest": digest, "object": name, "size": size, "deduplicated": deduplicated}
+
+
+def media_path(filename: str, meta: Optional[Mapping] = None) -> Path:
+    """Where a file's bytes live on disk."""
+    if meta and meta.get("object"):
+        return UPLOAD_DIR / meta["object"]
+    return UPLOAD_DIR / filename
+
+
+def media_url(filename: str, meta: Optional[Mapping] = None) -> str:
+    """
+    Public URL of a file under /uploads. Without `meta`, the entry is looked up
+    in the metadata store (for templates: {{ filename | media_url }}).
+    """
+    if meta is None:
+        from app.services.metadata_service import metadata_store
+        meta = metadata_store.get(filename)
+    if meta and meta.get("object"):
+        return "/uploads/" + quote(meta["object"])
+    return "/uploads/" + quote(filename)
+
+
+def is_referenced(meta: Optional[Mapping], metadata: Mapping) -> bool:
+    """True if any entry in `metadata` still points at meta's object."""
+    obj = (meta or {}).get("object")
+    return bool(obj) and any(entry.get("object") == obj for entry in metadata.values())
+
+
+def release(filename: str, meta: Optional[Mapping], metadata: Mapping) -> bool:
+    """
+    Delete a removed/replaced entry's bytes, renditions and thumbnail, unless
+    another entry in `metadata` (already without the removed entry) still
+    shares them.
+    Returns True if anything was deleted.
+    """
+    from app.services.rendition_service import delete_renditions
+    from app.services.thumbnail_service import delete_thumbnail
+
+    if is_referenced(meta, metadata):
+        return False
+    delete_thumbnail(filename, meta)  # before the file: legacy thumbnails are keyed on its stat
+    path = media_path(filename, meta)
+    if path.exists():
+        path.unlink()
+    delete_renditions(meta)
+    return True
@@ -0,0 +1,104 @@
+# app/services/page_cache.py
+
+"""
+Service: Page Cache
+Purpose: Serves the dashboard pages (content, playlists, devices) from
+         rendered HTML while nothing they show has changed.
+
+  • a page is cached under the versions of the stores it reads plus its
+    query string (and any extra key, e.g. today's date); when any of those
+    versions bumps, the page's old entries are dropped on the next hit
+  • the ETag is derived from that key, so a conditional GET is answered with
+    304 before anything is loaded or rendered
+  • Cache-Control: no-cache makes browsers revalidate on every refresh
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.config import PAGE_CACHE_ENABLED, PAGE_CACHE_SIZE
+from app.services.manifest_service import etag_matches
+
+_BOOT = os.urandom(8).hex()  # Pages rendered by an earlier process (older templates) never match
+
+
+class PageCache:
+    def __init__(self, max_entries: int = PAGE_CACHE_SIZE, enabled: bool = PAGE_CACHE_ENABLED):
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # page → (store versions, query key → (etag, body, media type))
+        self._pages: Dict[str, Tuple[Tuple, "OrderedDict[Tuple, Tuple[str, bytes, str]]"]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    @staticmethod
+    def etag(page: str, versions: Tuple, query: Tuple) -> str:
+        key = repr((_BOOT, page, versions, query)).encode("utf-8")
+        return f'"{page}-{hashlib.sha1(key).hexdigest()[:20]}"'
+
+    def respond(self, request: Request, page: str, stores: Iterable, render: Callable[[], Response], extra: Tuple = ()) -> Response:
+        """
+        The page for this request: 304 if the client's copy is current, the
+        cached HTML if this key was rendered before, else render() (cached
+        when it returns 200).
+        """
+        if not self.enabled:
+            return render()
+        versions = tuple(store.version for store in stores) + tuple(extra)
+        query = tuple(sorted(request.query_params.multi_items()))
+        etag = self.etag(page, versions, query)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        with self._lock:
+            cached_versions, entries = self._pages.get(page, (None, None))
+            if cached_versions != versions:
+                entries = OrderedDict()
+                self._pages[page] = (versions, entries)
+            cached = entries.get(query)
+            if cached is not None:
+                entries.move_to_end(query)
+                self.hits += 1
+        if cached is not None:
+            _, body, media_type = cached
+            return Response(content=body, media_type=media_type, headers=headers)
+
+        self.misses += 1
+        response = render()
+        if response.status_code != 200:
+            return response
+        response.headers.update(headers)
+        with self._lock:
+            entries[query] = (etag, bytes(response.body), response.media_type or "text/html")
+            entries.move_to_end(query)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+        return response
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = sum(len(e) for _, e in self._pages.values())
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+        }
+
+
+page_cache = PageCache()
@@ -8,7 +8,10 @@ Purpose: Manages reading/writing of playlist data and default playlist handling.
 
 import json
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Callable, Dict, List
+
+from app.services.metadata_service import metadata_store
+from app.services.storage import open_store
 
 # Path to the playlists JSON file
 PLAYLIST_FILE = Path("playlists.json")
@@ -27,9 +30,7 @@ def sync_playlists_to_state():
         pass  # Fail silently in early load or import loops
 
 # --- Load / Save ---
-def load_playlists() -> Dict[str, Dict[str, object]]:
-    with open(PLAYLIST_FILE, "r") as f:
-        raw = json.load(f)
+def _upgrade_playlists(raw: Dict) -> Dict[str, Dict[str, object]]:
     # Upgrade legacy string format
     for name, val in raw.items():
         if isinstance(val, str):
@@ -40,29 +41,40 @@ def load_playlists() -> Dict[str, Dict[str, object]]:
             val.setdefault("devices", [])
     return raw
 
+# Parsed once and upgraded once; re-read only when playlists.json changes
+playlist_store = open_store("playlists", PLAYLIST_FILE, upgrade=_upgrade_playlists)
+
+def load_playlists() -> Dict[str, Dict[str, object]]:
+    return playlist_store.load()
+
 def save_playlists(playlists: Dict[str, Dict[str, object]]) -> None:
-    with open(PLAYLIST_FILE, "w") as f:
-        json.dump(playlists, f, indent=2)
+    playlist_store.save(playlists)
     sync_playlists_to_state()
 
+def update_playlists(fn: Callable[[Dict], Any]) -> Any:
+    """
+    Atomic load-modify-save of playlists.json (see JsonStore.update);
+    use it wherever requests may write concurrently. Returns what `fn` returns.
+    """
+    result = playlist_store.update(fn)
+    sync_playlists_to_state()
+    return result
+
 # --- CRUD ---
 def add_playlist(name: str, color: str) -> None:
-    playlists = load_playlists()
-    if name not in playlists:
-        playlists[name] = {"color": color, "images": [], "devices": []}
-        save_playlists(playlists)
+    def add(playlists):
+        if name not in playlists:
+            playlists[name] = {"color": color, "images": [], "devices": []}
+    update_playlists(add)
 
 def update_playlist_color(name: str, new_color: str) -> None:
-    playlists = load_playlists()
-    if name in playlists:
-        playlists[name]["color"] = new_color
-        save_playlists(playlists)
+    def recolor(playlists):
+        if name in playlists:
+            playlists[name]["color"] = new_color
+    update_playlists(recolor)
 
 def delete_playlist(name: str) -> None:
-    playlists = load_playlists()
-    if name in playlists:
-        del playlists[name]
-        save_playlists(playlists)
+    update_playlists(lambda playlists: playlists.pop(name, None))
 
 # --- Image Operations ---
 def get_playlist_images(name: str) -> List[str]:
@@ -70,29 +82,25 @@ def get_playlist_images(name: str) -> List[str]:
     return playlists.get(name, {}).get("images", [])
 
 def set_playlist_images(name: str, images: List[str]) -> None:
-    playlists = load_playlists()
-    if name in playlists:
-        playlists[name]["images"] = images
-        save_playlists(playlists)
+    def set_images(playlists):
+        if name in playlists:
+            playlists[name]["images"] = images
+    update_playlists(set_images)
 
 def add_image_to_playlist(name: str, filename: str) -> None:
-    playlists = load_playlists()
-    if name in playlists:
-        if filename not in playlists[name]["images"]:
+    def add_image(playlists):
+        if name in playlists and filename not in playlists[name]["images"]:
             playlists[name]["images"].append(filename)
-            save_playlists(playlists)
+    update_playlists(add_image)
 
 def remove_image_from_playlist(name: str, filename: str) -> None:
-    playlists = load_playlists()
-    if name in playlists and filename in playlists[name]["images"]:
-        playlists[name]["images"].remove(filename)
-        save_playlists(playlists)
+    def remove_image(playlists):
+        if name in playlists and filename in playlists[name]["images"]:
+            playlists[name]["images"].remove(filename)
+    update_playlists(remove_image)
 
 def reorder_images_in_playlist(name: str, new_order: List[str]) -> None:
-    playlists = load_playlists()
-    if name in playlists:
-        playlists[name]["images"] = new_order
-        save_playlists(playlists)
+    set_playlist_images(name, new_order)
 
 # --- Metadata Backfill ---
 def backfill_playlists_from_metadata(metadata: Dict) -> None:
@@ -101,20 +109,30 @@ def backfill_playlists_from_metadata(metadata: Dict) -> None:
         for playlist in meta.get("playlists", [])
     }
 
-    playlists = load_playlists()
-    updated = False
-
-    for pl in used_playlists:
-        if pl not in playlists:
-            playlists[pl] = {
-                "color": "#e0e0e0",
-                "images": [],
-                "devices": []
-            }
-            updated = True
-
-    if updated:
-        save_playlists(playlists)
+    def backfill(playlists):
+        for pl in used_playlists:
+            if pl not in playlists:
+                playlists[pl] = {
+                    "color": "#e0e0e0",
+                    "images": [],
+                    "devices": []
+                }
+
+    if used_playlists - playlist_store.view().keys():
+        update_playlists(backfill)
+
+_backfilled_version = None  # metadata_store version the last backfill saw
+
+def backfill_playlists_if_stale() -> None:
+    """
+    backfill_playlists_from_metadata(), but only when metadata changed since
+    the last run (page views call this; it used to run on every GET).
+    """
+    global _backfilled_version
+    version = metadata_store.version
+    if version != _backfilled_version:
+        backfill_playlists_from_metadata(metadata_store.view())
+        _backfilled_version = version
 
 # --- Device Assignment Utility ---
 def get_assigned_devices_by_playlist(devices: Dict[str, Dict]) -> Dict[str, List[str]]:
@@ -129,16 +147,16 @@ def get_assigned_devices_by_playlist(devices: Dict[str, Dict]) -> Dict[str, List
 
 # --- Device Update Support ---
 def update_playlist_device_assignments(devices: Dict[str, Dict]) -> None:
-    playlists = load_playlists()
-    # Clear current device mappings
-    for p in playlists.values():
-        p["devices"] = []
-
-    # Rebuild device assignments using device *name*
-    for device_info in devices.values():
-        pl = device_info.get("active_playlist")
-        name = device_info.get("name")
-        if pl and name and pl in playlists:
-            playlists[pl]["devices"].append(name)
-    save_playlists(playlists)
+    def reassign(playlists):
+        # Clear current device mappings
+        for p in playlists.values():
+            p["devices"] = []
+
+        # Rebuild device assignments using device *name*
+        for device_info in devices.values():
+            pl = device_info.get("active_playlist")
+            name = device_info.get("name")
+            if pl and name and pl in playlists:
+                playlists[pl]["devices"].append(name)
+    update_playlists(reassign)
 
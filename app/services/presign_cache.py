@@ -0,0 +1,98 @@
+# app/services/presign_cache.py
+
+"""
+Service: Presign Cache
+Purpose: Reuses presigned R2 GET URLs instead of re-signing the same keys on
+         every display refresh.
+
+  • entries are keyed by (object key, expiry bucket): the requested lifetime
+    rounded up to PRESIGN_EXPIRY_BUCKET seconds, so callers asking for
+    3600 s and 3590 s share one URL
+  • a URL is handed out only while at least PRESIGN_SAFE_FRACTION of its
+    lifetime is left, so clients never receive one that is about to expire
+  • bounded LRU (PRESIGN_CACHE_SIZE); stale entries are dropped on access
+  • hits / misses / evictions / expirations are counted for sizing
+"""
+
+import math
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from app.config import PRESIGN_CACHE_SIZE, PRESIGN_EXPIRY_BUCKET, PRESIGN_SAFE_FRACTION
+
+
+class PresignCache:
+    def __init__(
+        self,
+        max_entries: int = PRESIGN_CACHE_SIZE,
+        safe_fraction: float = PRESIGN_SAFE_FRACTION,
+        bucket_seconds: int = PRESIGN_EXPIRY_BUCKET,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_entries = max_entries
+        self.safe_fraction = safe_fraction
+        self.bucket_seconds = max(1, bucket_seconds)
+        self.clock = clock
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[str, float]]" = OrderedDict()  # → (url, reuse deadline)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def lifetime(self, expires_in: int) -> int:
+        """The expiry bucket a requested lifetime falls into (what is actually signed)."""
+        return math.ceil(expires_in / self.bucket_seconds) * self.bucket_seconds
+
+    def get(self, key: str, expires_in: int) -> Optional[str]:
+        cache_key = (key, self.lifetime(expires_in))
+        entry = self._entries.get(cache_key)
+        if entry is not None:
+            url, reuse_until = entry
+            if self.clock() < reuse_until:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return url
+            del self._entries[cache_key]
+            self.expirations += 1
+        self.misses += 1
+        return None
+
+    def put(self, key: str, expires_in: int, url: str, signed_at: Optional[float] = None) -> None:
+        lifetime = self.lifetime(expires_in)
+        signed_at = self.clock() if signed_at is None else signed_at
+        reuse_until = signed_at + lifetime * (1 - self.safe_fraction)
+        self._entries[(key, lifetime)] = (url, reuse_until)
+        self._entries.move_to_end((key, lifetime))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def split(self, keys: Iterable[str], expires_in: int) -> Tuple[Dict[str, str], list]:
+        """(cached urls by key, keys still to sign) for a batch."""
+        found, missing = {}, []
+        for key in dict.fromkeys(keys):
+            url = self.get(key, expires_in)
+            if url is None:
+                missing.append(key)
+            else:
+                found[key] = url
+        return found, missing
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+presign_cache = PresignCache()
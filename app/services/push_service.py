@@ -0,0 +1,191 @@
+# app/services/push_service.py
+
+"""
+Service: Push Service
+Purpose: Tells connected display pages (over SSE, see /display/events) that
+         their active playlist changed, so they refetch /display/manifest
+         right away instead of waiting for the next poll.
+
+  • one Subscriber (bounded asyncio.Queue) per open display connection
+  • store listeners map each devices / playlists / metadata change to the
+    subscribed devices it affects and publish {"version": N} to them
+  • a subscriber whose queue is full is evicted; its page reconnects and
+    refetches the manifest, so nothing is lost
+"""
+
+import asyncio
+import threading
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Set
+
+from app.services.device_service import device_store
+from app.services.metadata_service import metadata_store
+from app.services.playlist_service import playlist_store
+
+PUSH_QUEUE_SIZE = 8          # Pending events per connection before eviction
+PUSH_KEEPALIVE_SECONDS = 25  # SSE comment interval (keeps proxies from closing idle streams)
+
+
+class Subscriber:
+    __slots__ = ("device_id", "queue", "evicted")
+
+    def __init__(self, device_id: str, queue_size: int):
+        self.device_id = device_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.evicted = False
+
+
+class PushBroker:
+    """
+    Fan-out of "playlist changed" events to subscribers keyed by device id.
+    publish() and subscribed_devices() may be called from any thread (store
+    listeners run in the writer's); the subscriber map is guarded by a lock and
+    only ever iterated as a snapshot. Delivery happens on the event loop.
+    `on_idle(device_id)` runs when a device's last connection goes away.
+    """
+
+    def __init__(self, queue_size: int = PUSH_QUEUE_SIZE, on_idle: Optional[Callable[[str], None]] = None):
+        self.queue_size = queue_size
+        self.version = 0
+        self.evictions = 0
+        self.on_idle = on_idle
+        self._subscribers: Dict[str, Set[Subscriber]] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # --- Connections ---
+    def subscribe(self, device_id: str) -> Subscriber:
+        self._loop = asyncio.get_running_loop()
+        subscriber = Subscriber(device_id, self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(device_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            subs = self._subscribers.get(subscriber.device_id)
+            if subs is None or subscriber not in subs:
+                return
+            subs.discard(subscriber)
+            idle = not subs
+            if idle:
+                del self._subscribers[subscriber.device_id]
+        if idle and self.on_idle is not None:
+            self.on_idle(subscriber.device_id)
+
+    def subscribed_devices(self) -> List[str]:
+        with self._lock:
+            return list(self._subscribers)
+
+    @property
+    def connections(self) -> int:
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+    # --- Publishing ---
+    def publish(self, device_ids: Iterable[str]) -> None:
+        """Queue a change event for every connection of the given devices."""
+        device_ids = list(device_ids)
+        if not device_ids or self._loop is None or self._loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._deliver(device_ids)
+        else:
+            self._loop.call_soon_threadsafe(self._deliver, device_ids)
+
+    def _deliver(self, device_ids: List[str]) -> int:
+        self.version += 1
+        event = {"version": self.version}
+        delivered = 0
+        with self._lock:
+            targets = [sub for device_id in device_ids for sub in self._subscribers.get(device_id, ())]
+        for subscriber in targets:
+            try:
+                subscriber.queue.put_nowait(event)
+                delivered += 1
+            except asyncio.QueueFull:
+                # Slow consumer: drop it; the page reconnects and refetches the manifest
+                subscriber.evicted = True
+                self.evictions += 1
+                self.unsubscribe(subscriber)
+        return delivered
+
+
+broker = PushBroker()
+
+
+# === Store change → affected devices ===
+_assignments: Dict[str, tuple] = {}   # device_id → (active_playlist, screen) last seen by the broker
+_assignments_lock = threading.Lock()
+
+
+def _devices_on_playlists(playlists: Set[str]) -> List[str]:
+    devices = device_store.view()
+    return [
+        device_id for device_id in broker.subscribed_devices()
+        if device_id in devices and devices[device_id].get("active_playlist") in playlists
+    ]
+
+
+def _assignment(device: Optional[Mapping]) -> tuple:
+    """The device fields its manifest depends on."""
+    if not device:
+        return (None, None)
+    return (device.get("active_playlist"), device.get("screen"))
+
+
+def _on_devices_changed(store, keys: Optional[List[str]]) -> None:
+    # Only playlist (re)assignment / screen changes matter; heartbeat flushes are ignored
+    devices = store.view()
+    affected = []
+    with _assignments_lock:
+        for device_id in broker.subscribed_devices():
+            if keys is not None and device_id not in keys:
+                continue
+            assignment = _assignment(devices.get(device_id))
+            if _assignments.get(device_id, assignment) != assignment:
+                affected.append(device_id)
+            _assignments[device_id] = assignment
+    broker.publish(affected)
+
+
+def _on_playlists_changed(store, keys: Optional[List[str]]) -> None:
+    if keys is None:
+        broker.publish(broker.subscribed_devices())
+    else:
+        broker.publish(_devices_on_playlists(set(keys)))
+
+
+def _on_metadata_changed(store, keys: Optional[List[str]]) -> None:
+    if keys is None:
+        broker.publish(broker.subscribed_devices())
+        return
+    changed = set(keys)
+    playlists = {
+        name for name, info in playlist_store.view().items()
+        if not changed.isdisjoint(info.get("images", ()))
+    }
+    broker.publish(_devices_on_playlists(playlists))
+
+
+def remember_assignment(device_id: str) -> None:
+    """Record a newly subscribed device's playlist so later reassignments are detected."""
+    device = device_store.get(device_id)
+    with _assignments_lock:
+        _assignments[device_id] = _assignment(device)
+
+
+def forget_assignment(device_id: str) -> None:
+    """Drop a device's recorded playlist once its last connection closes."""
+    with _assignments_lock:
+        _assignments.pop(device_id, None)
+
+
+broker.on_idle = forget_assignment
+
+device_store.add_listener(_on_devices_changed)
+playlist_store.add_listener(_on_playlists_changed)
+metadata_store.add_listener(_on_metadata_changed)
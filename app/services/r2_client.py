@@ -0,0 +1,196 @@
+# app/services/r2_client.py
+
+"""
+Service: R2 Client
+Purpose: One long-lived, pooled S3 client for R2, shared by every request.
+
+Creating an aioboto3 client per call costs client construction, endpoint
+resolution and (for network calls) a fresh TLS handshake; presigning 500 URLs
+that way takes seconds. Instead:
+
+  • the client is created at app startup and closed on shutdown (main.py);
+    code outside the app (scripts, tests) gets it lazily on first use
+  • its aiohttp connection pool holds up to R2_MAX_POOL_CONNECTIONS
+    keep-alive connections
+  • callers borrow it with `async with r2.client() as client:`, which counts
+    leases (borrowers, not sockets: a lease may hold any number of pooled
+    connections) so load against the pool size is visible in stats()
+  • a background health check (HeadBucket) swaps in a fresh client after
+    repeated failures; the old one is closed once its last lease is returned
+"""
+
+import asyncio
+import contextlib
+import time
+from typing import AsyncIterator, Dict, Optional
+
+import aioboto3
+from aiobotocore.config import AioConfig
+
+from app.config import (
+    R2_ACCESS_KEY,
+    R2_BUCKET_NAME,
+    R2_CONNECT_TIMEOUT,
+    R2_ENDPOINT_URL,
+    R2_HEALTH_INTERVAL,
+    R2_MAX_POOL_CONNECTIONS,
+    R2_READ_TIMEOUT,
+    R2_SECRET_KEY,
+)
+
+HEALTH_FAILURES_BEFORE_RESET = 3
+
+
+class R2ClientManager:
+    """Owns the shared client; see the module docstring."""
+
+    def __init__(self, max_pool_connections: int = R2_MAX_POOL_CONNECTIONS):
+        self.max_pool_connections = max_pool_connections
+        self._session = aioboto3.Session()
+        self._context = None
+        self._client = None
+        self._leases: Dict[int, int] = {}   # id(client) → open leases
+        self._retired: Dict[int, object] = {}  # id(client) → context of a replaced client
+        self._lock: Optional[asyncio.Lock] = None
+        self._health_task: Optional[asyncio.Task] = None
+
+        # --- Metrics ---
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.leases = 0
+        self.leases_beyond_pool = 0   # Leases taken while in_use ≥ pool size (borrowers, not connections)
+        self.created = 0
+        self.healthy: Optional[bool] = None
+        self.health_failures = 0
+        self.last_health_check: Optional[float] = None
+
+    # --- Lifecycle ---
+    async def start(self) -> None:
+        if self._client is not None:
+            return
+        self._lock = self._lock or asyncio.Lock()
+        async with self._lock:
+            if self._client is not None:
+                return
+            await self._open_client()
+
+    async def _open_client(self) -> None:
+        context = self._session.client(
+            "s3",
+            region_name="auto",
+            endpoint_url=R2_ENDPOINT_URL,
+            aws_access_key_id=R2_ACCESS_KEY,
+            aws_secret_access_key=R2_SECRET_KEY,
+            config=AioConfig(
+                max_pool_connections=self.max_pool_connections,
+                connect_timeout=R2_CONNECT_TIMEOUT,
+                read_timeout=R2_READ_TIMEOUT,
+                retries={"max_attempts": 3, "mode": "standard"},
+                tcp_keepalive=True,
+            ),
+        )
+        self._client = await context.__aenter__()
+        self._context = context
+        self.created += 1
+
+    async def close(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        context, self._context, self._client = self._context, None, None
+        retired, self._retired = list(self._retired.values()), {}
+        for ctx in [context, *retired]:
+            if ctx is not None:
+                await ctx.__aexit__(None, None, None)
+
+    async def reset(self) -> None:
+        """
+        Swap in a fresh client. The old one keeps serving the requests that
+        hold it and is closed when its last lease is returned.
+        """
+        self._lock = self._lock or asyncio.Lock()
+        async with self._lock:
+            old_client, old_context = self._client, self._context
+            await self._open_client()
+            if old_context is not None:
+                if self._leases.get(id(old_client)):
+                    self._retired[id(old_client)] = old_context
+                else:
+                    await old_context.__aexit__(None, None, None)
+
+    @contextlib.asynccontextmanager
+    async def client(self) -> AsyncIterator:
+        """Borrow the shared client for one operation (or a related batch)."""
+        if self._client is None:
+            await self.start()
+        client = self._client
+        self.leases += 1
+        if self.in_use >= self.max_pool_connections:
+            self.leases_beyond_pool += 1
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        self._leases[id(client)] = self._leases.get(id(client), 0) + 1
+        try:
+            yield client
+        finally:
+            self.in_use -= 1
+            await self._release(client)
+
+    async def _release(self, client) -> None:
+        remaining = self._leases[id(client)] - 1
+        if remaining:
+            self._leases[id(client)] = remaining
+            return
+        del self._leases[id(client)]
+        context = self._retired.pop(id(client), None)
+        if context is not None:
+            try:
+                await context.__aexit__(None, None, None)
+            except Exception as e:
+                print(f"[WARN] Closing a replaced R2 client failed: {e}")
+
+    # --- Health ---
+    async def health_check(self) -> bool:
+        """HeadBucket on the shared client; recreate it after repeated failures."""
+        self.last_health_check = time.time()
+        try:
+            async with self.client() as client:
+                await client.head_bucket(Bucket=R2_BUCKET_NAME)
+        except Exception as e:
+            self.healthy = False
+            self.health_failures += 1
+            print(f"[WARN] R2 health check failed ({self.health_failures}): {e}")
+            if self.health_failures >= HEALTH_FAILURES_BEFORE_RESET:
+                await self.reset()  # in-flight requests finish on the old client
+                self.health_failures = 0
+            return False
+        self.healthy = True
+        self.health_failures = 0
+        return True
+
+    def start_health_checks(self, interval: float = R2_HEALTH_INTERVAL) -> None:
+        async def _loop():
+            while True:
+                await self.health_check()
+                await asyncio.sleep(interval)
+
+        if interval > 0 and self._health_task is None:
+            self._health_task = asyncio.get_running_loop().create_task(_loop())
+
+    def stats(self) -> Dict:
+        return {
+            "started": self._client is not None,
+            "healthy": self.healthy,
+            "last_health_check": self.last_health_check,
+            "max_pool_connections": self.max_pool_connections,
+            "in_use": self.in_use,
+            "peak_in_use": self.peak_in_use,
+            "pool_utilisation": round(self.in_use / self.max_pool_connections, 3),
+            "leases": self.leases,
+            "leases_beyond_pool": self.leases_beyond_pool,
+            "retired_clients": len(self._retired),
+            "clients_created": self.created,
+        }
+
+
+r2 = R2ClientManager()
@@ -0,0 +1,245 @@
+# app/services/r2_upload.py
+
+"""
+Service: R2 Upload
+Purpose: Resumable, parallel multipart uploads to R2 (or any S3-compatible store).
+
+  • bytes are cut into R2_PART_SIZE parts as they stream in; at most
+    R2_PART_CONCURRENCY parts are in flight, so memory stays bounded at
+    roughly (concurrency + 1) × part size regardless of file size
+  • each finished part (number, ETag, size) is recorded in
+    app/data/r2_uploads.json under the client's upload key, so an
+    interrupted upload can continue from the last contiguous part instead
+    of restarting (see GET /media/upload/{upload_key})
+  • failed parts are retried with backoff before the upload gives up
+  • uploads left idle for R2_UPLOAD_TTL are aborted on R2 and forgotten by
+    sweep_stale_uploads(), so abandoned parts don't accrue storage
+"""
+
+import asyncio
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+
+from app.config import R2_BUCKET_NAME, R2_PART_CONCURRENCY, R2_PART_SIZE, R2_UPLOAD_TTL
+from app.services.json_store import JsonStore, thaw
+
+UPLOAD_STATE_FILE = Path("app/data/r2_uploads.json")
+PART_RETRIES = 3
+RETRY_BACKOFF = 0.5              # Seconds before the first retry; doubles each attempt
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3/R2 lower bound for every part except the last
+
+upload_state = JsonStore(UPLOAD_STATE_FILE)
+
+
+# === Persisted state ===
+
+def _put_state(upload_key: str, state: Optional[Dict]) -> None:
+    """Record or forget one upload atomically (safe across threads and workers)."""
+    def put(uploads: Dict) -> None:
+        if state is None:
+            uploads.pop(upload_key, None)
+        else:
+            uploads[upload_key] = state
+
+    upload_state.update(put)
+
+
+def get_upload(upload_key: str) -> Optional[Dict]:
+    """Persisted state of an unfinished upload, plus the offset to resume from."""
+    state = upload_state.get(upload_key)
+    if state is None:
+        return None
+    return {
+        "upload_key": upload_key,
+        "key": state["key"],
+        "part_size": state["part_size"],
+        "offset": resume_offset(state),
+    }
+
+
+def resume_offset(state) -> int:
+    """Bytes covered by the contiguous run of finished parts starting at part 1."""
+    offset, number = 0, 1
+    parts = state.get("parts", {})
+    while str(number) in parts:
+        offset += parts[str(number)]["size"]
+        number += 1
+    return offset
+
+
+# === Writer ===
+
+class MultipartWriter:
+    """
+    Sink for one object: write() cuts the stream into parts and uploads them
+    in the background; close() waits for them and completes the upload.
+    Satisfies upload_engine's sink interface (.upload / write / close / abort).
+    """
+
+    def __init__(self, client, upload_key: str, state: Dict, concurrency: int):
+        self.client = client
+        self.upload_key = upload_key
+        self.key = state["key"]
+        self.upload_id = state["upload_id"]
+        self.part_size = state["part_size"]
+        self.state = state
+        self.upload = self
+        self.media_type: Optional[str] = None
+
+        # Resume after the contiguous prefix; parts past a gap are re-sent
+        self.size = resume_offset(state)
+        self.next_part = 1
+        while str(self.next_part) in state["parts"]:
+            self.next_part += 1
+        state["parts"] = {n: p for n, p in state["parts"].items() if int(n) < self.next_part}
+
+        self._buffer = bytearray()
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        self._tasks = set()
+        self._error: Optional[BaseException] = None
+
+    async def write(self, data: bytes) -> None:
+        self._raise_failed()
+        self._buffer += data
+        while len(self._buffer) >= self.part_size:
+            body = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            await self._send(body)
+
+    async def close(self, media_type: Optional[str] = None) -> None:
+        """Upload the final part, wait for all parts and complete the object."""
+        if self._buffer or self.next_part == 1:
+            await self._send(bytes(self._buffer))
+            self._buffer.clear()
+        await self._drain()
+        self._raise_failed()
+        parts = sorted(
+            ({"PartNumber": int(n), "ETag": p["etag"]} for n, p in self.state["parts"].items()),
+            key=lambda p: p["PartNumber"],
+        )
+        await self.client.complete_multipart_upload(
+            Bucket=R2_BUCKET_NAME, Key=self.key, UploadId=self.upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+        await asyncio.to_thread(_put_state, self.upload_key, None)
+        self.media_type = media_type
+
+    async def abort(self) -> None:
+        """
+        Stop after the parts already in flight. The multipart upload is kept
+        open (and its finished parts recorded) so the client can resume;
+        use abort_upload() to give it up for good.
+        """
+        await self._drain()
+
+    # --- Internals ---
+    async def _send(self, body: bytes) -> None:
+        await self._slots.acquire()
+        number = self.next_part
+        self.next_part += 1
+        self.size += len(body)
+        task = asyncio.create_task(self._upload_part(number, body))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _upload_part(self, number: int, body: bytes) -> None:
+        try:
+            for attempt in range(PART_RETRIES):
+                try:
+                    response = await self.client.upload_part(
+                        Bucket=R2_BUCKET_NAME, Key=self.key, UploadId=self.upload_id,
+                        PartNumber=number, Body=body,
+                    )
+                    break
+                except Exception:
+                    if attempt == PART_RETRIES - 1:
+                        raise
+                    await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+            self.state["parts"][str(number)] = {"etag": response["ETag"], "size": len(body)}
+            self.state["updated"] = time.time()
+            await asyncio.to_thread(_put_state, self.upload_key, thaw(self.state))
+        except Exception as e:
+            self._error = self._error or e
+        finally:
+            self._slots.release()
+
+    async def _drain(self) -> None:
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def _raise_failed(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+
+async def open_multipart_upload(
+    client,
+    upload_key: str,
+    key: str,
+    offset: int = 0,
+    part_size: int = R2_PART_SIZE,
+    concurrency: int = R2_PART_CONCURRENCY,
+) -> MultipartWriter:
+    """
+    Start (or resume) the multipart upload recorded under `upload_key`.
+    `offset` is where the bytes about to be written start in the file; when
+    resuming it must equal the recorded resume offset (else 409). `key` is
+    only used for a new upload; a resumed one keeps its original key.
+    """
+    state = upload_state.get(upload_key)
+    if state is not None:
+        state = thaw(state)
+        expected = resume_offset(state)
+    else:
+        expected = 0
+    if offset != expected:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload {upload_key} must resume at byte {expected}, not {offset}.",
+        )
+
+    if state is None:
+        response = await client.create_multipart_upload(Bucket=R2_BUCKET_NAME, Key=key)
+        state = {
+            "key": key,
+            "upload_id": response["UploadId"],
+            "part_size": max(part_size, MIN_PART_SIZE),
+            "parts": {},
+            "started": time.time(),
+        }
+        await asyncio.to_thread(_put_state, upload_key, state)
+    return MultipartWriter(client, upload_key, state, concurrency)
+
+
+async def abort_upload(client, upload_key: str) -> bool:
+    """Abandon an unfinished upload: abort it on R2 and forget its state."""
+    state = upload_state.get(upload_key)
+    if state is None:
+        return False
+    await client.abort_multipart_upload(Bucket=R2_BUCKET_NAME, Key=state["key"], UploadId=state["upload_id"])
+    await asyncio.to_thread(_put_state, upload_key, None)
+    return True
+
+
+async def sweep_stale_uploads(client, ttl: float = R2_UPLOAD_TTL, now: Optional[float] = None) -> int:
+    """
+    Abort every unfinished upload with no part finished for `ttl` seconds.
+    Entries whose abort fails are kept for the next sweep.
+    Returns the number of uploads aborted.
+    """
+    cutoff = (now if now is not None else time.time()) - ttl
+    stale = [
+        upload_key for upload_key, state in upload_state.view().items()
+        if state.get("updated", state.get("started", 0)) < cutoff
+    ]
+    aborted = 0
+    for upload_key in stale:
+        try:
+            if await abort_upload(client, upload_key):
+                aborted += 1
+        except Exception as e:
+            print(f"[WARN] Could not abort stale upload {upload_key}: {e}")
+    return aborted
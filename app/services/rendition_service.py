@@ -0,0 +1,188 @@
+# app/services/rendition_service.py
+
+"""
+Service: Rendition Service
+Purpose: Generates resized / recompressed variants of uploaded images so each
+         screen downloads (and decodes) something close to its own resolution
+         instead of the multi-MB original.
+
+  • renditions are rendered in a ProcessPoolExecutor (Pillow work is CPU-bound
+    and would otherwise hold the GIL / block the event loop)
+  • output goes to app/static/uploads/renditions/<digest>.<height>.<ext>,
+    recorded in the file's metadata entry under "renditions"; uploads that
+    share an object (see object_store) share its renditions
+  • pick_rendition() chooses the smallest variant that still covers a screen
+  • animated images (GIF / APNG / animated WebP) get no renditions, so the
+    manifest keeps serving the animated original
+"""
+
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence
+
+from app.config import RENDITION_WORKERS
+
+UPLOAD_DIR = Path("app/static/uploads")
+RENDITION_DIR = UPLOAD_DIR / "renditions"
+RENDITION_HEIGHTS = (720, 1080, 2160)
+RENDITION_FORMATS = ("webp", "jpeg")
+RENDITION_QUALITY = 82
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pending = set()  # Keeps background rendition tasks alive until they finish
+
+
+# === Pool lifecycle (wired to app startup / shutdown in main.py) ===
+
+def start_pool() -> None:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=RENDITION_WORKERS or None)
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def run_in_pool(fn, *args):
+    """Run a picklable CPU-bound function in the rendition pool."""
+    start_pool()
+    return await asyncio.get_running_loop().run_in_executor(_pool, fn, *args)
+
+
+# === Worker (runs in a child process) ===
+
+def _flatten(image, background=(255, 255, 255)):
+    """RGB copy for JPEG: transparent areas are composited onto white, not black."""
+    from PIL import Image
+
+    if image.mode in ("RGB", "L"):
+        return image
+    if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+        rgba = image.convert("RGBA")
+        flat = Image.new("RGB", rgba.size, background)
+        flat.paste(rgba, mask=rgba.getchannel("A"))
+        return flat
+    return image.convert("RGB")
+
+
+def render_variants(source: str, out_dir: str, basename: str,
+                    heights: Sequence[int] = RENDITION_HEIGHTS,
+                    formats: Sequence[str] = RENDITION_FORMATS) -> List[Dict]:
+    """
+    Write one file per (height, format) no taller than the original.
+    Returns [{"height", "width", "format", "file"}] with `file` relative to UPLOAD_DIR,
+    or [] for animated images (a single-frame rendition would freeze them).
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as original:
+        if getattr(original, "n_frames", 1) > 1:
+            return []
+        image = ImageOps.exif_transpose(original)
+        image.load()
+
+    os.makedirs(out_dir, exist_ok=True)
+    # Every target below the original, plus a same-size recompression unless it exceeds the largest target
+    targets = sorted(h for h in heights if h < image.height)
+    if image.height <= max(heights):
+        targets.append(image.height)
+    variants = []
+    for height in targets:
+        width = max(1, round(image.width * height / image.height))
+        resized = image if height == image.height else image.resize((width, height), Image.LANCZOS)
+        for fmt in formats:
+            name = f"{basename}.{height}.{'jpg' if fmt == 'jpeg' else fmt}"
+            frame = _flatten(resized) if fmt == "jpeg" else resized
+            options = {"quality": RENDITION_QUALITY}
+            if fmt == "jpeg":
+                options.update(optimize=True, progressive=True)
+            else:
+                options.update(method=4)
+            frame.save(os.path.join(out_dir, name), fmt.upper(), **options)
+            variants.append({
+                "height": height,
+                "width": width,
+                "format": fmt,
+                "file": f"{RENDITION_DIR.name}/{name}",
+            })
+    return variants
+
+
+# === Scheduling ===
+
+async def generate_renditions(filename: str, source: Optional[Path] = None,
+                              basename: Optional[str] = None) -> List[Dict]:
+    """
+    Render variants of an uploaded file in the process pool.
+    Returns [] for files Pillow can't open (e.g. video).
+    """
+    start_pool()
+    source = source or UPLOAD_DIR / filename
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            _pool, render_variants, str(source), str(RENDITION_DIR), basename or Path(filename).name
+        )
+    except Exception as e:
+        print(f"[WARN] Rendition generation failed for {filename}: {e}")
+        return []
+
+
+def schedule_renditions(filename: str) -> None:
+    """
+    Fire-and-forget: render variants and record them in the file's metadata.
+    Content-addressed uploads are rendered once per object, under its digest.
+    """
+    from app.services.metadata_service import metadata_store, set_file_renditions
+    from app.services.object_store import media_path
+
+    meta = metadata_store.get(filename) or {}
+    digest = meta.get("digest")
+    if digest:
+        for other in metadata_store.view().values():
+            if other.get("digest") == digest and other.get("renditions"):
+                set_file_renditions(filename, other["renditions"])
+                return
+
+    async def _run():
+        renditions = await generate_renditions(filename, media_path(filename, meta), digest)
+        if renditions:
+            set_file_renditions(filename, renditions)
+
+    task = asyncio.get_running_loop().create_task(_run())
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+def delete_renditions(meta: Optional[Mapping]) -> None:
+    """Remove the rendition files listed in a metadata entry."""
+    for variant in (meta or {}).get("renditions", ()):
+        path = UPLOAD_DIR / variant["file"]
+        if path.exists():
+            path.unlink()
+
+
+# === Selection ===
+
+def pick_rendition(renditions: Sequence[Mapping], screen_height: Optional[int],
+                   webp: bool = True) -> Optional[Mapping]:
+    """
+    Smallest variant at least as tall as the screen (else the largest),
+    in WebP when the device supports it, otherwise JPEG.
+    """
+    fmt = "webp" if webp else "jpeg"
+    candidates = sorted((r for r in renditions if r["format"] == fmt), key=lambda r: r["height"])
+    if not candidates:
+        return None
+    if not screen_height:
+        return candidates[-1]
+    for rendition in candidates:
+        if rendition["height"] >= screen_height:
+            return rendition
+    return candidates[-1]
@@ -0,0 +1,289 @@
+# app/services/schedule_index.py
+
+"""
+Service: Schedule Index
+Purpose: Answers schedule-window questions about media without scanning
+         (or re-parsing the dates of) every metadata entry.
+
+Dates are parsed once into day ordinals and kept in:
+  • a centered interval tree over the fixed date domain (0001-01-01 … 9999-12-31),
+    one for all files plus one per playlist → "active on D" in O(log U + k)
+  • lists of (end, filename) / (start, filename) sorted by date → "expiring
+    within N days", "expired before D", "starts after D" in O(log n + k)
+  • the same trees answer "scheduled at any point in [A, B]" (range overlap)
+
+The tree splits the date domain by midpoint rather than by the data, so its
+depth stays ~22 no matter what order entries arrive in, and inserts/removes
+are incremental.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+_DOMAIN_LO = date.min.toordinal()
+_DOMAIN_HI = date.max.toordinal()
+
+Interval = Tuple[int, int, str]  # (start, end, filename)
+
+
+def _to_ordinal(value: str) -> int:
+    # fromisoformat is ~10x faster than strptime; stored dates are validated as YYYY-MM-DD on write
+    return date.fromisoformat(value).toordinal()
+
+
+# === Interval Tree ===
+
+class _Node:
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, center: int):
+        self.center = center
+        self.by_start: List[Interval] = []              # ascending start
+        self.by_end: List[Tuple[int, int, str]] = []     # ascending end: (end, start, filename)
+        self.left: Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+
+
+class IntervalTree:
+    """
+    Centered interval tree with closed [start, end] day-ordinal intervals.
+    """
+
+    def __init__(self):
+        self._root: Optional[_Node] = None
+        self.size = 0
+
+    def _path(self, start: int, end: int, create: bool) -> Optional[_Node]:
+        """Walk to the node whose center lies inside [start, end]."""
+        lo, hi = _DOMAIN_LO, _DOMAIN_HI
+        if self._root is None:
+            if not create:
+                return None
+            self._root = _Node((lo + hi) // 2)
+        node = self._root
+        while True:
+            if start <= node.center <= end:
+                return node
+            if end < node.center:
+                hi = node.center - 1
+                if node.left is None:
+                    if not create:
+                        return None
+                    node.left = _Node((lo + hi) // 2)
+                node = node.left
+            else:
+                lo = node.center + 1
+                if node.right is None:
+                    if not create:
+                        return None
+                    node.right = _Node((lo + hi) // 2)
+                node = node.right
+
+    def add(self, start: int, end: int, key: str) -> None:
+        node = self._path(start, end, create=True)
+        insort(node.by_start, (start, end, key))
+        insort(node.by_end, (end, start, key))
+        self.size += 1
+
+    def bulk_add(self, intervals: List[Interval]) -> None:
+        """Add many intervals at once: append to nodes, then sort each node once."""
+        touched = {}
+        for start, end, key in intervals:
+            node = self._path(start, end, create=True)
+            node.by_start.append((start, end, key))
+            node.by_end.append((end, start, key))
+            touched[id(node)] = node
+        for node in touched.values():
+            node.by_start.sort()
+            node.by_end.sort()
+        self.size += len(intervals)
+
+    def remove(self, start: int, end: int, key: str) -> None:
+        node = self._path(start, end, create=False)
+        if node is None:
+            return
+        i = bisect_left(node.by_start, (start, end, key))
+        if i < len(node.by_start) and node.by_start[i] == (start, end, key):
+            del node.by_start[i]
+            j = bisect_left(node.by_end, (end, start, key))
+            del node.by_end[j]
+            self.size -= 1
+
+    def stab(self, point: int) -> Iterator[str]:
+        """Yield every key whose interval contains `point`."""
+        node = self._root
+        while node is not None:
+            if point < node.center:
+                for start, _end, key in node.by_start:
+                    if start > point:
+                        break
+                    yield key
+                node = node.left
+            elif point > node.center:
+                for i in range(len(node.by_end) - 1, -1, -1):
+                    end, _start, key = node.by_end[i]
+                    if end < point:
+                        break
+                    yield key
+                node = node.right
+            else:
+                for _start, _end, key in node.by_start:
+                    yield key
+                return
+
+    def overlap(self, lo: int, hi: int) -> Iterator[str]:
+        """Yield every key whose interval intersects [lo, hi]."""
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            if hi < node.center:
+                for start, _end, key in node.by_start:
+                    if start > hi:
+                        break
+                    yield key
+                stack.append(node.left)
+            elif lo > node.center:
+                for i in range(len(node.by_end) - 1, -1, -1):
+                    end, _start, key = node.by_end[i]
+                    if end < lo:
+                        break
+                    yield key
+                stack.append(node.right)
+            else:
+                for _start, _end, key in node.by_start:
+                    yield key
+                stack.append(node.left)
+                stack.append(node.right)
+
+
+# === Schedule Index ===
+
+class ScheduleIndex:
+    """
+    Precomputed schedule windows for metadata entries, kept in step with the
+    metadata store's version counter.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.version = -1
+        self._clear()
+
+    def _clear(self) -> None:
+        self._entries: Dict[str, Tuple[int, int, Tuple[str, ...]]] = {}
+        self._all = IntervalTree()
+        self._by_playlist: Dict[str, IntervalTree] = {}
+        self._ends: List[Tuple[int, str]] = []
+        self._starts: List[Tuple[int, str]] = []
+
+    # --- Maintenance ---
+    def rebuild(self, metadata: Mapping, version: int) -> None:
+        with self._lock:
+            self._clear()
+            per_playlist: Dict[str, List[Interval]] = {}
+            for filename, info in metadata.items():
+                entry = self._parse(filename, info)
+                if entry is None:
+                    continue
+                start, end, playlists = entry
+                self._entries[filename] = entry
+                for playlist in playlists:
+                    per_playlist.setdefault(playlist, []).append((start, end, filename))
+            self._all.bulk_add([(start, end, f) for f, (start, end, _p) in self._entries.items()])
+            for playlist, intervals in per_playlist.items():
+                tree = self._by_playlist[playlist] = IntervalTree()
+                tree.bulk_add(intervals)
+            self._ends = sorted((end, f) for f, (_start, end, _p) in self._entries.items())
+            self._starts = sorted((start, f) for f, (start, _end, _p) in self._entries.items())
+            self.version = version
+
+    def _parse(self, filename: str, info: Mapping) -> Optional[Tuple[int, int, Tuple[str, ...]]]:
+        try:
+            start = _to_ordinal(info["start"])
+            end = _to_ordinal(info["end"])
+        except Exception as e:
+            print(f"[WARN] Failed parsing date for {filename}: {e}")
+            return None
+        if end < start:
+            print(f"[WARN] End date precedes start date for {filename}")
+            return None
+        return start, end, tuple(dict.fromkeys(info.get("playlists", [])))
+
+    def put(self, filename: str, info: Mapping) -> None:
+        """Add or replace one entry; entries with unparsable dates are skipped."""
+        with self._lock:
+            self.discard(filename)
+            entry = self._parse(filename, info)
+            if entry is None:
+                return
+            start, end, playlists = entry
+            self._entries[filename] = entry
+            self._all.add(start, end, filename)
+            for playlist in playlists:
+                self._by_playlist.setdefault(playlist, IntervalTree()).add(start, end, filename)
+            insort(self._ends, (end, filename))
+            insort(self._starts, (start, filename))
+
+    def discard(self, filename: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(filename, None)
+            if entry is None:
+                return
+            start, end, playlists = entry
+            self._all.remove(start, end, filename)
+            for playlist in playlists:
+                tree = self._by_playlist.get(playlist)
+                if tree is not None:
+                    tree.remove(start, end, filename)
+            i = bisect_left(self._ends, (end, filename))
+            if i < len(self._ends) and self._ends[i] == (end, filename):
+                del self._ends[i]
+            i = bisect_left(self._starts, (start, filename))
+            if i < len(self._starts) and self._starts[i] == (start, filename):
+                del self._starts[i]
+
+    # --- Queries ---
+    def active_on(self, day: date) -> List[str]:
+        """Files whose [start, end] window contains `day`."""
+        with self._lock:
+            return list(self._all.stab(day.toordinal()))
+
+    def active_in_playlist(self, playlist: str, day: date) -> List[str]:
+        """Files tagged with `playlist` that are active on `day`."""
+        with self._lock:
+            tree = self._by_playlist.get(playlist)
+            return list(tree.stab(day.toordinal())) if tree else []
+
+    def overlapping(self, start: date, end: date, playlist: Optional[str] = None) -> List[str]:
+        """Files (optionally tagged with `playlist`) scheduled at any point in [start, end]."""
+        with self._lock:
+            tree = self._all if playlist is None else self._by_playlist.get(playlist)
+            return list(tree.overlap(start.toordinal(), end.toordinal())) if tree else []
+
+    def scheduled_after(self, day: date) -> List[str]:
+        """Files whose start date is later than `day` (not yet active)."""
+        with self._lock:
+            lo = bisect_right(self._starts, (day.toordinal(), "\U0010ffff"))
+            return [filename for _start, filename in self._starts[lo:]]
+
+    def window(self, filename: str) -> Optional[Tuple[int, int]]:
+        """Parsed (start, end) day ordinals of an indexed file."""
+        entry = self._entries.get(filename)
+        return entry[:2] if entry else None
+
+    def expiring_within(self, days: int, today: date) -> List[str]:
+        """Files whose end date falls in [today, today + days], soonest first."""
+        with self._lock:
+            lo = bisect_left(self._ends, (today.toordinal(),))
+            hi = bisect_right(self._ends, (today.toordinal() + days, "\U0010ffff"))
+            return [filename for _end, filename in self._ends[lo:hi]]
+
+    def expired_before(self, day: date) -> List[str]:
+        """Files whose end date is earlier than `day`."""
+        with self._lock:
+            hi = bisect_left(self._ends, (day.toordinal(),))
+            return [filename for _end, filename in self._ends[:hi]]
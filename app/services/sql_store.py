@@ -0,0 +1,245 @@
+# app/services/sql_store.py
+
+"""
+Service: SQL Store
+Purpose: Database-backed drop-in for JsonStore (STORAGE_BACKEND=sqlite).
+
+Keeps JsonStore's in-memory cache, read-only views and version counter, but:
+  • the "file signature" is a per-store row in `storeversion`, so other
+    workers' writes invalidate our cache with one indexed lookup; the row is
+    read at most once per SQL_VERSION_TTL seconds on the read path (and
+    always before a write), so reads are served from memory
+  • save() diffs against the cache and upserts only the changed entries,
+    moving the version row from the version it read to the next one
+    (UPDATE … WHERE version = :expected) in the same transaction; if another
+    worker got there first it raises StoreConflict instead of overwriting
+  • update(fn) retries fn on the latest document after a conflict
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import update as sql_update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, delete, select
+
+from app.config import SQL_VERSION_TTL
+from app.database import engine as default_engine, init_db
+from app.models.storage_models import (
+    DeviceRow,
+    FileMetadataPlaylistRow,
+    FileMetadataRow,
+    PlaylistImageRow,
+    PlaylistRow,
+    StoreVersion,
+)
+from app.services.json_store import JsonStore, _clone
+
+UPDATE_ATTEMPTS = 5  # update() re-runs fn this often before giving up on a busy store
+
+
+class StoreConflict(RuntimeError):
+    """Another worker saved the store after this one read it."""
+
+
+class SqlStore(JsonStore):
+    """
+    Base class; subclasses map top-level entries to rows.
+    """
+
+    name = ""
+
+    def __init__(self, upgrade: Optional[Callable[[Dict], Dict]] = None, engine=None,
+                 version_ttl: float = SQL_VERSION_TTL, clock: Callable[[], float] = time.monotonic):
+        self.engine = engine or default_engine
+        self.version_ttl = version_ttl
+        self._clock = clock
+        self._db_version = 0
+        self._checked_at: Optional[float] = None  # When the version row was last read
+        super().__init__(Path(self.name), upgrade=upgrade, mode="sql")
+        init_db(self.engine)
+
+    # --- Signature = version row (cached for version_ttl) ---
+    def _stat(self) -> Optional[int]:
+        now = self._clock()
+        if self._checked_at is None or now - self._checked_at >= self.version_ttl:
+            with Session(self.engine) as session:
+                row = session.get(StoreVersion, self.name)
+                self._db_version = row.version if row else 0
+            self._checked_at = now
+        return self._db_version
+
+    def _refresh_now(self) -> None:
+        """Re-read the version row (and the data, if it moved) regardless of the TTL."""
+        self._checked_at = None
+        self._refresh()
+
+    def _read(self) -> Dict:
+        with Session(self.engine) as session:
+            data = self._read_all(session)
+        return self._upgrade(data) if self._upgrade else data
+
+    def save(self, data: Dict) -> None:
+        with self._lock:
+            self._refresh_now()
+            keys = self._commit(data, self._signature)
+        if keys:
+            self._notify(keys)
+
+    def update(self, fn: Callable[[Dict], Any]) -> Any:
+        """
+        Atomic read-modify-write across workers: fn runs on the latest
+        document; if another worker commits first, it runs again on theirs.
+        """
+        for _ in range(UPDATE_ATTEMPTS):
+            with self._lock:
+                self._refresh_now()
+                expected = self._signature
+                data = _clone(self._data)
+                result = fn(data)
+                try:
+                    keys = self._commit(data, expected)
+                except StoreConflict:
+                    continue
+            if keys:
+                self._notify(keys)
+            return result
+        raise StoreConflict(f"{self.name}: gave up after {UPDATE_ATTEMPTS} conflicting updates")
+
+    def _commit(self, data: Dict, expected: int) -> List[str]:
+        """
+        Write the entries that differ from the cache, which reflects version
+        `expected`; raises StoreConflict if the row has moved on since.
+        Call with the store lock held. Returns the changed keys.
+        """
+        changed, deleted = self._diff(data)
+        if not changed and not deleted:
+            return []
+        with Session(self.engine) as session:
+            self._claim_version(session, expected)
+            for key in deleted:
+                self._delete_entry(session, key)
+            for key in changed:
+                self._write_entry(session, key, data[key])
+            try:
+                session.commit()
+            except IntegrityError:
+                raise StoreConflict(f"{self.name}: version row created concurrently")
+        self._version += 1
+        self._db_version = self._signature = expected + 1
+        self._checked_at = self._clock()
+        self._install_delta(data, changed, deleted)
+        return changed + deleted
+
+    def _claim_version(self, session: Session, expected: int) -> None:
+        """Move the version row from `expected` to expected + 1, or raise StoreConflict."""
+        result = session.execute(
+            sql_update(StoreVersion)
+            .where(StoreVersion.name == self.name, StoreVersion.version == expected)
+            .values(version=expected + 1)
+        )
+        if result.rowcount == 1:
+            return
+        if expected == 0 and session.get(StoreVersion, self.name) is None:
+            session.add(StoreVersion(name=self.name, version=1))  # First write; a racing insert fails the commit
+            return
+        session.rollback()
+        raise StoreConflict(f"{self.name}: store changed since version {expected}")
+
+    # --- Row mapping (implemented per store) ---
+    def _read_all(self, session: Session) -> Dict:
+        raise NotImplementedError
+
+    def _write_entry(self, session: Session, key: str, value: Dict) -> None:
+        raise NotImplementedError
+
+    def _delete_entry(self, session: Session, key: str) -> None:
+        raise NotImplementedError
+
+
+# === Devices ===
+class DeviceSqlStore(SqlStore):
+    name = "devices"
+
+    def _read_all(self, session: Session) -> Dict:
+        rows = session.exec(select(DeviceRow)).all()
+        return {row.device_id: json.loads(row.data) for row in rows}
+
+    def _write_entry(self, session: Session, key: str, value: Dict) -> None:
+        session.merge(DeviceRow(
+            device_id=key,
+            auth_token=value.get("auth_token"),
+            active_playlist=value.get("active_playlist"),
+            data=json.dumps(value),
+        ))
+
+    def _delete_entry(self, session: Session, key: str) -> None:
+        session.exec(delete(DeviceRow).where(DeviceRow.device_id == key))
+
+
+# === Playlists ===
+class PlaylistSqlStore(SqlStore):
+    name = "playlists"
+
+    def _read_all(self, session: Session) -> Dict:
+        playlists = {}
+        for row in session.exec(select(PlaylistRow)).all():
+            playlists[row.name] = {"color": row.color, "images": [], "devices": json.loads(row.devices)}
+        images = session.exec(
+            select(PlaylistImageRow).order_by(PlaylistImageRow.playlist, PlaylistImageRow.position)
+        ).all()
+        for image in images:
+            if image.playlist in playlists:
+                playlists[image.playlist]["images"].append(image.filename)
+        return playlists
+
+    def _write_entry(self, session: Session, key: str, value: Dict) -> None:
+        session.merge(PlaylistRow(
+            name=key,
+            color=value.get("color", "#e0e0e0"),
+            devices=json.dumps(value.get("devices", [])),
+        ))
+        session.exec(delete(PlaylistImageRow).where(PlaylistImageRow.playlist == key))
+        session.add_all(
+            PlaylistImageRow(playlist=key, position=i, filename=filename)
+            for i, filename in enumerate(value.get("images", []))
+        )
+
+    def _delete_entry(self, session: Session, key: str) -> None:
+        session.exec(delete(PlaylistImageRow).where(PlaylistImageRow.playlist == key))
+        session.exec(delete(PlaylistRow).where(PlaylistRow.name == key))
+
+
+# === File metadata ===
+class MetadataSqlStore(SqlStore):
+    name = "metadata"
+
+    def _read_all(self, session: Session) -> Dict:
+        rows = session.exec(select(FileMetadataRow)).all()
+        return {row.filename: json.loads(row.data) for row in rows}
+
+    def _write_entry(self, session: Session, key: str, value: Dict) -> None:
+        session.merge(FileMetadataRow(
+            filename=key,
+            start_date=value.get("start"),
+            end_date=value.get("end"),
+            data=json.dumps(value),
+        ))
+        session.exec(delete(FileMetadataPlaylistRow).where(FileMetadataPlaylistRow.filename == key))
+        session.add_all(
+            FileMetadataPlaylistRow(filename=key, playlist=playlist)
+            for playlist in dict.fromkeys(value.get("playlists", []))
+        )
+
+    def _delete_entry(self, session: Session, key: str) -> None:
+        session.exec(delete(FileMetadataPlaylistRow).where(FileMetadataPlaylistRow.filename == key))
+        session.exec(delete(FileMetadataRow).where(FileMetadataRow.filename == key))
+
+
+SQL_STORES = {
+    "devices": DeviceSqlStore,
+    "playlists": PlaylistSqlStore,
+    "metadata": MetadataSqlStore,
+}
@@ -0,0 +1,28 @@
+# app/services/storage.py
+
+"""
+Service: Storage
+Purpose: Picks the backend for the device / playlist / metadata stores.
+
+STORAGE_BACKEND (app/config.py):
+  • "json"   – JsonStore over the existing JSON files (snapshot or WAL mode)
+  • "sqlite" – SqlStore over DATABASE_URL
+Both expose the same API: view(), get(), load(), save(), version.
+"""
+
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from app.config import STORAGE_BACKEND
+from app.services.json_store import JsonStore
+
+
+def open_store(name: str, path: Path, upgrade: Optional[Callable[[Dict], Dict]] = None) -> JsonStore:
+    """
+    Open the store called `name` ("devices", "playlists", "metadata").
+    `path` is the JSON file used by the json backend.
+    """
+    if STORAGE_BACKEND == "sqlite":
+        from app.services.sql_store import SQL_STORES
+        return SQL_STORES[name](upgrade=upgrade)
+    return JsonStore(path, upgrade=upgrade)
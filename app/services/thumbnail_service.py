@@ -0,0 +1,107 @@
+# app/services/thumbnail_service.py
+
+"""
+Service: Thumbnail Service
+Purpose: Small WebP thumbnails for the admin pages (content / playlists),
+         which used to embed every full-resolution upload.
+
+  • generated on first request (GET /content/thumb/<filename>) in the
+    rendition process pool and cached on disk under uploads/thumbs/
+  • content-addressed uploads get one thumbnail per digest; legacy uploads
+    are keyed by name + mtime/size, so a replaced file gets a new one
+  • thumb_url() carries a version query string, so responses can be cached
+    as immutable
+"""
+
+import asyncio
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, Mapping, Optional
+from urllib.parse import quote
+
+from app.services.object_store import UPLOAD_DIR, media_path
+from app.services.rendition_service import run_in_pool
+
+THUMB_DIR = UPLOAD_DIR / "thumbs"
+THUMB_BOX = 480          # Longest side in px (cards show ~250 css px, so ~2x)
+THUMB_QUALITY = 70
+
+_inflight: Dict[str, asyncio.Future] = {}  # thumbnail name → pending render (dedupes concurrent requests)
+
+
+def thumb_version(filename: str, meta: Optional[Mapping] = None) -> Optional[str]:
+    """Changes whenever the underlying file does; None if it doesn't exist."""
+    if meta and meta.get("digest"):
+        return meta["digest"][:20]
+    try:
+        st = os.stat(media_path(filename, meta))
+    except OSError:
+        return None
+    return hashlib.sha1(f"{filename}|{st.st_mtime_ns}|{st.st_size}".encode("utf-8")).hexdigest()[:20]
+
+
+def thumb_path(filename: str, meta: Optional[Mapping] = None) -> Optional[Path]:
+    version = thumb_version(filename, meta)
+    return THUMB_DIR / f"{version}.{THUMB_BOX}.webp" if version else None
+
+
+def thumb_url(filename: str, meta: Optional[Mapping] = None) -> str:
+    """
+    URL of a file's thumbnail. Without `meta` the entry is looked up in the
+    metadata store (for templates: {{ filename | thumb_url }}).
+    """
+    if meta is None:
+        from app.services.metadata_service import metadata_store
+        meta = metadata_store.get(filename)
+    version = thumb_version(filename, meta) or "missing"
+    return f"/content/thumb/{quote(filename)}?v={version}"
+
+
+# === Worker (runs in a child process) ===
+
+def render_thumbnail(source: str, dest: str, box: int = THUMB_BOX) -> bool:
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail((box, box), Image.LANCZOS)
+        if image.mode not in ("RGB", "RGBA", "L"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = f"{dest}.{os.getpid()}.tmp"
+        image.save(tmp, "WEBP", quality=THUMB_QUALITY, method=4)
+    os.replace(tmp, dest)
+    return True
+
+
+async def ensure_thumbnail(filename: str, meta: Optional[Mapping] = None) -> Optional[Path]:
+    """
+    Path of the cached thumbnail, rendering it first if needed.
+    Returns None if the file is missing or not an image Pillow can read.
+    """
+    path = thumb_path(filename, meta)
+    if path is None:
+        return None
+    if path.exists():
+        return path
+
+    pending = _inflight.get(path.name)
+    if pending is None:
+        pending = asyncio.ensure_future(
+            run_in_pool(render_thumbnail, str(media_path(filename, meta)), str(path))
+        )
+        _inflight[path.name] = pending
+        pending.add_done_callback(lambda _f, name=path.name: _inflight.pop(name, None))
+    try:
+        await asyncio.shield(pending)
+    except Exception as e:
+        print(f"[WARN] Thumbnail generation failed for {filename}: {e}")
+        return None
+    return path
+
+
+def delete_thumbnail(filename: str, meta: Optional[Mapping] = None) -> None:
+    path = thumb_path(filename, meta)
+    if path is not None and path.exists():
+        path.unlink()
@@ -0,0 +1,324 @@
+# app/services/upload_engine.py
+
+"""
+Service: Upload Engine
+Purpose: Streams multipart uploads straight from the request body to disk
+         without blocking the event loop.
+
+  • the body is read chunk by chunk from request.stream() and fed to an
+    incremental multipart parser; nothing is spooled in memory first
+  • file parts are written to a temp file in the object store via aiofiles
+    and SHA-256 hashed as they arrive; each buffer is written in a thread
+    while the next one is being received. Callers can plug in another sink
+    (see r2_upload for streaming to R2)
+  • oversize bodies (Content-Length or running count) are rejected with 413
+    and payloads that are not an image or MP4 / WebM video with 415 as soon
+    as their first bytes are seen;
+    batch callers can instead reject just the offending file and carry on
+  • StreamedUpload.commit() renames the temp file into its content-addressed
+    place (see object_store), so a reader never sees a partial file
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import aiofiles
+from fastapi import HTTPException, Request
+from multipart.multipart import MultipartParser, parse_options_header
+
+from app.config import MAX_UPLOAD_BYTES
+from app.services import object_store
+
+WRITE_BUFFER = 1024 * 1024       # Bytes gathered before each (threaded) disk write
+MAX_FIELD_BYTES = 64 * 1024      # Limit for plain form fields
+FORM_OVERHEAD = 1024 * 1024      # Allowance for boundaries / headers / fields over the file limit
+
+# Leading bytes → media type; anything else is refused
+MAGIC_NUMBERS = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+# ISO-BMFF major brands that are not MP4 video (HEIF / AVIF stills, audio-only, QuickTime)
+NON_VIDEO_BRANDS = (b"heic", b"heix", b"heim", b"heis", b"mif1", b"msf1", b"avif", b"avis",
+                    b"M4A ", b"M4B ", b"M4P ", b"qt  ")
+EBML_MAGIC = b"\x1a\x45\xdf\xa3"
+SNIFF_BYTES = 12
+
+
+def sniff_media_type(head: bytes) -> Optional[str]:
+    """Media type from a file's first bytes, or None if not an accepted image or video."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp":
+        return None if head[8:12] in NON_VIDEO_BRANDS else "video/mp4"
+    if head.startswith(EBML_MAGIC):
+        return "video/webm"  # Matroska shares the magic; video_service checks the DocType
+    for magic, media_type in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return media_type
+    return None
+
+
+class StreamedUpload:
+    """One file part, fully written to a temp file and hashed."""
+
+    __slots__ = ("field", "filename", "media_type", "digest", "size", "tmp_path", "error")
+
+    def __init__(self, field: str, filename: str, tmp_path: str):
+        self.field = field
+        self.filename = filename
+        self.tmp_path = tmp_path
+        self.media_type: Optional[str] = None
+        self.digest: Optional[str] = None
+        self.size = 0
+        self.error: Optional[str] = None  # Set when the part was rejected (per_file_errors)
+
+    def commit(self) -> Dict:
+        """Atomically move the bytes to their digest path; returns object_store's record."""
+        return object_store.commit_object(self.tmp_path, self.digest, self.filename, self.size)
+
+    def discard(self) -> None:
+        if os.path.exists(self.tmp_path):
+            os.unlink(self.tmp_path)
+
+
+class _FileSink:
+    """Buffered, hashed temp-file writer for one file part (the default sink)."""
+
+    def __init__(self, upload: StreamedUpload, handle):
+        self.upload = upload
+        self.handle = handle
+        self.sha = hashlib.sha256()
+        self.buffer = bytearray()
+        self.pending: Optional[asyncio.Future] = None  # Disk write still in flight
+
+    @classmethod
+    async def open(cls, field: str, filename: str) -> "_FileSink":
+        fd, tmp = tempfile.mkstemp(dir=object_store.OBJECT_DIR, suffix=".part")
+        os.close(fd)
+        upload = StreamedUpload(field, filename, tmp)
+        try:
+            return cls(upload, await aiofiles.open(tmp, "wb"))
+        except BaseException:
+            upload.discard()
+            raise
+
+    async def write(self, data: bytes) -> None:
+        self.upload.size += len(data)
+        self.sha.update(data)
+        self.buffer += data
+        if len(self.buffer) >= WRITE_BUFFER:
+            await self.flush()
+
+    async def flush(self) -> None:
+        # Write-behind: at most one write in flight, overlapping the next receive
+        await self._drain()
+        if self.buffer:
+            self.pending = asyncio.ensure_future(self.handle.write(bytes(self.buffer)))
+            self.buffer.clear()
+
+    async def _drain(self) -> None:
+        if self.pending is not None:
+            pending, self.pending = self.pending, None
+            await pending
+
+    async def close(self, media_type: str) -> None:
+        await self.flush()
+        await self._drain()
+        await self.handle.close()
+        self.upload.digest = self.sha.hexdigest()
+        self.upload.media_type = media_type
+
+    async def abort(self) -> None:
+        try:
+            await self._drain()
+        except Exception:
+            pass
+        await self.handle.close()
+        self.upload.discard()
+
+
+class _Part:
+    """Per-file-part checks applied before bytes reach the sink."""
+
+    __slots__ = ("sink", "filename", "size", "head", "media_type")
+
+    def __init__(self, sink, filename: str, sniff: bool):
+        self.sink = sink
+        self.filename = filename
+        self.size = 0
+        self.head = b""
+        self.media_type = None if sniff else "application/octet-stream"
+
+    async def write(self, data: bytes, max_bytes: int) -> None:
+        self.size += len(data)
+        if self.size > max_bytes:
+            raise HTTPException(status_code=413, detail=f"{self.filename} exceeds the upload size limit.")
+        if self.media_type is None:
+            self.head += data[:SNIFF_BYTES]
+            if len(self.head) >= SNIFF_BYTES:
+                self._sniff()
+        await self.sink.write(data)
+
+    async def close(self) -> None:
+        if self.media_type is None:
+            self._sniff()
+        await self.sink.close(self.media_type)
+
+    def _sniff(self) -> None:
+        self.media_type = sniff_media_type(self.head)
+        if self.media_type is None:
+            raise HTTPException(status_code=415, detail=f"{self.filename} is not a supported image or video.")
+
+
+def _disposition(headers: Dict[bytes, bytes]) -> Tuple[str, Optional[str]]:
+    _, options = parse_options_header(headers.get(b"content-disposition", b""))
+    name = options.get(b"name", b"").decode("utf-8", "replace")
+    filename = options.get(b"filename")
+    if filename is not None:
+        filename = os.path.basename(filename.decode("utf-8", "replace").replace("\\", "/"))
+    return name, filename
+
+
+async def receive_upload(
+    request: Request,
+    file_fields: Sequence[str] = ("file",),
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    open_sink: Optional[Callable[[str, str], Awaitable]] = None,
+    sniff: bool = True,
+    max_body_bytes: Optional[int] = None,
+    max_files: Optional[int] = None,
+    per_file_errors: bool = False,
+) -> Tuple[Dict[str, List[str]], List]:
+    """
+    Parse a multipart/form-data request body as it streams in.
+    Returns (form fields → list of values, file parts named in `file_fields`).
+    File parts under other names are skipped.
+
+    By default each file part becomes a StreamedUpload (temp file + digest).
+    `open_sink(field, filename)` substitutes another destination: it returns
+    an object with async write(data) / close(media_type) / abort() whose
+    `.upload` is what gets returned (e.g. r2_upload's multipart writer).
+    On any error every open or finished sink is aborted before the exception
+    propagates. `sniff=False` accepts any payload type.
+
+    Batches: `max_bytes` stays the per-file limit while `max_body_bytes`
+    bounds the whole body (default: one file plus form overhead), and
+    `max_files` caps the number of file parts. With `per_file_errors` an
+    oversize or unsupported file is aborted on its own and returned with
+    `.error` set instead of failing the request.
+    """
+    open_sink = open_sink or _FileSink.open
+    max_body_bytes = max_body_bytes or max_bytes + FORM_OVERHEAD
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload.")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_body_bytes:
+        raise HTTPException(status_code=413, detail="Upload exceeds the size limit.")
+
+    # Parser callbacks only record events; they are applied (with awaits) after each chunk
+    events: List[Tuple[str, bytes]] = []
+    header_field = bytearray()
+    header_value = bytearray()
+
+    def on_header_field(data, start, end):
+        header_field.extend(data[start:end])
+
+    def on_header_value(data, start, end):
+        header_value.extend(data[start:end])
+
+    def on_header_end():
+        events.append(("header", (bytes(header_field).lower(), bytes(header_value))))
+        header_field.clear()
+        header_value.clear()
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": lambda: events.append(("begin", b"")),
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": lambda: events.append(("headers", b"")),
+        "on_part_data": lambda data, start, end: events.append(("data", bytes(data[start:end]))),
+        "on_part_end": lambda: events.append(("end", b"")),
+    })
+
+    fields: Dict[str, List[str]] = {}
+    sinks: List = []
+    headers: Dict[bytes, bytes] = {}
+    part: Optional[_Part] = None
+    field_name: Optional[str] = None
+    field_value = bytearray()
+    skipping = False
+    received = 0
+
+    object_store.OBJECT_DIR.mkdir(parents=True, exist_ok=True)
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_body_bytes:
+                raise HTTPException(status_code=413, detail="Upload exceeds the size limit.")
+            parser.write(chunk)
+            for kind, payload in events:
+                if kind == "begin":
+                    headers, field_name, skipping = {}, None, False
+                    field_value.clear()
+                elif kind == "header":
+                    headers[payload[0]] = payload[1]
+                elif kind == "headers":
+                    name, filename = _disposition(headers)
+                    if filename is None:
+                        field_name = name
+                    elif name in file_fields and filename:
+                        if max_files is not None and len(sinks) >= max_files:
+                            raise HTTPException(status_code=413, detail=f"At most {max_files} files per upload.")
+                        sink = await open_sink(name, filename)
+                        sinks.append(sink)
+                        part = _Part(sink, filename, sniff)
+                    else:
+                        skipping = True
+                elif kind == "data":
+                    if part is not None:
+                        try:
+                            await part.write(payload, max_bytes)
+                        except HTTPException as e:
+                            if not per_file_errors or e.status_code not in (413, 415):
+                                raise
+                            await _reject(part, e.detail)
+                            part, skipping = None, True
+                    elif not skipping and field_name is not None:
+                        field_value.extend(payload)
+                        if len(field_value) > MAX_FIELD_BYTES:
+                            raise HTTPException(status_code=413, detail=f"Form field {field_name} is too large.")
+                elif kind == "end":
+                    if part is not None:
+                        try:
+                            await part.close()
+                        except HTTPException as e:
+                            if not per_file_errors or e.status_code != 415:
+                                raise
+                            await _reject(part, e.detail)
+                        part = None
+                    elif field_name is not None:
+                        fields.setdefault(field_name, []).append(field_value.decode("utf-8", "replace"))
+            events.clear()
+        parser.finalize()
+        if part is not None:
+            raise HTTPException(status_code=400, detail="Upload ended before the file was complete.")
+    except BaseException:
+        for sink in sinks:
+            await sink.abort()
+        raise
+
+    return fields, [sink.upload for sink in sinks]
+
+
+async def _reject(part: _Part, reason: str) -> None:
+    """Abort one file part of a batch, keeping the reason on its upload."""
+    await part.sink.abort()
+    part.sink.upload.error = reason
@@ -0,0 +1,257 @@
+# app/services/video_service.py
+
+"""
+Service: Video Service
+Purpose: Reads what the display needs to know about an uploaded video
+         (duration, codec, frame size) straight from its container, without
+         ffmpeg.
+
+  • MP4: the moov box (mvhd duration / timescale, the video trak's tkhd size
+    and stsd sample entry), found by walking top-level boxes with seeks, so
+    a moov after mdat costs no more than one at the front
+  • WebM: the EBML header's DocType, Segment Info (Duration × TimecodeScale)
+    and the first video TrackEntry, read up to the first Cluster
+  • probe_video() returns {"duration", "codec", "width", "height"}, where
+    duration is None for files that do not record it (e.g. MediaRecorder
+    WebM; the display then plays until the `ended` event)
+"""
+
+import io
+import os
+import struct
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+VIDEO_MEDIA_TYPES = ("video/mp4", "video/webm")
+VIDEO_SUFFIXES = (".mp4", ".m4v", ".webm")
+
+MAX_MOOV_BYTES = 64 * 1024 * 1024   # Larger moov boxes are not read into memory
+WEBM_HEADER_BYTES = 1024 * 1024      # Info + Tracks sit well within the first MiB
+
+# Sample entry / CodecID → codec name used in metadata
+MP4_CODECS = {"avc1": "h264", "avc3": "h264", "hvc1": "hevc", "hev1": "hevc", "av01": "av1", "vp09": "vp9"}
+WEBM_CODECS = {"V_VP8": "vp8", "V_VP9": "vp9", "V_AV1": "av1", "V_MPEG4/ISO/AVC": "h264"}
+
+
+class VideoProbeError(ValueError):
+    """The file is not a video container this service can read."""
+
+
+def is_video(filename: str, meta: Optional[Dict] = None) -> bool:
+    """
+    True for entries probed as video (or, without a probe, by extension).
+    Without `meta` the entry is looked up in the metadata store (for
+    templates: {% if filename is video %}).
+    """
+    if meta is None:
+        from app.services.metadata_service import metadata_store
+        meta = metadata_store.get(filename)
+    if meta and meta.get("video") is not None:
+        return True
+    return Path(filename).suffix.lower() in VIDEO_SUFFIXES
+
+
+# === MP4 ===
+
+def _boxes(stream: BinaryIO, end: int) -> Iterator[Tuple[str, int, int]]:
+    """(type, payload offset, payload size) of each box between stream.tell() and `end`."""
+    while stream.tell() + 8 <= end:
+        start = stream.tell()
+        size, kind = struct.unpack(">I4s", stream.read(8))
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", stream.read(8))[0]
+            header = 16
+        elif size == 0:
+            size = end - start
+        if size < header or start + size > end:
+            raise VideoProbeError(f"Corrupt MP4 box {kind!r}")
+        yield kind.decode("latin-1"), start + header, size - header
+        stream.seek(start + size)
+
+
+def _child(data: bytes, path: str) -> Optional[bytes]:
+    """Payload of the first box at `path` (e.g. "mdia/minf/stbl/stsd") inside `data`."""
+    for name in path.split("/"):
+        stream = io.BytesIO(data)
+        for kind, offset, size in _boxes(stream, len(data)):
+            if kind == name:
+                data = data[offset:offset + size]
+                break
+        else:
+            return None
+    return data
+
+
+def _children(data: bytes, name: str) -> Iterator[bytes]:
+    stream = io.BytesIO(data)
+    for kind, offset, size in _boxes(stream, len(data)):
+        if kind == name:
+            yield data[offset:offset + size]
+
+
+def probe_mp4(stream: BinaryIO, length: int) -> Dict:
+    stream.seek(0)
+    moov = None
+    for kind, offset, size in _boxes(stream, length):
+        if kind == "moov":
+            if size > MAX_MOOV_BYTES:
+                raise VideoProbeError("MP4 moov box is too large")
+            stream.seek(offset)
+            moov = stream.read(size)
+            break
+    if moov is None:
+        raise VideoProbeError("MP4 has no moov box")
+
+    duration = None
+    mvhd = _child(moov, "mvhd")
+    if mvhd:
+        if mvhd[0] == 1:
+            timescale, units = struct.unpack(">IQ", mvhd[20:32])
+        else:
+            timescale, units = struct.unpack(">II", mvhd[12:20])
+        if timescale and units not in (0, 0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
+            duration = round(units / timescale, 3)
+
+    for trak in _children(moov, "trak"):
+        hdlr = _child(trak, "mdia/hdlr")
+        if not hdlr or hdlr[8:12] != b"vide":
+            continue
+        tkhd = _child(trak, "tkhd")
+        width = height = None
+        if tkhd and len(tkhd) >= 8:
+            width, height = (value >> 16 for value in struct.unpack(">II", tkhd[-8:]))
+        stsd = _child(trak, "mdia/minf/stbl/stsd")
+        codec = None
+        if stsd and len(stsd) >= 16:
+            fourcc = stsd[12:16].decode("latin-1")
+            codec = MP4_CODECS.get(fourcc, fourcc.strip())
+        return {"duration": duration, "codec": codec, "width": width, "height": height}
+    raise VideoProbeError("MP4 has no video track")
+
+
+# === WebM ===
+
+EBML_HEADER = 0x1A45DFA3
+EBML_DOCTYPE = 0x4282
+SEGMENT = 0x18538067
+INFO = 0x1549A966
+TIMECODE_SCALE = 0x2AD7B1
+DURATION = 0x4489
+TRACKS = 0x1654AE6B
+TRACK_ENTRY = 0xAE
+TRACK_TYPE = 0x83
+CODEC_ID = 0x86
+VIDEO = 0xE0
+PIXEL_WIDTH = 0xB0
+PIXEL_HEIGHT = 0xBA
+CLUSTER = 0x1F43B675
+UNKNOWN_SIZE = -1
+
+
+def _vint(data: bytes, pos: int, keep_marker: bool) -> Tuple[int, int]:
+    """EBML variable-length integer at `pos`: (value, next position)."""
+    if pos >= len(data):
+        raise VideoProbeError("Truncated WebM element")
+    first = data[pos]
+    length = 1
+    while length <= 8 and not first & (0x80 >> (length - 1)):
+        length += 1
+    if length > 8 or pos + length > len(data):
+        raise VideoProbeError("Invalid WebM element header")
+    value = first if keep_marker else first & (0xFF >> length)
+    for byte in data[pos + 1:pos + length]:
+        value = (value << 8) | byte
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        value = UNKNOWN_SIZE
+    return value, pos + length
+
+
+def _elements(data: bytes, start: int, end: int) -> Iterator[Tuple[int, int, int]]:
+    """(id, payload start, payload end) of each element in data[start:end]."""
+    pos = start
+    while pos < end:
+        element, pos = _vint(data, pos, keep_marker=True)
+        size, pos = _vint(data, pos, keep_marker=False)
+        stop = end if size == UNKNOWN_SIZE else min(pos + size, end)
+        yield element, pos, stop
+        if element == CLUSTER:
+            return
+        pos = stop
+
+
+def _uint(data: bytes) -> int:
+    return int.from_bytes(data, "big")
+
+
+def probe_webm(stream: BinaryIO) -> Dict:
+    stream.seek(0)
+    data = stream.read(WEBM_HEADER_BYTES)
+    doctype = None
+    timecode_scale = 1_000_000
+    raw_duration = None
+    track = None
+
+    for element, start, end in _elements(data, 0, len(data)):
+        if element == EBML_HEADER:
+            for child, cstart, cend in _elements(data, start, end):
+                if child == EBML_DOCTYPE:
+                    doctype = data[cstart:cend].decode("ascii", "replace")
+        elif element == SEGMENT:
+            for child, cstart, cend in _elements(data, start, end):
+                if child == INFO:
+                    for field, fstart, fend in _elements(data, cstart, cend):
+                        if field == TIMECODE_SCALE:
+                            timecode_scale = _uint(data[fstart:fend])
+                        elif field == DURATION and fend - fstart in (4, 8):
+                            raw_duration = struct.unpack(">f" if fend - fstart == 4 else ">d", data[fstart:fend])[0]
+                elif child == TRACKS and track is None:
+                    track = _webm_video_track(data, cstart, cend)
+            break
+
+    if doctype != "webm":
+        raise VideoProbeError(f"Not a WebM file (DocType {doctype!r})")
+    if track is None:
+        raise VideoProbeError("WebM has no video track")
+    duration = round(raw_duration * timecode_scale / 1e9, 3) if raw_duration else None
+    return {"duration": duration, **track}
+
+
+def _webm_video_track(data: bytes, start: int, end: int) -> Optional[Dict]:
+    for element, estart, eend in _elements(data, start, end):
+        if element != TRACK_ENTRY:
+            continue
+        fields = {"type": None, "codec": None, "width": None, "height": None}
+        for field, fstart, fend in _elements(data, estart, eend):
+            if field == TRACK_TYPE:
+                fields["type"] = _uint(data[fstart:fend])
+            elif field == CODEC_ID:
+                codec_id = data[fstart:fend].decode("ascii", "replace").rstrip("\x00")
+                fields["codec"] = WEBM_CODECS.get(codec_id, codec_id)
+            elif field == VIDEO:
+                for prop, pstart, pend in _elements(data, fstart, fend):
+                    if prop == PIXEL_WIDTH:
+                        fields["width"] = _uint(data[pstart:pend])
+                    elif prop == PIXEL_HEIGHT:
+                        fields["height"] = _uint(data[pstart:pend])
+        if fields.pop("type") == 1:
+            return fields
+    return None
+
+
+# === Entry point ===
+
+def probe_video(path, media_type: str) -> Dict:
+    """
+    {"duration", "codec", "width", "height"} of an MP4 / WebM file.
+    Raises VideoProbeError if it is not a playable container.
+    """
+    try:
+        with open(path, "rb") as stream:
+            if media_type == "video/mp4":
+                return probe_mp4(stream, os.fstat(stream.fileno()).st_size)
+            if media_type == "video/webm":
+                return probe_webm(stream)
+    except (struct.error, IndexError) as e:
+        raise VideoProbeError(f"Unreadable {media_type} container: {e}")
+    raise VideoProbeError(f"Unsupported video type {media_type}")
@@ -0,0 +1,233 @@
+// LooPi display service worker — served as /display-sw.js (see app/routes/display.py)
+//
+// Offline-first playback for /display:
+//   • the device's playlist (its manifest) is prefetched into Cache Storage,
+//     one entry per asset URL tagged with the manifest's asset version;
+//     entries that left the playlist or changed version are evicted
+//   • the cache is bounded (?max_mb= on the script URL, and at most half the
+//     origin's storage quota); assets past the budget stream from the server
+//   • media is served from the cache, byte ranges included (for <video>);
+//     the display page and its manifest are network-first with the last good
+//     copy as the fallback, so a reload during an outage keeps playing
+//   • every manifest that reaches the page (fetched or baked into the HTML)
+//     triggers a background sync, so the cache follows playlist changes
+
+const CACHE_PREFIX = "loopi-display-";
+const MEDIA_CACHE = CACHE_PREFIX + "media-v1";
+const SHELL_CACHE = CACHE_PREFIX + "shell-v1";
+const DISPLAY_PATH = "/display";
+const MANIFEST_PATH = "/display/manifest";
+const NETWORK_TIMEOUT_MS = 4000;     // Then fall back to the cached page / manifest
+const QUOTA_SHARE = 0.5;             // Never use more than this share of the storage quota
+const VERSION_HEADER = "X-LooPi-Asset-Version";
+const SIZE_HEADER = "X-LooPi-Asset-Size";
+const MAX_BYTES = (Number(new URL(self.location).searchParams.get("max_mb")) || 1024) * 1024 * 1024;
+
+// === Lifecycle ===
+
+self.addEventListener("install", () => self.skipWaiting());
+
+self.addEventListener("activate", event => {
+  event.waitUntil((async () => {
+    const names = await caches.keys();
+    await Promise.all(names
+      .filter(name => name.startsWith(CACHE_PREFIX) && name !== MEDIA_CACHE && name !== SHELL_CACHE)
+      .map(name => caches.delete(name)));
+    await self.clients.claim();
+    await refreshManifest();
+  })());
+});
+
+self.addEventListener("message", event => {
+  if (event.data && event.data.type === "manifest") {
+    event.waitUntil(syncMedia(event.data.manifest));
+  }
+});
+
+// === Routing ===
+
+self.addEventListener("fetch", event => {
+  const request = event.request;
+  if (request.method !== "GET") return;
+  const url = new URL(request.url);
+  if (url.origin !== self.location.origin) return;
+
+  if (url.pathname.startsWith("/uploads/")) {
+    event.respondWith(fromMediaCache(request));
+  } else if (url.pathname === MANIFEST_PATH) {
+    event.respondWith(networkFirst(event, MANIFEST_PATH, response => response.json().then(syncMedia)));
+  } else if (request.mode === "navigate" && url.pathname === DISPLAY_PATH) {
+    event.respondWith(networkFirst(event, DISPLAY_PATH));
+  } else if (url.pathname.startsWith("/static/")) {
+    event.respondWith(staleWhileRevalidate(event));
+  }
+  // Everything else (heartbeats, events, claims) goes straight to the network
+});
+
+function cacheable(response) {
+  return response.status === 200 && response.type === "basic";
+}
+
+function withTimeout(promise, ms) {
+  return new Promise((resolve, reject) => {
+    const timer = setTimeout(() => reject(new Error("timeout")), ms);
+    promise.then(
+      value => { clearTimeout(timer); resolve(value); },
+      error => { clearTimeout(timer); reject(error); }
+    );
+  });
+}
+
+// Server copy when it answers in time (kept as the fallback), else the last good one
+async function networkFirst(event, cacheKey, onFresh) {
+  const cache = await caches.open(SHELL_CACHE);
+  const network = fetch(event.request).then(async response => {
+    if (cacheable(response)) {
+      await cache.put(cacheKey, response.clone());
+      if (onFresh) event.waitUntil(onFresh(response.clone()).catch(err => console.warn("Sync failed:", err)));
+    }
+    return response;
+  });
+  try {
+    return await withTimeout(network, NETWORK_TIMEOUT_MS);
+  } catch (err) {
+    const cached = await cache.match(cacheKey);
+    if (cached) {
+      event.waitUntil(network.catch(() => {}));
+      return cached;
+    }
+    return network;
+  }
+}
+
+// Cached copy right away, refreshed in the background; older ?v= copies of the same file are dropped
+async function staleWhileRevalidate(event) {
+  const request = event.request;
+  const cache = await caches.open(SHELL_CACHE);
+  const cached = await cache.match(request);
+  const refresh = fetch(request).then(async response => {
+    if (cacheable(response)) {
+      const path = new URL(request.url).pathname;
+      for (const key of await cache.keys()) {
+        if (key.url !== request.url && new URL(key.url).pathname === path) await cache.delete(key);
+      }
+      await cache.put(request, response.clone());
+    }
+    return response;
+  });
+  if (cached) {
+    event.waitUntil(refresh.catch(() => {}));
+    return cached;
+  }
+  return refresh;
+}
+
+// === Media ===
+
+async function fromMediaCache(request) {
+  const cache = await caches.open(MEDIA_CACHE);
+  const cached = await cache.match(request.url);
+  if (!cached) return fetch(request);
+  const range = request.headers.get("range");
+  return range ? rangeResponse(cached, range) : cached;
+}
+
+// 206 slice of a cached body: <video> asks for byte ranges even when offline
+async function rangeResponse(cached, range) {
+  const blob = await cached.blob();
+  const match = /^bytes=(\d*)-(\d*)$/.exec(range.trim());
+  if (!match || (!match[1] && !match[2])) {
+    return new Response(blob, { status: 200, headers: cached.headers });
+  }
+  let start, end;
+  if (!match[1]) {
+    start = Math.max(0, blob.size - Number(match[2]));
+    end = blob.size - 1;
+  } else {
+    start = Number(match[1]);
+    end = match[2] ? Math.min(Number(match[2]), blob.size - 1) : blob.size - 1;
+  }
+  if (start >= blob.size || start > end) {
+    return new Response(null, { status: 416, headers: { "Content-Range": `bytes */${blob.size}` } });
+  }
+  const headers = new Headers(cached.headers);
+  headers.set("Content-Range", `bytes ${start}-${end}/${blob.size}`);
+  headers.set("Content-Length", String(end - start + 1));
+  return new Response(blob.slice(start, end + 1), { status: 206, headers });
+}
+
+async function cacheBudget() {
+  let budget = MAX_BYTES;
+  if (self.navigator.storage && self.navigator.storage.estimate) {
+    const { quota } = await self.navigator.storage.estimate();
+    if (quota) budget = Math.min(budget, quota * QUOTA_SHARE);
+  }
+  return budget;
+}
+
+async function refreshManifest() {
+  try {
+    const response = await fetch(MANIFEST_PATH, { credentials: "same-origin", cache: "no-store" });
+    if (!cacheable(response)) return;
+    const cache = await caches.open(SHELL_CACHE);
+    await cache.put(MANIFEST_PATH, response.clone());
+    await syncMedia(await response.json());
+  } catch (err) {
+    console.warn("Manifest refresh failed:", err);
+  }
+}
+
+// Syncs run one after another; each brings the cache in line with one manifest
+let syncing = Promise.resolve();
+
+function syncMedia(manifest) {
+  syncing = syncing
+    .then(() => syncOnce(manifest))
+    .catch(err => console.warn("Media sync failed:", err));
+  return syncing;
+}
+
+async function syncOnce(manifest) {
+  if (!manifest || !Array.isArray(manifest.items)) return;
+  const cache = await caches.open(MEDIA_CACHE);
+
+  // Playlist order decides what fits in the budget
+  const wanted = new Map();
+  for (const item of manifest.items) {
+    wanted.set(new URL(item.url, self.location.origin).href, String(item.version));
+  }
+
+  // Evict assets that left the playlist or changed version
+  let used = 0;
+  const have = new Set();
+  for (const key of await cache.keys()) {
+    const cached = await cache.match(key);
+    const version = cached && cached.headers.get(VERSION_HEADER);
+    if (!wanted.has(key.url) || wanted.get(key.url) !== version) {
+      await cache.delete(key);
+    } else {
+      have.add(key.url);
+      used += Number(cached.headers.get(SIZE_HEADER)) || 0;
+    }
+  }
+
+  // Prefetch what is missing, in playlist order, while it fits
+  const budget = await cacheBudget();
+  for (const [url, version] of wanted) {
+    if (have.has(url)) continue;
+    if (used >= budget) break;
+    try {
+      const response = await fetch(url, { credentials: "same-origin" });
+      if (!cacheable(response)) continue;
+      const blob = await response.blob();
+      if (used + blob.size > budget) continue;
+      const headers = new Headers(response.headers);
+      headers.set(VERSION_HEADER, version);
+      headers.set(SIZE_HEADER, String(blob.size));
+      await cache.put(url, new Response(blob, { status: 200, headers }));
+      used += blob.size;
+    } catch (err) {
+      console.warn("Prefetch failed:", url, err);
+    }
+  }
+}
@@ -0,0 +1,82 @@
+# app/templating.py
+
+"""
+Module: Templating
+Purpose: The single Jinja2 environment every page renders through
+         (`templates` here, also exposed as app.templates).
+
+  • filters (datetimeformat, media_url, thumb_url), the icon sprite
+    helpers (icon, icon_href), static_url and the `video` test are
+    registered once, so every template sees the same ones
+  • compiled templates are kept in a FileSystemBytecodeCache under
+    TEMPLATE_CACHE_DIR; a fresh process loads bytecode instead of parsing
+    and compiling the sources again
+  • precompile_templates() fills that cache for every template (run at
+    image build: python -m app.scripts.precompile_templates) and
+    warm_templates() loads them all into memory at startup
+  • auto_reload (a stat of the source on each render) is off in production
+"""
+
+from pathlib import Path
+from typing import List, Optional
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+from app.config import TEMPLATE_AUTO_RELOAD, TEMPLATE_CACHE_DIR
+from app.services.object_store import media_url
+from app.services.thumbnail_service import thumb_url
+from app.services.video_service import is_video
+from app.utils.icons import icon, icon_href
+from app.utils.jinja_filters import datetimeformat
+from app.utils.static_files import static_url
+
+TEMPLATE_DIR = Path("app/templates")
+TEMPLATE_SUFFIXES = (".html",)
+
+
+def build_environment(cache_dir: Optional[str] = TEMPLATE_CACHE_DIR, auto_reload: bool = TEMPLATE_AUTO_RELOAD) -> Environment:
+    """The application environment; `cache_dir=None` disables the bytecode cache."""
+    bytecode_cache = None
+    if cache_dir:
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(str(cache_dir))
+    environment = Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        autoescape=True,
+        auto_reload=auto_reload,
+        bytecode_cache=bytecode_cache,
+        cache_size=-1,  # Never evict: the whole template set stays in memory
+    )
+    environment.filters["datetimeformat"] = datetimeformat
+    environment.filters["media_url"] = media_url
+    environment.filters["thumb_url"] = thumb_url
+    environment.globals["icon"] = icon
+    environment.globals["icon_href"] = icon_href
+    environment.globals["static_url"] = static_url
+    environment.tests["video"] = is_video
+    return environment
+
+
+env = build_environment()
+templates = Jinja2Templates(env=env)
+
+
+def template_names(environment: Environment = env) -> List[str]:
+    return environment.list_templates(filter_func=lambda name: name.endswith(TEMPLATE_SUFFIXES))
+
+
+def warm_templates(environment: Environment = env) -> int:
+    """Load every template (from bytecode when cached) so no request pays for it."""
+    names = template_names(environment)
+    for name in names:
+        environment.get_template(name)
+    return len(names)
+
+
+def precompile_templates(environment: Environment = env) -> int:
+    """Compile every template afresh into the bytecode cache; returns the count."""
+    if environment.bytecode_cache is not None:
+        environment.bytecode_cache.clear()
+    environment.cache.clear()
+    return warm_templates(environment)
@@ -0,0 +1,21 @@
+from app.scripts import bench_services
+from app.services import device_service, playlist_service
+
+
+def test_suite_runs_every_case_and_restores_the_stores():
+    stores = (device_service.device_store, playlist_service.playlist_store)
+    results = bench_services.run_suite([50], min_runs=1, min_time=0, verbose=False)
+
+    assert set(results["results"]) == set(bench_services.CASES)
+    assert all(r["50"]["runs"] >= 1 for r in results["results"].values())
+    assert (device_service.device_store, playlist_service.playlist_store) == stores
+
+
+def test_compare_flags_only_real_regressions():
+    def results(**best):
+        return {"results": {name: {"1000": {"best_ms": ms}} for name, ms in best.items()}}
+
+    baseline = results(save_devices=10.0, load_playlists=0.1, backfill=5.0)
+    current = results(save_devices=14.0, load_playlists=0.3, backfill=5.5)
+
+    assert bench_services.compare(baseline, current, threshold=0.25, floor_ms=0.5) == ["save_devices @ 1000"]
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from app.scripts import build_icons
+from app.utils import icons
+
+SVG = '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24" stroke="currentColor"><path d="M{n} 0"/></svg>'
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """A scratch tree with the relative layout build_icons expects."""
+    monkeypatch.chdir(tmp_path)
+    lucide = tmp_path / "app/static/icons/lucide"
+    lucide.mkdir(parents=True)
+    for n, name in enumerate(["play", "pause", "trash-2", "unused"]):
+        (lucide / f"{name}.svg").write_text(SVG.format(n=n))
+    (tmp_path / "app/templates").mkdir(parents=True)
+    (tmp_path / "app/static/js").mkdir(parents=True)
+    (tmp_path / "app/templates/page.html").write_text(
+        '{{ icon("play", width=20) }} {{ icon_href(\'pause\') }} <img src="/static/icons/lucide/trash-2.svg">'
+    )
+    return tmp_path
+
+
+def test_finds_every_reference_style(project):
+    assert build_icons.referenced_icons() == {"play", "pause", "trash-2"}
+
+
+def test_build_writes_fingerprinted_sprite_and_manifest(project):
+    manifest = build_icons.build_sprite()
+
+    sprite = project / "app/static/icons" / manifest["sprite"]
+    assert manifest["icons"] == ["pause", "play", "trash-2"]
+    assert '<symbol id="play" viewBox="0 0 24 24">' in sprite.read_text()
+    assert "stroke=" not in sprite.read_text()  # paint is left to the <svg> using it
+    assert json.loads((project / "app/static/icons/sprite.json").read_text()) == manifest
+
+    # A template change produces a new file name and removes the old sprite
+    (project / "app/static/js/app.js").write_text('icon_href("unused")')
+    rebuilt = build_icons.build_sprite()
+    assert rebuilt["sprite"] != manifest["sprite"]
+    assert [p.name for p in (project / "app/static/icons").glob("sprite.*.svg")] == [rebuilt["sprite"]]
+
+
+def test_check_fails_when_missing_or_stale(project, capsys):
+    assert build_icons.main(["--check"]) == 1
+    build_icons.main([])
+    assert build_icons.main(["--check"]) == 0
+    (project / "app/templates/new.html").write_text('{{ icon("unused") }}')
+    assert build_icons.main(["--check"]) == 1
+
+
+def test_unknown_icon_fails_the_build(project):
+    (project / "app/templates/typo.html").write_text('{{ icon("plya") }}')
+    with pytest.raises(SystemExit, match="plya"):
+        build_icons.build_sprite()
+
+
+def test_runtime_requires_a_built_sprite(tmp_path):
+    with pytest.raises(RuntimeError, match="build_icons"):
+        icons._load_manifest(tmp_path / "sprite.json")
+
+
+def test_committed_templates_match_the_built_sprite():
+    # Same gate as the Docker build: templates never reference icons the sprite lacks
+    assert build_icons.main(["--check"]) == 0
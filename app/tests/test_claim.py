@@ -0,0 +1,55 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from app.routes import display
+from app.services import device_service
+from app.services.json_store import JsonStore
+
+
+def _claim_all(monkeypatch, limit, device_ids):
+    devices = {device_id: {"auth_token": f"token-{device_id}", "active": False} for device_id in device_ids}
+    monkeypatch.setattr(device_service, "DEVICE_LIMIT", limit)
+    monkeypatch.setattr(display, "authenticate_device", lambda device_id, token: devices.get(device_id))
+    monkeypatch.setattr(display, "update_devices", lambda fn: fn(devices))
+
+    app = FastAPI()
+    app.include_router(display.router)
+
+    async def claim():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [
+                await client.get("/claim", params={"device_id": device_id, "auth_token": f"token-{device_id}"})
+                for device_id in device_ids
+            ]
+
+    return asyncio.run(claim()), devices
+
+
+def test_claim_keeps_other_devices_active_within_limit(monkeypatch):
+    responses, devices = _claim_all(monkeypatch, 2, ["lobby", "kiosk", "cafe"])
+
+    assert [r.status_code for r in responses] == [303, 303, 403]
+    assert responses[0].cookies["loopi_device_token"] == "token-lobby"
+    assert {key for key, device in devices.items() if device["active"]} == {"lobby", "kiosk"}
+
+
+def test_claim_keeps_writes_from_other_workers(monkeypatch, tmp_path):
+    store = JsonStore(tmp_path / "devices.json")
+    store.save({"lobby": {"auth_token": "t1", "active": False}})
+    monkeypatch.setattr(device_service, "device_store", store)
+    monkeypatch.setattr(display, "authenticate_device", lambda device_id, token: store.get(device_id))
+    JsonStore(tmp_path / "devices.json").update(lambda devices: devices["lobby"].update(last_seen="2026-10-17T09:00:00"))
+
+    app = FastAPI()
+    app.include_router(display.router)
+
+    async def claim():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/claim", params={"device_id": "lobby", "auth_token": "t1"})
+
+    assert asyncio.run(claim()).status_code == 303
+    assert store.get("lobby") == {"auth_token": "t1", "active": True, "last_seen": "2026-10-17T09:00:00"}
@@ -0,0 +1,64 @@
+import json
+
+from app.services.device_auth import DeviceAuthIndex
+from app.services.json_store import JsonStore
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _store(tmp_path, devices):
+    path = tmp_path / "devices.json"
+    path.write_text(json.dumps(devices))
+    return JsonStore(path, mode="snapshot")
+
+
+def test_index_follows_rotation_and_delete(tmp_path):
+    store = _store(tmp_path, {"lobby": {"auth_token": "t1", "active": True}, "kiosk": {"auth_token": "t2"}})
+    index = DeviceAuthIndex(store)
+
+    assert index.authenticate("lobby", "t1")["active"] is True
+    assert index.authenticate("kiosk", "t1") is None      # someone else's token
+    assert index.authenticate("lobby", "nope") is None
+
+    devices = store.load()
+    devices["lobby"]["auth_token"] = "t3"
+    del devices["kiosk"]
+    store.save(devices)
+
+    assert index.authenticate("lobby", "t1") is None
+    assert index.authenticate("lobby", "t3") is not None
+    assert index.authenticate("kiosk", "t2") is None
+    assert index.stats()["devices"] == 1
+
+
+def test_rejected_tokens_are_negative_cached(tmp_path):
+    clock = Clock()
+    store = _store(tmp_path, {"lobby": {"auth_token": "good"}})
+    index = DeviceAuthIndex(store, clock=clock)
+
+    assert index.authenticate("lobby", "stale") is None
+    assert index.authenticate("lobby", "stale") is None
+    assert index.stats()["rejections"] == 1
+
+    # A token that becomes valid is dropped from the negative cache at once
+    devices = store.load()
+    devices["lobby"]["auth_token"] = "stale"
+    store.save(devices)
+    assert index.authenticate("lobby", "stale") is not None
+
+
+def test_reload_from_disk_rebuilds(tmp_path):
+    store = _store(tmp_path, {"lobby": {"auth_token": "t1"}})
+    index = DeviceAuthIndex(store)
+    assert index.authenticate("lobby", "t1") is not None
+
+    (tmp_path / "devices.json").write_text(json.dumps({"lobby": {"auth_token": "edited-by-hand"}}))
+    store.bump()
+    assert index.authenticate("lobby", "t1") is None
+    assert index.authenticate("lobby", "edited-by-hand") is not None
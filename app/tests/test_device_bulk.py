@@ -0,0 +1,118 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from app.routes import devices as devices_route
+from app.services import device_management, device_service
+from app.services.json_store import JsonStore
+
+
+def _fleet(monkeypatch, tmp_path, limit=10):
+    store = JsonStore(tmp_path / "devices.json")
+    store.save({
+        "lobby": {"name": "Lobby", "active": True, "auth_token": "t1", "active_playlist": "Morning"},
+        "kiosk": {"name": "Kiosk", "active": False, "auth_token": "t2", "active_playlist": ""},
+        "cafe": {"name": "Cafe screen", "active": False, "auth_token": "t3", "active_playlist": ""},
+    })
+    monkeypatch.setattr(device_service, "device_store", store)
+    monkeypatch.setattr(device_service, "DEVICE_LIMIT", limit)
+    monkeypatch.setattr(devices_route, "load_playlists", lambda: {"Morning": {}, "Evening": {}})
+    monkeypatch.setattr(device_management, "update_playlist_device_assignments", lambda devices: None)
+    app = FastAPI()
+    app.include_router(devices_route.router)
+    return app, store
+
+
+def _bulk(app, body):
+    async def post():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/devices/bulk", json=body)
+
+    return asyncio.run(post())
+
+
+def test_empty_selector_is_rejected(monkeypatch, tmp_path):
+    app, store = _fleet(monkeypatch, tmp_path)
+    before = store.load()
+
+    response = _bulk(app, {"selector": {}, "operations": {"rotate_token": True}})
+
+    assert response.status_code == 422
+    assert store.load() == before
+
+
+def test_all_selector_reports_per_device_outcomes(monkeypatch, tmp_path):
+    app, store = _fleet(monkeypatch, tmp_path)
+
+    response = _bulk(app, {"selector": {"all": True}, "operations": {"rotate_token": True}})
+
+    body = response.json()
+    assert response.status_code == 200
+    assert body["counts"] == {"ok": 3}
+    for outcome in body["devices"]:
+        assert store.get(outcome["device_id"])["auth_token"] == outcome["auth_token"]
+
+
+def test_outcomes_per_device_and_selector_filters(monkeypatch, tmp_path):
+    app, store = _fleet(monkeypatch, tmp_path)
+
+    response = _bulk(app, {
+        "device_ids": ["kiosk", "ghost"],
+        "operations": {"assign_playlist": "Evening"},
+    })
+    assert [(o["device_id"], o["status"], o["changes"]) for o in response.json()["devices"]] == [
+        ("kiosk", "ok", ["assign_playlist"]),
+        ("ghost", "not_found", []),
+    ]
+    assert store.get("kiosk")["active_playlist"] == "Evening"
+
+    response = _bulk(app, {"selector": {"name_contains": "CAFE"}, "operations": {"rename": {"cafe": "Café"}}})
+    assert response.json()["matched"] == 1
+    assert store.get("cafe")["name"] == "Café"
+
+    response = _bulk(app, {"device_ids": ["kiosk"], "operations": {"assign_playlist": "Nope"}})
+    assert response.status_code == 400
+
+
+def test_dry_run_leaves_the_store_unchanged(monkeypatch, tmp_path):
+    app, store = _fleet(monkeypatch, tmp_path)
+    before, version = store.load(), store.version
+
+    response = _bulk(app, {
+        "selector": {"all": True},
+        "operations": {"rotate_token": True, "renew_license": "yearly"},
+        "dry_run": True,
+    })
+
+    assert response.json()["counts"] == {"ok": 3}
+    assert all("auth_token" not in o for o in response.json()["devices"])
+    assert store.load() == before
+    assert store.version == version
+
+
+def test_activation_beyond_the_device_limit_fails_per_device(monkeypatch, tmp_path):
+    app, store = _fleet(monkeypatch, tmp_path, limit=2)
+
+    response = _bulk(app, {"device_ids": ["kiosk", "cafe"], "operations": {"active": True}})
+
+    outcomes = {o["device_id"]: o for o in response.json()["devices"]}
+    assert outcomes["kiosk"]["status"] == "ok"
+    assert outcomes["cafe"]["status"] == "error"
+    assert "Device limit" in outcomes["cafe"]["detail"]
+    assert [d for d, device in store.view().items() if device["active"]] == ["lobby", "kiosk"]
+
+
+def test_bulk_keeps_other_writers_and_rebuilds_assignments_from_result(monkeypatch, tmp_path):
+    app, store = _fleet(monkeypatch, tmp_path)
+    rebuilt = []
+    monkeypatch.setattr(device_management, "update_playlist_device_assignments", rebuilt.append)
+    other_worker = JsonStore(tmp_path / "devices.json")
+    other_worker.update(lambda devices: devices["kiosk"].update(last_seen="2026-10-17T09:00:00"))
+
+    response = _bulk(app, {"selector": {"active": False}, "operations": {"assign_playlist": "Evening"}})
+
+    assert response.json()["counts"] == {"ok": 2}
+    assert store.get("kiosk")["last_seen"] == "2026-10-17T09:00:00"
+    assert rebuilt == [store.load()]
@@ -0,0 +1,23 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from app.routes import display
+
+
+def test_service_worker_served_from_root_with_scope_header():
+    app = FastAPI()
+    app.include_router(display.router)
+
+    async def get():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/display-sw.js?max_mb=256")
+
+    response = asyncio.run(get())
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/javascript")
+    assert response.headers["service-worker-allowed"] == "/"
+    assert response.headers["cache-control"] == "no-cache"
+    assert 'addEventListener("fetch"' in response.text
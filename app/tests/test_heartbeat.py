@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import heartbeat_service
+from app.services.json_store import JsonStore
+
+
+def _store(monkeypatch, tmp_path, devices):
+    path = tmp_path / "devices.json"
+    store = JsonStore(path)
+    store.save(devices)
+    writes = []
+
+    def update_devices(fn):
+        writes.append(fn)
+        return store.update(fn)
+
+    monkeypatch.setattr(heartbeat_service, "update_devices", update_devices)
+    monkeypatch.setattr(heartbeat_service, "get_device", store.get)
+    monkeypatch.setattr(heartbeat_service, "authenticate_device", lambda device_id, token: store.get(device_id))
+    monkeypatch.setattr(heartbeat_service, "_last_seen", {})
+    monkeypatch.setattr(heartbeat_service, "_dirty", set())
+    return store, writes
+
+
+def test_flush_patches_only_last_seen(monkeypatch, tmp_path):
+    store, _ = _store(monkeypatch, tmp_path, {"lobby": {"auth_token": "old", "active": True}})
+    heartbeat_service.record_heartbeat("lobby", "old")
+
+    # A token rotation lands between the heartbeat and the flush
+    store.update(lambda devices: devices["lobby"].update(auth_token="new"))
+    store.update(lambda devices: devices.update(kiosk={"auth_token": "k"}))
+
+    assert heartbeat_service.flush_heartbeats() == 1
+    lobby = store.get("lobby")
+    assert lobby["auth_token"] == "new"
+    assert lobby["last_seen"]
+    assert "kiosk" in store.view()
+
+
+def test_flush_skips_deleted_devices(monkeypatch, tmp_path):
+    store, _ = _store(monkeypatch, tmp_path, {"lobby": {"auth_token": "t"}})
+    heartbeat_service.record_heartbeat("lobby", "t")
+    store.update(lambda devices: devices.pop("lobby"))
+
+    assert heartbeat_service.flush_heartbeats() == 0
+    assert dict(store.view()) == {}
+
+
+def test_screen_change_and_rotation_share_one_write(monkeypatch, tmp_path):
+    stale = (datetime.utcnow() - timedelta(days=8)).isoformat()
+    store, writes = _store(monkeypatch, tmp_path, {"lobby": {"auth_token": "t", "active": True, "last_seen": stale}})
+    screen = {"width": 1920, "height": 1080, "webp": True}
+
+    result = heartbeat_service.record_heartbeat("lobby", "t", screen)
+
+    assert len(writes) == 1
+    lobby = store.get("lobby")
+    assert lobby["auth_token"] == result["auth_token"] != "t"
+    assert dict(lobby["screen"]) == screen
+
+
+def test_failed_flush_keeps_devices_pending(monkeypatch, tmp_path):
+    store, _ = _store(monkeypatch, tmp_path, {"lobby": {"auth_token": "t"}})
+    heartbeat_service.record_heartbeat("lobby", "t")
+
+    def failing_update(fn):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(heartbeat_service, "update_devices", failing_update)
+    with pytest.raises(OSError):
+        heartbeat_service.flush_heartbeats()
+
+    monkeypatch.setattr(heartbeat_service, "update_devices", store.update)
+    assert heartbeat_service.flush_heartbeats() == 1
+    assert store.get("lobby")["last_seen"]
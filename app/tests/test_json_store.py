@@ -0,0 +1,109 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from app.services.json_store import JsonStore
+
+
+@pytest.mark.parametrize("mode", ["snapshot", "wal"])
+def test_concurrent_updates_lose_nothing(tmp_path, mode):
+    path = tmp_path / "devices.json"
+    path.write_text("{}")
+    # Two instances over one file stand in for two workers: separate caches
+    # and store locks, so only the file lock keeps them apart
+    workers = [JsonStore(path, mode=mode), JsonStore(path, mode=mode)]
+
+    def writer(n):
+        store = workers[n % 2]
+        for i in range(25):
+            store.update(lambda data: data.__setitem__(f"w{n}-{i}", {"n": i}))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for store in workers:
+        store.compact()
+    assert len(JsonStore(path, mode=mode).view()) == 8 * 25
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_update_returns_result_and_skips_unchanged_writes(tmp_path):
+    path = tmp_path / "playlists.json"
+    path.write_text(json.dumps({"Lobby": {"images": []}}))
+    store = JsonStore(path, mode="snapshot")
+    version = store.version
+
+    assert store.update(lambda data: len(data)) == 1
+    assert store.version == version
+
+    store.update(lambda data: data["Lobby"]["images"].append("a.png"))
+    assert store.get("Lobby")["images"] == ("a.png",)
+    assert store.version == version + 1
+
+
+def test_compaction_keeps_records_appended_by_another_worker(tmp_path):
+    path = tmp_path / "metadata.json"
+    path.write_text("{}")
+    first, second = JsonStore(path, mode="wal"), JsonStore(path, mode="wal")
+
+    first.update(lambda data: data.__setitem__("a.png", {}))
+    second.update(lambda data: data.__setitem__("b.png", {}))
+    first.compact()  # first never loaded b.png itself
+
+    assert path.with_name("metadata.json.wal").stat().st_size == 0
+    assert set(json.loads(path.read_text())) == {"a.png", "b.png"}
+
+
+def test_external_change_invalidates_the_cache(tmp_path):
+    path = tmp_path / "devices.json"
+    path.write_text(json.dumps({"lobby": {"name": "Lobby"}}))
+    store = JsonStore(path, mode="snapshot")
+    assert store.get("lobby")["name"] == "Lobby"
+    version = store.version
+
+    # Another process rewrites the file: new size and mtime
+    path.write_text(json.dumps({"lobby": {"name": "Front desk"}, "kiosk": {}}))
+    os.utime(path, ns=(time.time_ns() + 10**9,) * 2)
+
+    assert store.get("lobby")["name"] == "Front desk"
+    assert "kiosk" in store.view()
+    assert store.version == version + 1
+
+
+def test_views_are_read_only_and_loads_are_copies(tmp_path):
+    path = tmp_path / "playlists.json"
+    path.write_text(json.dumps({"Lobby": {"images": ["a.png"], "devices": []}}))
+    store = JsonStore(path, mode="snapshot")
+
+    view = store.view()
+    with pytest.raises(TypeError):
+        view["Cafe"] = {}
+    with pytest.raises(TypeError):
+        view["Lobby"]["images"] = []
+    with pytest.raises(AttributeError):
+        view["Lobby"]["images"].append("b.png")
+
+    copy = store.load()
+    copy["Lobby"]["images"].append("b.png")
+    assert store.get("Lobby")["images"] == ("a.png",)
+
+
+@pytest.mark.parametrize("mode", ["snapshot", "wal"])
+def test_version_increments_on_each_save(tmp_path, mode):
+    path = tmp_path / "metadata.json"
+    path.write_text("{}")
+    store = JsonStore(path, mode=mode)
+    version = store.version
+
+    store.save({"a.png": {"start": "2025-01-01"}})
+    assert store.version == version + 1
+    store.save({"a.png": {"start": "2025-01-01"}, "b.png": {}})
+    assert store.version == version + 2
+    # The same data read back by a fresh instance
+    assert set(JsonStore(path, mode=mode).view()) == {"a.png", "b.png"}
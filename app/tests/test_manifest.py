@@ -0,0 +1,79 @@
+import asyncio
+from datetime import date, timedelta
+
+import httpx
+from fastapi import FastAPI
+
+from app.routes import display
+from app.services import manifest_service, metadata_service
+from app.services.json_store import JsonStore
+from app.services.schedule_index import ScheduleIndex
+
+TODAY = date.today()
+
+
+def _setup(monkeypatch, tmp_path):
+    metadata = JsonStore(tmp_path / "metadata.json")
+    playlists = JsonStore(tmp_path / "playlists.json")
+    metadata.save({
+        "a.png": {"start": (TODAY - timedelta(days=1)).isoformat(), "end": (TODAY + timedelta(days=1)).isoformat(),
+                  "digest": "aa", "object": "objects/aa.png"},
+        "old.png": {"start": "2000-01-01", "end": "2000-01-31", "digest": "bb", "object": "objects/bb.png"},
+    })
+    playlists.save({"Lobby": {"images": ["a.png", "old.png"], "devices": []}})
+    for module in (manifest_service, metadata_service):
+        monkeypatch.setattr(module, "metadata_store", metadata)
+    monkeypatch.setattr(manifest_service, "playlist_store", playlists)
+    monkeypatch.setattr(metadata_service, "_schedule", ScheduleIndex())
+    monkeypatch.setattr(manifest_service, "_cache", manifest_service.OrderedDict())
+
+    device = {"active": True, "active_playlist": "Lobby"}
+    monkeypatch.setattr(display, "authenticate_device", lambda device_id, token: device if token == "t" else None)
+    app = FastAPI()
+    app.include_router(display.router)
+    return app, metadata, device
+
+
+def _poll(app, etag=None, token="t"):
+    async def get():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            headers = {"If-None-Match": etag} if etag else {}
+            client.cookies.set("loopi_device_token", token)
+            return await client.get("/display/manifest", params={"device_id": "lobby"}, headers=headers)
+
+    return asyncio.run(get())
+
+
+def test_manifest_lists_todays_items_with_an_etag(monkeypatch, tmp_path):
+    app, _, _ = _setup(monkeypatch, tmp_path)
+
+    response = _poll(app)
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-cache"
+    body = response.json()
+    assert [item["filename"] for item in body["items"]] == ["a.png"]
+    assert response.headers["etag"] == f'"{body["version"]}"'
+    assert _poll(app, token="wrong").status_code == 403
+
+
+def test_unchanged_manifest_is_304_until_something_changes(monkeypatch, tmp_path):
+    app, metadata, device = _setup(monkeypatch, tmp_path)
+    etag = _poll(app).headers["etag"]
+
+    unchanged = _poll(app, etag)
+    assert unchanged.status_code == 304
+    assert unchanged.headers["etag"] == etag
+    assert _poll(app, f'"other", {etag}').status_code == 304
+
+    # Extending old.png's window to today brings it back into the manifest
+    metadata.update(lambda data: data["old.png"].update(end=TODAY.isoformat()))
+    changed = _poll(app, etag)
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert [item["filename"] for item in changed.json()["items"]] == ["a.png", "old.png"]
+
+    etag = changed.headers["etag"]
+    device["screen"] = {"height": 720, "webp": True}
+    assert _poll(app, etag).status_code == 200
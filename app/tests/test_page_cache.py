@@ -0,0 +1,83 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse
+
+from app.services.page_cache import PageCache
+
+
+class FakeStore:
+    version = 1
+
+
+def _app(cache: PageCache, store: FakeStore, renders: list) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/page")
+    async def page(request: Request):
+        def render():
+            renders.append(dict(request.query_params))
+            return HTMLResponse(f"<p>v{store.version} {request.query_params.get('q', '')}</p>")
+
+        return cache.respond(request, "page", (store,), render)
+
+    return app
+
+
+def _get_all(app: FastAPI, requests):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.get(url, headers=headers) for url, headers in requests]
+
+    return asyncio.run(run())
+
+
+def test_cached_until_store_version_bumps():
+    cache, store, renders = PageCache(enabled=True), FakeStore(), []
+    app = _app(cache, store, renders)
+
+    first, again, other = _get_all(app, [("/page?q=a", {}), ("/page?q=a", {}), ("/page?q=b", {})])
+    assert first.text == again.text == "<p>v1 a</p>"
+    assert other.text == "<p>v1 b</p>"
+    assert len(renders) == 2 and cache.stats()["hits"] == 1
+
+    store.version = 2
+    (after,) = _get_all(app, [("/page?q=a", {})])
+    assert after.text == "<p>v2 a</p>"
+    assert after.headers["etag"] != first.headers["etag"]
+    assert cache.stats()["entries"] == 1  # v1 entries dropped
+
+
+def test_conditional_get_skips_rendering():
+    cache, store, renders = PageCache(enabled=True), FakeStore(), []
+    app = _app(cache, store, renders)
+
+    (first,) = _get_all(app, [("/page", {})])
+    etag = first.headers["etag"]
+    (revalidated,) = _get_all(app, [("/page", {"If-None-Match": etag})])
+    assert revalidated.status_code == 304
+    assert len(renders) == 1
+
+    store.version = 2
+    (changed,) = _get_all(app, [("/page", {"If-None-Match": etag})])
+    assert changed.status_code == 200 and len(renders) == 2
+
+
+def test_assignment_version_ignores_heartbeat_flushes(tmp_path):
+    from app.services.device_service import AssignmentVersion
+    from app.services.json_store import JsonStore
+
+    store = JsonStore(tmp_path / "devices.json")
+    store.save({"lobby": {"name": "Lobby", "active_playlist": "Morning"}})
+    assignments = AssignmentVersion(store)
+    version = assignments.version
+
+    store.update(lambda devices: devices["lobby"].update(last_seen="2025-01-01T00:00:00"))
+    assert assignments.version == version
+
+    store.update(lambda devices: devices["lobby"].update(active_playlist="Evening"))
+    assert assignments.version == version + 1
+    store.update(lambda devices: devices.update(kiosk={"name": "Kiosk"}))
+    assert assignments.version == version + 2
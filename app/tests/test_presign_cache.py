@@ -0,0 +1,64 @@
+import asyncio
+import contextlib
+
+from app.services import media_service
+from app.services.presign_cache import PresignCache
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_url_reused_only_while_safe_fraction_remains():
+    clock = Clock()
+    cache = PresignCache(max_entries=10, safe_fraction=0.25, bucket_seconds=300, clock=clock)
+    cache.put("a.png", 3600, "url-1")
+
+    clock.now += 3600 * 0.74
+    assert cache.get("a.png", 3600) == "url-1"
+    assert cache.get("a.png", 3590) == "url-1"  # same expiry bucket
+
+    clock.now += 3600 * 0.02  # less than 25% of the lifetime left
+    assert cache.get("a.png", 3600) is None
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["expirations"] == 1
+
+
+def test_lru_eviction():
+    cache = PresignCache(max_entries=2, clock=Clock())
+    cache.put("a", 3600, "A")
+    cache.put("b", 3600, "B")
+    cache.get("a", 3600)          # a is now most recently used
+    cache.put("c", 3600, "C")
+    assert cache.get("b", 3600) is None
+    assert cache.get("a", 3600) == "A"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_batch_signs_only_missing_keys(monkeypatch):
+    signed = []
+
+    class FakeClient:
+        async def generate_presigned_url(self, operation, Params, ExpiresIn):
+            signed.append((Params["Key"], ExpiresIn))
+            return f"https://r2.example/{Params['Key']}?expires={ExpiresIn}"
+
+    @contextlib.asynccontextmanager
+    async def fake_client():
+        yield FakeClient()
+
+    monkeypatch.setattr(media_service, "r2_client", fake_client)
+    monkeypatch.setattr(media_service, "presign_cache", PresignCache(bucket_seconds=300))
+
+    first = asyncio.run(media_service.generate_presigned_urls(["a", "b", "a"], 3500))
+    second = asyncio.run(media_service.generate_presigned_urls(["a", "b", "c"], 3600))
+
+    assert first["a"] == "https://r2.example/a?expires=3600"  # signed for the whole bucket
+    assert second["a"] == first["a"] and second["b"] == first["b"]
+    assert signed == [("a", 3600), ("b", 3600), ("c", 3600)]
+    assert media_service.presign_cache.stats()["hits"] == 2
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+
+from app.routes import display
+from app.services import push_service
+from app.services.json_store import JsonStore
+from app.services.push_service import PushBroker
+
+
+def test_publish_reaches_only_the_named_devices():
+    async def scenario():
+        broker = PushBroker()
+        lobby, lobby_tab, kiosk = broker.subscribe("lobby"), broker.subscribe("lobby"), broker.subscribe("kiosk")
+        broker.publish(["lobby"])
+        # From a worker thread (store listeners run there) delivery hops onto the loop
+        thread = threading.Thread(target=broker.publish, args=(["kiosk"],))
+        thread.start()
+        thread.join()
+        await asyncio.sleep(0)
+
+        assert lobby.queue.get_nowait() == lobby_tab.queue.get_nowait() == {"version": 1}
+        assert kiosk.queue.get_nowait() == {"version": 2}
+        assert broker.connections == 3
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_evicts_and_unsubscribe_cleans_up():
+    async def scenario():
+        broker = PushBroker(queue_size=1)
+        slow, fast = broker.subscribe("lobby"), broker.subscribe("kiosk")
+        broker.publish(["lobby", "kiosk"])
+        fast.queue.get_nowait()
+        broker.publish(["lobby", "kiosk"])
+
+        assert slow.evicted and broker.evictions == 1
+        assert broker.subscribed_devices() == ["kiosk"]
+        broker.unsubscribe(fast)
+        broker.unsubscribe(fast)  # twice is harmless
+        assert broker.connections == 0 and broker.subscribed_devices() == []
+
+    asyncio.run(scenario())
+
+
+def test_event_stream_unsubscribes_on_disconnect(monkeypatch):
+    broker = PushBroker()
+    monkeypatch.setattr(display, "broker", broker)
+    monkeypatch.setattr(display, "remember_assignment", lambda device_id: None)
+    monkeypatch.setattr(display, "_authorized_device", lambda device_id, token: {"active": True})
+
+    async def scenario():
+        response = await display.display_events(None, "lobby", "t", None)
+        stream = response.body_iterator
+        assert await stream.__anext__() == "retry: 5000\n\n"
+        broker.publish(["lobby"])
+        assert await stream.__anext__() == 'event: playlist\ndata: {"version": 1}\n\n'
+        assert broker.connections == 1
+        await stream.aclose()  # client went away
+        assert broker.connections == 0
+
+    asyncio.run(scenario())
+
+
+def test_device_listener_ignores_heartbeats_and_publishes_reassignments(monkeypatch, tmp_path):
+    store = JsonStore(tmp_path / "devices.json")
+    store.save({"lobby": {"active_playlist": "Morning"}, "kiosk": {"active_playlist": "Morning"}})
+    published = []
+
+    class Broker:
+        def subscribed_devices(self):
+            return ["lobby", "kiosk"]
+
+        def publish(self, device_ids):
+            published.append(sorted(device_ids))
+
+    monkeypatch.setattr(push_service, "broker", Broker())
+    monkeypatch.setattr(push_service, "_assignments", {})
+    monkeypatch.setattr(push_service, "device_store", store)
+    for device_id in ("lobby", "kiosk"):
+        push_service.remember_assignment(device_id)
+
+    store.update(lambda devices: devices["lobby"].update(last_seen="2025-01-01T00:00:00"))
+    push_service._on_devices_changed(store, ["lobby"])
+    store.update(lambda devices: devices["kiosk"].update(active_playlist="Evening"))
+    push_service._on_devices_changed(store, ["kiosk"])
+
+    assert published == [[], ["kiosk"]]
+
+
+def test_last_unsubscribe_forgets_the_assignment(monkeypatch):
+    assignments = {"lobby": ("Morning", None), "kiosk": ("Evening", None)}
+    monkeypatch.setattr(push_service, "_assignments", assignments)
+
+    async def scenario():
+        broker = PushBroker(queue_size=1, on_idle=push_service.forget_assignment)
+        tab, other_tab, kiosk = broker.subscribe("lobby"), broker.subscribe("lobby"), broker.subscribe("kiosk")
+        broker.unsubscribe(tab)
+        assert "lobby" in assignments
+        broker.unsubscribe(other_tab)
+        assert "lobby" not in assignments
+        broker.publish(["kiosk"])
+        broker.publish(["kiosk"])  # evicted: the last kiosk connection
+        assert kiosk.evicted and assignments == {}
+
+    asyncio.run(scenario())
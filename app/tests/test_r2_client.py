@@ -0,0 +1,50 @@
+import asyncio
+
+from app.services.r2_client import R2ClientManager
+
+
+class FakeContext:
+    def __init__(self, n):
+        self.client = f"client-{n}"
+        self.closed = False
+
+    async def __aenter__(self):
+        return self.client
+
+    async def __aexit__(self, *exc):
+        self.closed = True
+
+
+class FakeSession:
+    def __init__(self):
+        self.contexts = []
+
+    def client(self, *args, **kwargs):
+        self.contexts.append(FakeContext(len(self.contexts) + 1))
+        return self.contexts[-1]
+
+
+def test_reset_closes_the_old_client_after_its_last_lease():
+    manager = R2ClientManager(max_pool_connections=1)
+    session = manager._session = FakeSession()
+
+    async def scenario():
+        async with manager.client() as first:
+            async with manager.client():
+                await manager.reset()
+                old = session.contexts[0]
+                assert not old.closed            # still leased
+                async with manager.client() as fresh:
+                    assert fresh == "client-2"
+            assert first == "client-1" and not old.closed
+        assert old.closed
+        assert not session.contexts[1].closed
+
+        await manager.reset()                    # no leases: closed right away
+        assert session.contexts[1].closed
+        await manager.close()
+        assert all(context.closed for context in session.contexts)
+
+    asyncio.run(scenario())
+    assert manager.stats()["leases_beyond_pool"] == 2
+    assert manager.stats()["retired_clients"] == 0
@@ -0,0 +1,266 @@
+import asyncio
+import contextlib
+import io
+import os
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+
+from app.routes import media
+from app.services import media_service, r2_upload
+from app.services.json_store import JsonStore
+
+MB = 1024 * 1024
+
+
+class FakeS3:
+    """In-memory stand-in for the S3 multipart API used by r2_upload."""
+
+    def __init__(self, part_delay=0.01, fail_parts=()):
+        self.part_delay = part_delay
+        self.fail_parts = set(fail_parts)
+        self.uploads = {}
+        self.objects = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.part_calls = 0
+
+    async def create_multipart_upload(self, Bucket, Key):
+        upload_id = f"upload-{len(self.uploads) + 1}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    async def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.part_calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.part_delay)
+            if PartNumber in self.fail_parts:
+                self.fail_parts.discard(PartNumber)  # fail once, succeed on retry
+                raise ConnectionError("connection reset")
+            self.uploads[UploadId][PartNumber] = Body
+            return {"ETag": f'"etag-{PartNumber}"'}
+        finally:
+            self.in_flight -= 1
+
+    async def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        numbers = [p["PartNumber"] for p in MultipartUpload["Parts"]]
+        assert numbers == sorted(parts)
+        self.objects[Key] = b"".join(parts[n] for n in numbers)
+
+    async def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+
+
+@pytest.fixture
+def state(monkeypatch, tmp_path):
+    store = JsonStore(tmp_path / "r2_uploads.json")
+    monkeypatch.setattr(r2_upload, "upload_state", store)
+    monkeypatch.setattr(r2_upload, "RETRY_BACKOFF", 0.001)
+    return store
+
+
+async def _write_all(writer, data, chunk=MB):
+    for start in range(0, len(data), chunk):
+        await writer.write(data[start:start + chunk])
+
+
+def test_parts_upload_in_parallel_within_the_limit(state):
+    client = FakeS3()
+    data = os.urandom(23 * MB)
+
+    async def scenario():
+        writer = await r2_upload.open_multipart_upload(client, "k1", "obj", part_size=5 * MB, concurrency=2)
+        await _write_all(writer, data)
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert client.objects["obj"] == data
+    assert writer.size == len(data)
+    assert client.max_in_flight == 2
+    assert state.get("k1") is None
+
+
+def test_failed_part_is_retried(state):
+    client = FakeS3(fail_parts={2})
+    data = os.urandom(11 * MB)
+
+    async def scenario():
+        writer = await r2_upload.open_multipart_upload(client, "k1", "obj", part_size=5 * MB)
+        await _write_all(writer, data)
+        await writer.close()
+
+    asyncio.run(scenario())
+    assert client.objects["obj"] == data
+    assert client.part_calls == 4
+
+
+def test_interrupted_upload_resumes_from_last_part(state):
+    client = FakeS3()
+    data = os.urandom(17 * MB)
+
+    async def first_attempt():
+        writer = await r2_upload.open_multipart_upload(client, "k1", "obj", part_size=5 * MB)
+        await _write_all(writer, data[:12 * MB])
+        await writer.abort()  # connection dropped mid-part
+
+    async def second_attempt(offset):
+        with pytest.raises(HTTPException) as wrong_offset:
+            await r2_upload.open_multipart_upload(client, "k1", "ignored", offset=0)
+        assert wrong_offset.value.status_code == 409
+
+        writer = await r2_upload.open_multipart_upload(client, "k1", "ignored", offset=offset)
+        await _write_all(writer, data[offset:])
+        await writer.close()
+        return writer
+
+    asyncio.run(first_attempt())
+    status = r2_upload.get_upload("k1")
+    assert status["offset"] == 10 * MB
+    assert status["key"] == "obj"
+
+    calls_before = client.part_calls
+    writer = asyncio.run(second_attempt(status["offset"]))
+    assert writer.key == "obj"
+    assert client.objects["obj"] == data
+    assert client.part_calls - calls_before == 2  # only parts 3 and 4 were sent again
+    assert r2_upload.get_upload("k1") is None
+
+
+def test_media_upload_route_streams_to_r2(state, monkeypatch):
+    client = FakeS3()
+    saved = {}
+
+    @contextlib.asynccontextmanager
+    async def fake_client():
+        yield client
+
+    async def fake_save(**kwargs):
+        saved.update(kwargs)
+
+    monkeypatch.setattr(media_service, "r2_client", fake_client)
+    monkeypatch.setattr(media_service, "save_media_metadata", fake_save)
+
+    app = FastAPI()
+    app.include_router(media.router)
+    data = os.urandom(6 * MB)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.post(
+                "/media/upload",
+                files={"file": ("clip.mp4", data, "video/mp4")},
+                headers={"Upload-Key": "route-1"},
+            )
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 200, response.text
+    key = response.json()["key"]
+    assert key.endswith("_clip.mp4")
+    assert client.objects[key] == data
+    assert saved["size"] == len(data)
+    assert saved["content_type"] == "video/mp4"
+
+
+def _failing_route(monkeypatch, client):
+    @contextlib.asynccontextmanager
+    async def fake_client():
+        yield client
+
+    async def failing_save(**kwargs):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(media_service, "r2_client", fake_client)
+    monkeypatch.setattr(media_service, "save_media_metadata", failing_save)
+    app = FastAPI()
+    app.include_router(media.router)
+    return app
+
+
+def _post_upload(app, headers, content):
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.post("/media/upload", headers=headers, **content)
+
+    return asyncio.run(scenario())
+
+
+def test_failed_upload_without_key_is_aborted(state, monkeypatch):
+    client = FakeS3()
+    # Body cut off mid-file: the multipart upload is open with a part in flight
+    body = (b'--b\r\nContent-Disposition: form-data; name="file"; filename="clip.mp4"\r\n\r\n'
+            + os.urandom(6 * MB))
+    app = _failing_route(monkeypatch, client)
+
+    response = _post_upload(app, {"Content-Type": "multipart/form-data; boundary=b"}, {"content": body})
+
+    assert response.status_code == 400
+    detail = response.json()["detail"]
+    assert detail["upload_key"] and detail["error"]
+    assert client.uploads == {}
+    assert dict(state.view()) == {}
+
+
+def test_failed_upload_with_key_stays_resumable(state, monkeypatch):
+    client = FakeS3()
+    body = (b'--b\r\nContent-Disposition: form-data; name="file"; filename="clip.mp4"\r\n\r\n'
+            + os.urandom(6 * MB))
+    app = _failing_route(monkeypatch, client)
+
+    response = _post_upload(
+        app, {"Content-Type": "multipart/form-data; boundary=b", "Upload-Key": "keep-1"}, {"content": body}
+    )
+
+    assert response.json()["detail"]["upload_key"] == "keep-1"
+    assert r2_upload.get_upload("keep-1")["offset"] == 0
+    assert len(client.uploads) == 1
+
+
+def test_sweep_aborts_only_stale_uploads(state):
+    client = FakeS3()
+
+    async def scenario():
+        for upload_key in ("old", "fresh"):
+            await r2_upload.open_multipart_upload(client, upload_key, f"{upload_key}.mp4")
+        state.update(lambda uploads: uploads["old"].update(started=1000.0))
+        return await r2_upload.sweep_stale_uploads(client, ttl=3600, now=1000.0 + 7200)
+
+    assert asyncio.run(scenario()) == 1
+    assert set(state.view()) == {"fresh"}
+    assert len(client.uploads) == 1
+
+
+def test_failed_helper_upload_is_aborted_and_can_be_retried(state, monkeypatch):
+    client = FakeS3()
+
+    @contextlib.asynccontextmanager
+    async def fake_client():
+        yield client
+
+    monkeypatch.setattr(media_service, "r2_client", fake_client)
+
+    class Broken:
+        def __init__(self, data):
+            self.data, self.reads = data, 0
+
+        def read(self, size):
+            self.reads += 1
+            if self.reads > 2:
+                raise OSError("disk went away")
+            chunk, self.data = self.data[:size], self.data[size:]
+            return chunk
+
+    data = os.urandom(20 * MB)
+    with pytest.raises(OSError):
+        asyncio.run(media_service.upload_media_to_r2(Broken(data), "clip.mp4"))
+    assert client.uploads == {}
+    assert r2_upload.get_upload("clip.mp4") is None
+
+    asyncio.run(media_service.upload_media_to_r2(io.BytesIO(data), "clip.mp4"))
+    assert client.objects["clip.mp4"] == data
@@ -0,0 +1,25 @@
+from PIL import Image
+
+from app.services.rendition_service import render_variants
+
+
+def test_animated_images_get_no_renditions(tmp_path):
+    source = tmp_path / "spin.gif"
+    frames = [Image.new("RGB", (64, 64), color) for color in ("red", "blue")]
+    frames[0].save(source, save_all=True, append_images=frames[1:], duration=100, loop=0)
+
+    assert render_variants(str(source), str(tmp_path / "out"), "spin") == []
+
+
+def test_jpeg_rendition_composites_transparency_onto_white(tmp_path):
+    source = tmp_path / "logo.png"
+    image = Image.new("RGBA", (40, 40), (0, 0, 0, 0))
+    image.paste((255, 0, 0, 255), (0, 0, 20, 40))
+    image.save(source)
+
+    variants = render_variants(str(source), str(tmp_path / "out"), "logo", heights=(720,), formats=("jpeg",))
+
+    assert [(v["height"], v["format"]) for v in variants] == [(40, "jpeg")]
+    with Image.open(tmp_path / "out" / "logo.40.jpg") as jpeg:
+        assert min(jpeg.getpixel((35, 20))) > 245   # was transparent → white
+        assert jpeg.getpixel((5, 20))[0] > 200      # opaque red kept
@@ -0,0 +1,96 @@
+import random
+from datetime import date, timedelta
+
+from app.services import metadata_service
+from app.services.json_store import JsonStore
+from app.services.schedule_index import IntervalTree, ScheduleIndex
+
+BASE = date(2025, 1, 1)
+
+
+def _random_entry(rng):
+    start = BASE + timedelta(days=rng.randrange(0, 365))
+    end = start + timedelta(days=rng.randrange(0, 120))
+    playlists = rng.sample(["Lobby", "Cafe", "Promo"], rng.randrange(0, 3))
+    return {"start": start.isoformat(), "end": end.isoformat(), "playlists": playlists}
+
+
+def _brute_active(metadata, day, playlist=None):
+    return {
+        name for name, info in metadata.items()
+        if info["start"] <= day.isoformat() <= info["end"]
+        and (playlist is None or playlist in info["playlists"])
+    }
+
+
+def test_interval_tree_matches_brute_force():
+    rng = random.Random(7)
+    tree, intervals = IntervalTree(), {}
+    for step in range(2000):
+        if intervals and rng.random() < 0.3:
+            key = rng.choice(sorted(intervals))
+            tree.remove(*intervals.pop(key), key)
+        else:
+            start = rng.randrange(1000, 2000)
+            key = f"k{step}"
+            intervals[key] = (start, start + rng.randrange(0, 200))
+            tree.add(*intervals[key], key)
+
+        point = rng.randrange(900, 2300)
+        assert set(tree.stab(point)) == {k for k, (s, e) in intervals.items() if s <= point <= e}
+        lo = rng.randrange(900, 2300)
+        hi = lo + rng.randrange(0, 100)
+        assert set(tree.overlap(lo, hi)) == {k for k, (s, e) in intervals.items() if s <= hi and e >= lo}
+    assert tree.size == len(intervals)
+
+
+def test_incremental_index_matches_brute_force_and_rebuild():
+    rng = random.Random(11)
+    index, metadata = ScheduleIndex(), {}
+    index.rebuild(metadata, 0)
+    for step in range(500):
+        name = f"img{rng.randrange(0, 150)}.png"
+        if name in metadata and rng.random() < 0.3:
+            del metadata[name]
+            index.discard(name)
+        else:
+            metadata[name] = _random_entry(rng)
+            index.put(name, metadata[name])
+
+        day = BASE + timedelta(days=rng.randrange(-10, 500))
+        assert set(index.active_on(day)) == _brute_active(metadata, day)
+        assert set(index.active_in_playlist("Cafe", day)) == _brute_active(metadata, day, "Cafe")
+
+    rebuilt = ScheduleIndex()
+    rebuilt.rebuild(metadata, 1)
+    today = BASE + timedelta(days=200)
+    assert index.expiring_within(30, today) == rebuilt.expiring_within(30, today)
+    assert sorted(index.scheduled_after(today)) == sorted(rebuilt.scheduled_after(today))
+    assert sorted(index.expired_before(today)) == sorted(rebuilt.expired_before(today))
+
+
+def test_store_writes_patch_the_index_without_rebuilding(monkeypatch, tmp_path):
+    path = tmp_path / "metadata.json"
+    path.write_text("{}")
+    store = JsonStore(path)
+    store.add_listener(metadata_service._patch_schedule)
+    index = ScheduleIndex()
+    monkeypatch.setattr(metadata_service, "metadata_store", store)
+    monkeypatch.setattr(metadata_service, "_schedule", index)
+
+    store.save({"a.png": {"start": "2025-01-01", "end": "2025-01-31", "playlists": ["Lobby"],
+                          "digest": "d", "object": "objects/d.png"}})
+    metadata_service.schedule_index()  # initial build
+    rebuilds = []
+    monkeypatch.setattr(index, "rebuild", lambda *args: rebuilds.append(args))
+
+    assert metadata_service.update_file_metadata("a.png", "2025-03-01", "2025-03-31", ["Cafe"])
+    assert not metadata_service.update_file_metadata("missing.png", "2025-03-01", "2025-03-31", [])
+    entry = store.get("a.png")
+    assert (entry["digest"], entry["object"]) == ("d", "objects/d.png")
+    assert metadata_service.get_active_playlist_images("Cafe", date(2025, 3, 15)) == ["a.png"]
+    assert metadata_service.get_active_images(date(2025, 1, 15)) == []
+
+    assert metadata_service.delete_file_metadata("a.png")["digest"] == "d"
+    assert metadata_service.get_active_images(date(2025, 3, 15)) == []
+    assert rebuilds == []
@@ -0,0 +1,61 @@
+import pytest
+from sqlmodel import create_engine
+
+from app.services.sql_store import DeviceSqlStore, PlaylistSqlStore, StoreConflict
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'loopi.db'}", connect_args={"check_same_thread": False})
+
+
+def test_round_trip_keeps_playlist_order(engine):
+    store = PlaylistSqlStore(engine=engine)
+    store.save({"Lobby": {"color": "#fff", "images": ["b.png", "a.png"], "devices": ["Screen 1"]}})
+
+    fresh = PlaylistSqlStore(engine=engine)
+    assert fresh.get("Lobby")["images"] == ("b.png", "a.png")
+    assert fresh.load()["Lobby"]["devices"] == ["Screen 1"]
+
+
+def test_reads_trust_the_cached_version_until_the_ttl_runs_out(engine):
+    clock = Clock()
+    reader = DeviceSqlStore(engine=engine, version_ttl=1.0, clock=clock)
+    writer = DeviceSqlStore(engine=engine)
+    assert dict(reader.view()) == {}
+
+    writer.save({"lobby": {"auth_token": "t1"}})
+    assert "lobby" not in reader.view()      # Within the TTL: no version lookup
+    clock.now = 1.0
+    assert "lobby" in reader.view()
+
+
+def test_stale_commit_raises_and_update_retries(engine):
+    first = DeviceSqlStore(engine=engine)
+    second = DeviceSqlStore(engine=engine)
+    first.save({"lobby": {"auth_token": "t1"}})
+    second.view()
+
+    first.update(lambda data: data.__setitem__("kiosk", {"auth_token": "t2"}))
+    with pytest.raises(StoreConflict):
+        second._commit({"cafe": {}}, expected=1)   # second still holds version 1
+
+    calls = []
+
+    def add_cafe(data):
+        calls.append(set(data))
+        if len(calls) == 1:   # Another worker commits while fn runs
+            first.update(lambda other: other.__setitem__("hall", {}))
+        data["cafe"] = {}
+
+    second.update(add_cafe)
+    assert len(calls) == 2
+    assert set(DeviceSqlStore(engine=engine).view()) == {"lobby", "kiosk", "hall", "cafe"}
@@ -0,0 +1,141 @@
+import asyncio
+import gzip
+import os
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+from app.utils import static_files
+from app.utils.static_files import FINGERPRINTED, ImmutableStaticFiles, file_fingerprint
+
+
+def _get_all(directory, requests, **options):
+    options = {"pattern": FINGERPRINTED, "versioned": True, **options}
+    app = Starlette(routes=[Mount("/static", ImmutableStaticFiles(directory=directory, **options))])
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.get(url, headers=headers) for url, headers in requests]
+
+    return asyncio.run(run())
+
+
+def test_serves_precompressed_variant_with_its_own_etag(tmp_path):
+    css = b"body { color: red; }\n" * 200
+    (tmp_path / "main.css").write_bytes(css)
+    (tmp_path / "main.css.gz").write_bytes(gzip.compress(css))
+
+    plain, encoded = _get_all(tmp_path, [
+        ("/static/main.css", {"accept-encoding": "identity"}),
+        ("/static/main.css", {"accept-encoding": "gzip, br"}),
+    ])
+    assert plain.headers.get("content-encoding") is None
+    assert encoded.headers["content-encoding"] == "gzip"
+    assert encoded.num_bytes_downloaded < len(css)
+    assert plain.content == encoded.content == css
+    assert plain.headers["vary"] == encoded.headers["vary"] == "Accept-Encoding"
+    assert plain.headers["etag"] != encoded.headers["etag"]
+    assert plain.headers["cache-control"] == "no-cache"
+
+    (not_modified,) = _get_all(tmp_path, [
+        ("/static/main.css", {"accept-encoding": "gzip", "if-none-match": encoded.headers["etag"]}),
+    ])
+    assert not_modified.status_code == 304
+
+
+def test_stale_variant_is_ignored(tmp_path):
+    (tmp_path / "main.css").write_bytes(b"body { color: blue; }\n" * 200)
+    (tmp_path / "main.css.gz").write_bytes(gzip.compress(b"old"))
+    stat = os.stat(tmp_path / "main.css")
+    os.utime(tmp_path / "main.css.gz", ns=(stat.st_atime_ns, stat.st_mtime_ns - 10**9))
+
+    (response,) = _get_all(tmp_path, [("/static/main.css", {"accept-encoding": "gzip"})])
+    assert response.headers.get("content-encoding") is None
+    assert response.content.startswith(b"body { color: blue; }")
+
+
+def test_versioned_urls_are_immutable(tmp_path):
+    (tmp_path / "app.js").write_bytes(b"console.log('v1');")
+    (tmp_path / "sprite.0123456789ab.svg").write_bytes(b"<svg/>")
+    version = file_fingerprint(tmp_path / "app.js")
+
+    current, stale, fingerprinted = _get_all(tmp_path, [
+        (f"/static/app.js?v={version}", {}),
+        ("/static/app.js?v=000000000000", {}),
+        ("/static/sprite.0123456789ab.svg", {}),
+    ])
+    assert "immutable" in current.headers["cache-control"]
+    assert stale.headers["cache-control"] == "no-cache"
+    assert "immutable" in fingerprinted.headers["cache-control"]
+    assert fingerprinted.headers["etag"] == '"sprite.0123456789ab.svg"'
+
+
+def test_range_requests(tmp_path):
+    video = bytes(range(256)) * 4096  # 1 MiB, above the sendfile threshold
+    (tmp_path / "clip.mp4").write_bytes(video)
+
+    full, head, tail, suffix, beyond = _get_all(tmp_path, [
+        ("/static/clip.mp4", {}),
+        ("/static/clip.mp4", {"range": "bytes=0-99"}),
+        ("/static/clip.mp4", {"range": "bytes=1000000-"}),
+        ("/static/clip.mp4", {"range": "bytes=-10"}),
+        ("/static/clip.mp4", {"range": f"bytes={len(video)}-"}),
+    ])
+    assert full.status_code == 200 and full.headers["accept-ranges"] == "bytes"
+    assert head.status_code == 206 and head.content == video[:100]
+    assert head.headers["content-range"] == f"bytes 0-99/{len(video)}"
+    assert tail.content == video[1000000:] and suffix.content == video[-10:]
+    assert beyond.status_code == 416
+    assert beyond.headers["content-range"] == f"bytes */{len(video)}"
+
+    stale, current = _get_all(tmp_path, [
+        ("/static/clip.mp4", {"range": "bytes=0-9", "if-range": '"outdated"'}),
+        ("/static/clip.mp4", {"range": "bytes=0-9", "if-range": full.headers["etag"]}),
+    ])
+    assert stale.status_code == 200 and len(stale.content) == len(video)
+    assert current.status_code == 206
+
+
+def test_concurrent_partial_reads(tmp_path):
+    video = bytes(range(256)) * 16384  # 4 MiB
+    (tmp_path / "clip.webm").write_bytes(video)
+    app = Starlette(routes=[Mount("/static", ImmutableStaticFiles(directory=tmp_path))])
+    pieces = [(start, min(start + 700_000, len(video)) - 1) for start in range(0, len(video), 700_000)]
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(
+                client.get("/static/clip.webm", headers={"range": f"bytes={first}-{last}"}) for first, last in pieces
+            ))
+
+    responses = asyncio.run(run())
+    assert all(r.status_code == 206 for r in responses)
+    assert b"".join(r.content for r in responses) == video
+
+
+def test_uploads_mount_never_hashes_for_a_version(tmp_path, monkeypatch):
+    (tmp_path / "clip.mp4").write_bytes(b"\0" * 1024)
+    monkeypatch.setattr(static_files, "file_fingerprint", lambda path: pytest.fail("hashed an upload"))
+
+    (tmp_path / "uploads").mkdir()
+    (tmp_path / "uploads" / "clip.mp4").write_bytes(b"\0" * 1024)
+
+    (uploads_mount,) = _get_all(tmp_path, [("/static/clip.mp4?v=abc", {})], pattern=static_files.CONTENT_ADDRESSED,
+                                versioned=False)
+    (under_static,) = _get_all(tmp_path, [("/static/uploads/clip.mp4?v=abc", {})], unversioned=("uploads",))
+    assert uploads_mount.headers["cache-control"] == under_static.headers["cache-control"] == "no-cache"
+
+
+def test_fingerprint_cache_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(static_files, "FINGERPRINT_CACHE_SIZE", 3)
+    monkeypatch.setattr(static_files, "_fingerprints", static_files.OrderedDict())
+    for n in range(5):
+        (tmp_path / f"{n}.js").write_text(f"// {n}")
+        file_fingerprint(tmp_path / f"{n}.js")
+    file_fingerprint(tmp_path / "2.js")  # recently used: kept over 3.js
+
+    assert list(static_files._fingerprints) == [str(tmp_path / f"{n}.js") for n in (3, 4, 2)]
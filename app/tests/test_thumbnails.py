@@ -0,0 +1,54 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from app.routes import content
+from app.services import object_store
+
+
+def _get(app, url):
+    async def fetch():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(url)
+
+    return asyncio.run(fetch())
+
+
+def _app(monkeypatch, tmp_path, metadata):
+    monkeypatch.setattr(object_store, "UPLOAD_DIR", tmp_path / "uploads")
+    monkeypatch.setattr(content.metadata_store, "get", metadata.get)
+    rendered = []
+
+    async def ensure_thumbnail(filename, meta):
+        rendered.append(filename)
+        return None
+
+    monkeypatch.setattr(content, "ensure_thumbnail", ensure_thumbnail)
+    app = FastAPI()
+    app.include_router(content.router, prefix="/content")
+    return app, rendered
+
+
+def test_thumb_without_metadata_is_404(monkeypatch, tmp_path):
+    (tmp_path / "secret.txt").write_text("x")
+    app, rendered = _app(monkeypatch, tmp_path, {})
+
+    assert _get(app, "/content/thumb/..%2Fsecret.txt").status_code == 404
+    assert _get(app, "/content/thumb/unknown.png").status_code == 404
+    assert rendered == []
+
+
+def test_thumb_rejects_entries_resolving_outside_upload_dir(monkeypatch, tmp_path):
+    metadata = {
+        "../secret.txt": {"start": "2025-01-01", "end": "2025-01-31"},
+        "a.png": {"object": "../../etc/passwd"},
+        "ok.png": {"object": "objects/ok.png"},
+    }
+    app, rendered = _app(monkeypatch, tmp_path, metadata)
+
+    assert _get(app, "/content/thumb/..%2Fsecret.txt").status_code == 404
+    assert _get(app, "/content/thumb/a.png").status_code == 404
+    assert _get(app, "/content/thumb/ok.png").status_code == 302  # no thumbnail → original
+    assert rendered == ["ok.png"]
@@ -0,0 +1,305 @@
+import asyncio
+import hashlib
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI, Request
+
+from app.services import object_store
+from app.services.upload_engine import receive_upload, sniff_media_type
+
+BOUNDARY = "loopi-test-boundary"
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+MB = 1024 * 1024
+
+
+def _engine_app(max_bytes: int) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        form, uploads = await receive_upload(request, max_bytes=max_bytes)
+        stored = [await asyncio.to_thread(u.commit) for u in uploads]
+        return {"form": form, "stored": stored}
+
+    return app
+
+
+def _use_tmp_object_store(monkeypatch, tmp_path):
+    monkeypatch.setattr(object_store, "UPLOAD_DIR", tmp_path)
+    monkeypatch.setattr(object_store, "OBJECT_DIR", tmp_path / "objects")
+
+
+async def _multipart(head: bytes, total: int, sha, chunk_size: int = MB):
+    yield (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="start_date"\r\n\r\n2025-01-01\r\n'
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="big.png"\r\n'
+        f"Content-Type: image/png\r\n\r\n"
+    ).encode()
+    sha.update(head)
+    yield head
+    sent = len(head)
+    block = b"\0" * chunk_size
+    while sent < total:
+        chunk = block[: min(chunk_size, total - sent)]
+        sha.update(chunk)
+        sent += len(chunk)
+        yield chunk
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+async def _post(app: FastAPI, body):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+        return await client.post(
+            "/upload",
+            content=body,
+            headers={"content-type": f"multipart/form-data; boundary={BOUNDARY}"},
+        )
+
+
+def test_streaming_upload_keeps_event_loop_responsive(monkeypatch, tmp_path):
+    _use_tmp_object_store(monkeypatch, tmp_path)
+    total = 200 * MB
+    app = _engine_app(max_bytes=256 * MB)
+
+    async def scenario():
+        lags = []
+        done = asyncio.Event()
+
+        async def ticker(interval=0.005):
+            while not done.is_set():
+                started = time.perf_counter()
+                await asyncio.sleep(interval)
+                lags.append(time.perf_counter() - started - interval)
+
+        sha = hashlib.sha256()
+        tick = asyncio.create_task(ticker())
+        try:
+            response = await _post(app, _multipart(PNG_MAGIC, total, sha))
+        finally:
+            done.set()
+            await tick
+        return response, sha.hexdigest(), lags
+
+    response, digest, lags = asyncio.run(scenario())
+
+    assert response.status_code == 200
+    stored = response.json()["stored"][0]
+    assert stored["digest"] == digest
+    assert stored["size"] == total
+    assert (tmp_path / stored["object"]).stat().st_size == total
+    assert response.json()["form"] == {"start_date": ["2025-01-01"]}
+    # The loop kept ticking throughout: no single stall anywhere near a blocking copy
+    assert len(lags) > 10
+    assert max(lags) < 0.1, f"event loop stalled for {max(lags) * 1000:.0f} ms"
+
+
+def test_rejects_non_image_payload(monkeypatch, tmp_path):
+    _use_tmp_object_store(monkeypatch, tmp_path)
+    app = _engine_app(max_bytes=8 * MB)
+    response = asyncio.run(_post(app, _multipart(b"MZ\x90\x00" + b"\0" * 8, 4 * MB, hashlib.sha256())))
+    assert response.status_code == 415
+    assert not list((tmp_path / "objects").iterdir())
+
+
+def test_rejects_oversize_payload(monkeypatch, tmp_path):
+    _use_tmp_object_store(monkeypatch, tmp_path)
+    app = _engine_app(max_bytes=2 * MB)
+    response = asyncio.run(_post(app, _multipart(PNG_MAGIC, 8 * MB, hashlib.sha256())))
+    assert response.status_code == 413
+    assert not list((tmp_path / "objects").iterdir())
+
+
+def test_truncated_body_leaves_no_partial_file(monkeypatch, tmp_path):
+    _use_tmp_object_store(monkeypatch, tmp_path)
+    app = _engine_app(max_bytes=8 * MB)
+
+    async def cut_off():
+        async for chunk in _multipart(PNG_MAGIC, 3 * MB, hashlib.sha256()):
+            if chunk.startswith(b"\r\n--"):
+                return  # connection dropped before the closing boundary
+            yield chunk
+
+    response = asyncio.run(_post(app, cut_off()))
+    assert response.status_code == 400
+    assert not list((tmp_path / "objects").iterdir())
+
+
+def test_declared_oversize_is_rejected_before_reading(monkeypatch, tmp_path):
+    _use_tmp_object_store(monkeypatch, tmp_path)
+    app = _engine_app(max_bytes=1 * MB)
+
+    async def post():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(
+                "/upload",
+                content=b"x" * (3 * MB),
+                headers={"content-type": f"multipart/form-data; boundary={BOUNDARY}"},
+            )
+
+    assert asyncio.run(post()).status_code == 413
+    assert not (tmp_path / "objects").exists() or not list((tmp_path / "objects").iterdir())
+
+
+def test_sniff_media_type():
+    assert sniff_media_type(PNG_MAGIC + b"\0" * 4) == "image/png"
+    assert sniff_media_type(b"\xff\xd8\xff\xe0" + b"\0" * 8) == "image/jpeg"
+    assert sniff_media_type(b"GIF89a" + b"\0" * 6) == "image/gif"
+    assert sniff_media_type(b"RIFF\0\0\0\0WEBP") == "image/webp"
+    assert sniff_media_type(b"\0\0\0\x18ftypisom") == "video/mp4"
+    assert sniff_media_type(b"\0\0\0\x18ftypheic") is None
+    assert sniff_media_type(b"\x1a\x45\xdf\xa3" + b"\0" * 8) == "video/webm"
+    assert sniff_media_type(b"<svg xmlns=") is None
+    assert sniff_media_type(b"") is None
+
+
+def test_batch_rejects_bad_files_individually_and_cleans_them_up(monkeypatch, tmp_path):
+    _use_tmp_object_store(monkeypatch, tmp_path)
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        _, uploads = await receive_upload(request, max_bytes=1 * MB, max_body_bytes=8 * MB, per_file_errors=True)
+        return [
+            {"filename": u.filename, "error": u.error, "stored": None if u.error else u.commit()["object"]}
+            for u in uploads
+        ]
+
+    body = (
+        _part("file", PNG_MAGIC + b"ok", "good.png")
+        + _part("file", b"MZ\x90\x00" + b"\0" * 16, "evil.exe")
+        + _part("file", PNG_MAGIC + b"\0" * (2 * MB), "huge.png")
+        + f"--{BOUNDARY}--\r\n".encode()
+    )
+    response = asyncio.run(_post(app, body))
+
+    assert response.status_code == 200
+    results = {r["filename"]: r for r in response.json()}
+    assert results["good.png"]["error"] is None
+    assert results["evil.exe"]["error"] and results["huge.png"]["error"]
+    assert [p.name for p in (tmp_path / "objects").rglob("*") if p.is_file()] == [
+        Path(results["good.png"]["stored"]).name
+    ]
+
+
+def _part(name: str, value: bytes, filename: str = None) -> bytes:
+    disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else "")
+    return f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n".encode() + value + b"\r\n"
+
+
+def test_batch_upload_writes_each_store_once(monkeypatch, tmp_path):
+    from app.routes import upload as upload_route
+
+    _use_tmp_object_store(monkeypatch, tmp_path)
+    metadata = {"old.png": {"start": "2024-01-01", "end": "2024-02-01", "playlists": []}}
+    playlists = {"Lobby": {"color": "#123456", "images": [], "devices": []}}
+    saves = {"metadata": 0, "playlists": 0}
+
+    def update(store, data):
+        def _update(fn):
+            saves[store] += 1
+            return fn(data)
+        return _update
+
+    monkeypatch.setattr(upload_route, "update_metadata", update("metadata", metadata))
+    monkeypatch.setattr(upload_route, "update_playlists", update("playlists", playlists))
+    monkeypatch.setattr(upload_route, "schedule_renditions", lambda filename: None)
+
+    body = b"".join([
+        _part("start_date", b"2025-01-01"),
+        _part("end_date", b"2025-01-31"),
+        _part("playlists", b"Lobby"),
+        _part("files", PNG_MAGIC + b"a" * 100, "a.png"),
+        _part("files", b"MZ\x90\x00" + b"\0" * 100, "evil.exe"),
+        _part("files", PNG_MAGIC + b"a" * 100, "copy.png"),
+        _part("files", PNG_MAGIC + b"c" * 100, "late.png"),
+        _part("end_date.3", b"2024-12-01"),
+        _part("files", PNG_MAGIC + b"d" * 100, "own.png"),
+        _part("playlists.4", b""),
+    ]) + f"--{BOUNDARY}--\r\n".encode()
+
+    app = FastAPI()
+    app.include_router(upload_route.router)
+
+    async def post():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(
+                "/upload/batch",
+                content=body,
+                headers={"content-type": f"multipart/form-data; boundary={BOUNDARY}"},
+            )
+
+    response = asyncio.run(post())
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["uploaded"], report["failed"]) == (3, 2)
+    results = {r["filename"]: r for r in report["results"]}
+    assert [r["filename"] for r in report["results"]] == ["a.png", "evil.exe", "copy.png", "late.png", "own.png"]
+    assert results["evil.exe"]["status"] == "error"
+    assert results["late.png"]["detail"] == "End date must not precede start date."
+    # Identical bytes: one object (which of the concurrent commits dedupes is up to scheduling)
+    assert results["copy.png"]["digest"] == results["a.png"]["digest"]
+    assert metadata["copy.png"]["object"] == metadata["a.png"]["object"]
+    assert results["own.png"]["playlists"] == []
+
+    assert saves == {"metadata": 1, "playlists": 1}
+    assert set(metadata) == {"old.png", "a.png", "copy.png", "own.png"}
+    assert playlists["Lobby"]["images"] == ["a.png", "copy.png"]
+    assert len(list((tmp_path / "objects").rglob("*.png"))) == 2
+    assert not list((tmp_path / "objects").glob("*.part"))
+
+
+def test_concurrent_uploads_keep_every_store_write(monkeypatch, tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.routes import upload as upload_route
+    from app.services import metadata_service, playlist_service
+    from app.services.json_store import JsonStore
+
+    (tmp_path / "metadata.json").write_text("{}")
+    (tmp_path / "playlists.json").write_text('{"Lobby": {"color": "#fff", "images": [], "devices": []}}')
+    monkeypatch.setattr(metadata_service, "metadata_store", JsonStore(tmp_path / "metadata.json"))
+    monkeypatch.setattr(playlist_service, "playlist_store", JsonStore(tmp_path / "playlists.json"))
+
+    def record(n):
+        stored = {"digest": f"d{n}", "object": f"objects/d{n}.png"}
+        return upload_route._record_upload(f"img{n}.png", stored, "2025-01-01", "", ["Lobby"], None, None)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(record, range(30)))
+
+    assert len(metadata_service.metadata_store.view()) == 30
+    assert len(playlist_service.playlist_store.get("Lobby")["images"]) == 30
+
+
+def test_concurrent_batches_creating_one_playlist_keep_every_image(monkeypatch, tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.routes import upload as upload_route
+    from app.services import metadata_service, playlist_service
+    from app.services.json_store import JsonStore
+
+    (tmp_path / "metadata.json").write_text("{}")
+    (tmp_path / "playlists.json").write_text("{}")
+    monkeypatch.setattr(metadata_service, "metadata_store", JsonStore(tmp_path / "metadata.json"))
+    monkeypatch.setattr(playlist_service, "playlist_store", JsonStore(tmp_path / "playlists.json"))
+
+    def batch(n):
+        items = [
+            (f"b{n}-{i}.png", {"digest": f"d{n}-{i}", "object": f"objects/d{n}-{i}.png"}, "2025-01-01", "", [])
+            for i in range(5)
+        ]
+        return upload_route._record_batch(items, "Promo", "#ff0000")
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        list(pool.map(batch, range(6)))
+
+    metadata = metadata_service.metadata_store.view()
+    assert len(metadata) == 30
+    assert len(playlist_service.playlist_store.get("Promo")["images"]) == 30
@@ -0,0 +1,101 @@
+import asyncio
+import struct
+
+import httpx
+from fastapi import FastAPI
+
+from app.services import object_store
+from app.services.upload_engine import sniff_media_type
+from app.services.video_service import probe_video
+
+BOUNDARY = "loopi-test-boundary"
+
+
+def _box(kind: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I", 8 + len(payload)) + kind + payload
+
+
+def _mp4(seconds: float = 12.5, timescale: int = 1000, moov_last: bool = False) -> bytes:
+    ftyp = _box(b"ftyp", b"isom" + b"\0\0\2\0" + b"isomavc1")
+    mvhd = _box(b"mvhd", b"\0\0\0\0" + b"\0" * 8 + struct.pack(">II", timescale, int(seconds * timescale)) + b"\0" * 80)
+    tkhd = _box(b"tkhd", b"\0\0\0\x03" + b"\0" * 72 + struct.pack(">II", 1920 << 16, 1080 << 16))
+    hdlr = _box(b"hdlr", b"\0\0\0\0" + b"\0\0\0\0" + b"vide" + b"\0" * 12 + b"Video\0")
+    stsd = _box(b"stsd", b"\0\0\0\0" + struct.pack(">I", 1) + _box(b"avc1", b"\0" * 78))
+    trak = _box(b"trak", tkhd + _box(b"mdia", hdlr + _box(b"minf", _box(b"stbl", stsd))))
+    sound = _box(b"trak", _box(b"mdia", _box(b"hdlr", b"\0" * 8 + b"soun" + b"\0" * 12)))
+    moov = _box(b"moov", mvhd + sound + trak)
+    mdat = _box(b"mdat", b"\0" * 4096)
+    return ftyp + (mdat + moov if moov_last else moov + mdat)
+
+
+def _ebml(element_id: int, payload: bytes) -> bytes:
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+    return id_bytes + (1 << 56 | len(payload)).to_bytes(8, "big") + payload  # 8-byte size vint
+
+
+def _webm(seconds: float = 7.25) -> bytes:
+    header = _ebml(0x1A45DFA3, _ebml(0x4282, b"webm"))
+    info = _ebml(0x1549A966, _ebml(0x2AD7B1, (1_000_000).to_bytes(3, "big")) + _ebml(0x4489, struct.pack(">d", seconds * 1000)))
+    video = _ebml(0xE0, _ebml(0xB0, (1280).to_bytes(2, "big")) + _ebml(0xBA, (720).to_bytes(2, "big")))
+    tracks = _ebml(0x1654AE6B, _ebml(0xAE, _ebml(0x83, b"\x01") + _ebml(0x86, b"V_VP9") + video))
+    cluster = _ebml(0x1F43B675, b"\0" * 256)
+    return header + _ebml(0x18538067, info + tracks + cluster)
+
+
+def test_sniffs_and_probes_mp4_and_webm(tmp_path):
+    mp4, late, webm = tmp_path / "a.mp4", tmp_path / "late.mp4", tmp_path / "b.webm"
+    mp4.write_bytes(_mp4())
+    late.write_bytes(_mp4(seconds=3, timescale=90000, moov_last=True))
+    webm.write_bytes(_webm())
+
+    assert sniff_media_type(mp4.read_bytes()[:12]) == "video/mp4"
+    assert sniff_media_type(webm.read_bytes()[:12]) == "video/webm"
+    assert sniff_media_type(b"\0\0\0\x18ftypheic") is None
+
+    assert probe_video(mp4, "video/mp4") == {"duration": 12.5, "codec": "h264", "width": 1920, "height": 1080}
+    assert probe_video(late, "video/mp4")["duration"] == 3
+    assert probe_video(webm, "video/webm") == {"duration": 7.25, "codec": "vp9", "width": 1280, "height": 720}
+
+
+def _part(name: str, value: bytes, filename: str = None) -> bytes:
+    disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else "")
+    return f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n".encode() + value + b"\r\n"
+
+
+def test_batch_upload_records_video_metadata(monkeypatch, tmp_path):
+    from app.routes import upload as upload_route
+
+    monkeypatch.setattr(object_store, "UPLOAD_DIR", tmp_path)
+    monkeypatch.setattr(object_store, "OBJECT_DIR", tmp_path / "objects")
+    metadata, rendered = {}, []
+    monkeypatch.setattr(upload_route, "update_metadata", lambda fn: fn(metadata))
+    monkeypatch.setattr(upload_route, "update_playlists", lambda fn: fn({}))
+    monkeypatch.setattr(upload_route, "schedule_renditions", rendered.append)
+
+    body = b"".join([
+        _part("start_date", b"2025-01-01"),
+        _part("end_date", b"2025-01-31"),
+        _part("files", _mp4(), "loop.mp4"),
+        _part("files", _box(b"ftyp", b"isom\0\0\0\0") + _box(b"mdat", b"\0" * 64), "broken.mp4"),
+    ]) + f"--{BOUNDARY}--\r\n".encode()
+
+    app = FastAPI()
+    app.include_router(upload_route.router)
+
+    async def post():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(
+                "/upload/batch",
+                content=body,
+                headers={"content-type": f"multipart/form-data; boundary={BOUNDARY}"},
+            )
+
+    report = asyncio.run(post()).json()
+    results = {r["filename"]: r for r in report["results"]}
+    assert results["loop.mp4"]["status"] == "ok"
+    assert metadata["loop.mp4"]["video"]["duration"] == 12.5
+    assert results["broken.mp4"]["detail"] == "broken.mp4: MP4 has no moov box"
+    assert "broken.mp4" not in metadata
+    assert rendered == []
+    assert len(list((tmp_path / "objects").rglob("*.mp4"))) == 1
@@ -1,3 +1,4 @@
+import hmac
 import uuid
 from datetime import datetime
 
@@ -10,6 +11,10 @@ def create_device_entry(name: str, playlist: str = "") -> dict:
         "last_seen": None
     }
 
-# Check device auth (case: MVP UUID token match)
+# Check device auth (case: MVP UUID token match, constant-time)
+# For lookups by device id prefer app.services.device_auth.authenticate_device
 def is_device_authorized(device_data: dict, provided_token: str) -> bool:
-    return device_data.get("auth_token") == provided_token
\ No newline at end of file
+    expected = device_data.get("auth_token")
+    if not expected or not provided_token:
+        return False
+    return hmac.compare_digest(str(expected).encode("utf-8"), provided_token.encode("utf-8"))
\ No newline at end of file
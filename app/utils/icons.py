@@ -0,0 +1,73 @@
+# app/utils/icons.py
+
+"""
+Jinja helpers for the lucide icon sprite (see app/scripts/build_icons.py).
+
+  {{ icon("pause", width=20, height=20, alt="Pause") }}
+      → <svg …><use href="/static/icons/sprite.<hash>.svg#pause"></use></svg>
+  {{ icon_href("play") }}
+      → the bare sprite URL + fragment, for scripts that swap icons
+
+The sprite file name changes with its content, so it is served as immutable.
+Only the prebuilt sprite.json is read here. The sprite and its manifest are
+committed (rebuild with python -m app.scripts.build_icons after adding an
+icon), so importing the app never needs a build step; `build_icons --check`
+fails the tests when templates outgrow the committed sprite.
+"""
+
+import json
+from pathlib import Path
+from typing import Dict
+
+from markupsafe import Markup, escape
+
+SPRITE_MANIFEST = Path("app/static/icons/sprite.json")
+SPRITE_URL_PREFIX = "/static/icons/"
+
+# Paint defaults of lucide icons; CSS (e.g. .icon-svg, .icon-btn svg) overrides them
+ICON_DEFAULTS = {
+    "width": "24",
+    "height": "24",
+    "fill": "none",
+    "stroke": "currentColor",
+    "stroke-width": "2",
+    "stroke-linecap": "round",
+    "stroke-linejoin": "round",
+}
+
+
+def _load_manifest(path: Path = SPRITE_MANIFEST) -> Dict:
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        raise RuntimeError(f"Icon sprite manifest {path} is missing; run python -m app.scripts.build_icons") from None
+
+
+_manifest = _load_manifest()
+_known = set(_manifest["icons"])
+
+
+def icon_href(name: str) -> str:
+    if name not in _known:
+        print(f"[WARN] Icon {name!r} is not in the sprite; run python -m app.scripts.build_icons")
+    return f"{SPRITE_URL_PREFIX}{_manifest['sprite']}#{name}"
+
+
+def icon(name: str, alt: str = None, **attrs) -> Markup:
+    """
+    Inline <svg> that references `name` in the sprite. Extra keyword arguments
+    become attributes (class="…", style="…", width=…); `alt` becomes an
+    accessible label, otherwise the icon is hidden from assistive tech.
+    """
+    attrs = {k.replace("_", "-"): str(v) for k, v in attrs.items()}
+    if ("width" in attrs) != ("height" in attrs):
+        # Square icons: one given dimension sets both, as it did for <img>
+        attrs.setdefault("height", attrs.get("width"))
+        attrs.setdefault("width", attrs.get("height"))
+    attributes = {**ICON_DEFAULTS, **attrs}
+    if alt:
+        attributes.update({"role": "img", "aria-label": alt})
+    else:
+        attributes["aria-hidden"] = "true"
+    rendered = " ".join(f'{key}="{escape(value)}"' for key, value in attributes.items())
+    return Markup(f'<svg {rendered}><use href="{escape(icon_href(name))}"></use></svg>')
@@ -0,0 +1,335 @@
+# app/utils/static_files.py
+
+"""
+Static serving for /static and /uploads.
+
+  • precompressed variants: main.css.br / main.css.gz written next to a file
+    by python -m app.scripts.compress_static are served instead of it to
+    clients that accept that encoding (Vary: Accept-Encoding); a variant
+    older than its source is ignored, so an edited file is never shadowed
+  • strong ETags per representation (the gzip and identity bodies differ)
+  • content-addressed uploads, fingerprinted build outputs and URLs
+    versioned with static_url() (?v=<content hash>, honoured on /static
+    only) are immutable for a year; everything else is served with no-cache
+    and revalidated by ETag
+  • large bodies go through the server's zero-copy send (os.sendfile) when
+    it offers the ASGI extension, else in 1 MiB reads instead of 64 KiB
+  • single byte ranges (Range / If-Range) are answered with 206, so video
+    can seek and be fetched in parallel pieces; encoded variants are always
+    sent whole
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from mimetypes import guess_type
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+# objects/ab/<sha256>.<ext> and renditions/<sha256>.<height>.<ext>
+CONTENT_ADDRESSED = re.compile(r"(?:^|/)(?:objects/[0-9a-f]{2}/|renditions/)([0-9a-f]{64}(?:\.\d+)?\.\w+)$")
+# Build outputs with a content hash in the name, e.g. icons/sprite.<hash12>.svg
+FINGERPRINTED = re.compile(r"(?:^|/)([\w-]+\.[0-9a-f]{12}\.\w+)$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Text formats worth precompressing; images and video are compressed already
+COMPRESSIBLE_SUFFIXES = (".css", ".js", ".svg", ".html", ".json", ".txt", ".map")
+# Content-Encoding → variant suffix, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+VARIANT_SUFFIXES = tuple(suffix for _, suffix in ENCODINGS)
+
+STATIC_ROOT = Path("app/static")
+STATIC_URL_PREFIX = "/static/"
+
+FINGERPRINT_CACHE_SIZE = 1024   # Files whose ?v= hash is remembered (static assets, not uploads)
+SENDFILE_THRESHOLD = 256 * 1024   # Smaller bodies are cheaper as one read + send
+LARGE_CHUNK_SIZE = 1024 * 1024
+
+
+# === Content negotiation ===
+
+def accepted_encodings(accept_encoding: Optional[str]) -> List[str]:
+    """Encodings the client accepts (q > 0), e.g. "gzip, br;q=0.9" → ["gzip", "br"]."""
+    accepted = []
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding and q > 0:
+            accepted.append(coding.strip().lower())
+    return accepted
+
+
+def precompressed_variant(full_path: str, stat_result: os.stat_result, accept_encoding: Optional[str]) -> Optional[Tuple[str, str, os.stat_result]]:
+    """(encoding, variant path, variant stat) of the best precompressed file the client accepts."""
+    accepted = accepted_encodings(accept_encoding)
+    if not accepted:
+        return None
+    for encoding, suffix in ENCODINGS:
+        if encoding not in accepted and "*" not in accepted:
+            continue
+        variant = full_path + suffix
+        try:
+            variant_stat = os.stat(variant)
+        except OSError:
+            continue
+        if variant_stat.st_mtime_ns >= stat_result.st_mtime_ns:
+            return encoding, variant, variant_stat
+    return None
+
+
+# === Validators ===
+
+def strong_etag(stat_result: os.stat_result, encoding: Optional[str] = None) -> str:
+    """
+    Strong ETag of one representation of a file. Files are replaced by rename
+    (new inode), so inode + mtime + size identifies the bytes.
+    """
+    base = f"{stat_result.st_ino}-{stat_result.st_mtime_ns}-{stat_result.st_size}"
+    tag = hashlib.sha1(base.encode("ascii")).hexdigest()[:20]
+    return f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+
+_fingerprints: "OrderedDict[str, Tuple[int, int, str]]" = OrderedDict()   # path → (mtime_ns, size, digest), LRU
+_fingerprints_lock = threading.Lock()
+
+
+def file_fingerprint(path) -> str:
+    """
+    First 12 hex digits of the file's SHA-256, recomputed only when its
+    mtime / size change. The FINGERPRINT_CACHE_SIZE most recent files are kept.
+    """
+    path = str(path)
+    stat_result = os.stat(path)
+    with _fingerprints_lock:
+        cached = _fingerprints.get(path)
+        if cached and cached[:2] == (stat_result.st_mtime_ns, stat_result.st_size):
+            _fingerprints.move_to_end(path)
+            return cached[2]
+    digest = hashlib.sha256(Path(path).read_bytes()).hexdigest()[:12]
+    with _fingerprints_lock:
+        _fingerprints[path] = (stat_result.st_mtime_ns, stat_result.st_size, digest)
+        _fingerprints.move_to_end(path)
+        while len(_fingerprints) > FINGERPRINT_CACHE_SIZE:
+            _fingerprints.popitem(last=False)
+    return digest
+
+
+def static_url(path: str) -> str:
+    """
+    /static URL of `path` versioned by its content, e.g. /static/css/main.css?v=3f2a…;
+    served as immutable, and the link changes whenever the file does.
+    """
+    try:
+        return f"{STATIC_URL_PREFIX}{path}?v={file_fingerprint(STATIC_ROOT / path)}"
+    except OSError:
+        print(f"[WARN] Static file {path!r} not found")
+        return f"{STATIC_URL_PREFIX}{path}"
+
+
+# === Responses ===
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Inclusive (first, last) byte positions of a single-range `Range: bytes=…`
+    header, or None to send the whole file (no header, another unit, several
+    ranges). Raises RangeNotSatisfiable if the range lies outside the file.
+    """
+    if not range_header:
+        return None
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if not first:
+            length = int(last)  # Suffix range: the last `length` bytes
+            if length <= 0 or size == 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - length), size - 1
+        start = int(first)
+        stop = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if start > stop:
+        return None  # Syntactically invalid: ignored
+    return start, min(stop, size - 1)
+
+
+class SendfileResponse(FileResponse):
+    """
+    FileResponse that hands large bodies to the server: the ASGI zero-copy
+    send extension (os.sendfile from the open file) or path send where the
+    server advertises them, else 1 MiB reads. Small bodies are read whole.
+
+    With `byte_range=(first, last)` it answers 206 with just those bytes.
+    Every response reads through its own file handle, so any number of
+    partial reads of one file (seeking, parallel range fetches) can run at
+    once.
+    """
+
+    def __init__(self, path, status_code: int = 200, headers=None, media_type=None,
+                 stat_result: os.stat_result = None, byte_range: Optional[Tuple[int, int]] = None):
+        headers = dict(headers or {})
+        headers["accept-ranges"] = "bytes"
+        self.byte_range = byte_range
+        if byte_range is not None:
+            first, last = byte_range
+            status_code = 206
+            headers["content-range"] = f"bytes {first}-{last}/{stat_result.st_size}"
+            headers["content-length"] = str(last - first + 1)
+        super().__init__(path, status_code=status_code, headers=headers, media_type=media_type, stat_result=stat_result)
+
+    async def __call__(self, scope, receive, send) -> None:
+        extensions = scope.get("extensions") or {}
+        if self.stat_result is None or scope["method"].upper() == "HEAD":
+            return await super().__call__(scope, receive, send)
+        offset, count = 0, self.stat_result.st_size
+        if self.byte_range is not None:
+            offset, count = self.byte_range[0], self.byte_range[1] - self.byte_range[0] + 1
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if count < SENDFILE_THRESHOLD:
+            # One worker-thread hop for open + read + close instead of one each
+            body = await anyio.to_thread.run_sync(_read_span, self.path, offset, count)
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+        elif "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": offset,
+                    "count": count,
+                    "more_body": False,
+                })
+        elif "http.response.pathsend" in extensions and self.byte_range is None:
+            await send({"type": "http.response.pathsend", "path": os.path.abspath(self.path)})
+        else:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(offset)
+                remaining = count
+                while True:
+                    chunk = await file.read(min(LARGE_CHUNK_SIZE, remaining))
+                    remaining -= len(chunk)
+                    more_body = bool(chunk) and remaining > 0
+                    await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                    if not more_body:
+                        break
+        if self.background is not None:
+            await self.background()
+
+
+def _read_span(path, offset: int, count: int) -> bytes:
+    with open(path, "rb") as file:
+        file.seek(offset)
+        return file.read(count)
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    StaticFiles for /uploads and /static: content-addressed files (named by
+    their SHA-256, see app/services/object_store.py), fingerprinted build
+    outputs (the icon sprite) and static_url() links never change under the
+    same URL, so they are served with `Cache-Control: immutable`. Everything
+    else is revalidated (no-cache + strong ETag) so screens get a 304 instead
+    of the body.
+
+    `versioned=True` honours ?v= links (the /static mount); it hashes the
+    file to check the version, so mounts of large user files leave it off
+    and `unversioned` names subdirectories (e.g. "uploads") it skips.
+    """
+
+    def __init__(self, *args, pattern: re.Pattern = CONTENT_ADDRESSED, versioned: bool = False,
+                 unversioned: Tuple[str, ...] = (), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pattern = pattern
+        self.versioned = versioned
+        self.unversioned = tuple(os.path.join(os.path.realpath(self.directory), d) + os.sep for d in unversioned)
+
+    def _immutable_tag(self, full_path: str, scope) -> Optional[str]:
+        """The URL's own version (file name hash or ?v=), if it matches the file."""
+        match = self.pattern.search(full_path.replace("\\", "/"))
+        if match:
+            return match.group(1)
+        if not self.versioned or any(os.path.realpath(full_path).startswith(d) for d in self.unversioned):
+            return None
+        version = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("v")
+        if version and version[0] == file_fingerprint(full_path):
+            return version[0]
+        return None
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        full_path = str(full_path)
+        request_headers = Headers(scope=scope)
+        media_type = guess_type(full_path)[0] or "text/plain"
+        headers = {}
+
+        variant = None
+        if full_path.endswith(COMPRESSIBLE_SUFFIXES):
+            headers["vary"] = "Accept-Encoding"
+            variant = precompressed_variant(full_path, stat_result, request_headers.get("accept-encoding"))
+        encoding, body_path, body_stat = variant or (None, full_path, stat_result)
+        if encoding:
+            headers["content-encoding"] = encoding
+
+        tag = self._immutable_tag(full_path, scope)
+        if tag:
+            headers["etag"] = f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+            headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+        else:
+            headers["etag"] = strong_etag(body_stat, encoding)
+            headers["cache-control"] = REVALIDATE_CACHE_CONTROL
+
+        response = SendfileResponse(
+            body_path, status_code=status_code, headers=headers, media_type=media_type, stat_result=body_stat
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        if status_code != 200 or encoding or not self._range_applies(response.headers, request_headers):
+            return response
+        try:
+            byte_range = parse_range(request_headers.get("range"), body_stat.st_size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={
+                "content-range": f"bytes */{body_stat.st_size}",
+                "accept-ranges": "bytes",
+                "etag": headers["etag"],
+            })
+        if byte_range is None:
+            return response
+        return SendfileResponse(
+            body_path, headers=headers, media_type=media_type, stat_result=body_stat, byte_range=byte_range
+        )
+
+    @staticmethod
+    def _range_applies(response_headers: Headers, request_headers: Headers) -> bool:
+        """False if an If-Range validator no longer matches (then the full file is sent)."""
+        if_range = request_headers.get("if-range")
+        if not if_range or "range" not in request_headers:
+            return True
+        if if_range.startswith(("W/", '"')):
+            return if_range == response_headers["etag"]
+        return if_range == response_headers["last-modified"]